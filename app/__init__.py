@@ -17,6 +17,13 @@ def create_app(config_name='development'):
     from app.config.settings import config
     app.config.from_object(config[config_name])
     
+    # Size the connection pool for the pre-check and worker threads; explicit engine options win
+    from app.services.precheck_executor import engine_pool_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_pool_options(app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -32,6 +39,7 @@ def create_app(config_name='development'):
     from app.routes.reports import reports_bp
     from app.routes.webhooks import webhooks_bp
     from app.routes.compliance import compliance_bp
+    from app.routes.reviews import reviews_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(accounts_bp, url_prefix='/api/accounts')
@@ -41,6 +49,7 @@ def create_app(config_name='development'):
     app.register_blueprint(reports_bp, url_prefix='/api/reports')
     app.register_blueprint(webhooks_bp, url_prefix='/api/webhooks')
     app.register_blueprint(compliance_bp, url_prefix='/api/compliance')
+    app.register_blueprint(reviews_bp, url_prefix='/api/reviews')
     
     # Register error handlers
     from app.middleware.error_handler import register_error_handlers
@@ -58,6 +67,45 @@ def create_app(config_name='development'):
     from app.utils.logger import setup_app_logger
     setup_app_logger(app)
     
+    # Initialize fraud velocity counters
+    from app.services.velocity_store import velocity_store
+    velocity_store.init_app(app)
+    
+    # Compile fraud rules (hot-reloaded from FRAUD_RULES_PATH)
+    from app.services.fraud_rules import fraud_rule_engine
+    fraud_rule_engine.init_app(app)
+    
+    # Per-user fraud feature cache
+    from app.services.feature_cache import feature_cache
+    feature_cache.init_app(app)
+    
+    # Device reputation filter (loaded from device_reputations)
+    from app.services.device_reputation import device_reputation
+    device_reputation.init_app(app)
+    
+    # Candidate fraud scorers evaluated off the request path
+    from app.services.shadow_scoring import shadow_scoring
+    shadow_scoring.init_app(app)
+    
+    # AML structuring windows (rebuilt from recent near-threshold transactions)
+    from app.services.aml_detector import aml_detector
+    aml_detector.init_app(app)
+    
+    # Sanctions list snapshot (compiled by the sanctions list processor)
+    from app.services.sanctions_screening import sanctions_screener
+    sanctions_screener.init_app(app)
+    
+    # Per-user compliance results and the deferred compliance check pool
+    from app.services.compliance_cache import compliance_cache
+    from app.services.compliance_queue import compliance_queue
+    compliance_cache.init_app(app)
+    compliance_queue.init_app(app)
+    
+    # Initialize the concurrent fraud/compliance pre-check pool
+    from app.services.precheck_executor import precheck_executor, feature_executor
+    precheck_executor.init_app(app)
+    feature_executor.init_app(app)
+    
     return app
 
 
@@ -5,7 +5,8 @@ from app.models.payment import Payment, PaymentMethod
 from app.models.settlement import Settlement, SettlementBatch
 from app.models.audit_log import AuditLog
 from app.models.compliance import ComplianceCheck, KYCRecord
-from app.models.fraud import FraudCheck, RiskScore
+from app.models.fraud import FraudCheck, RiskScore, UserBaseline, DeviceReputation, DeviceUser, \
+    LinkCluster, LinkNode, LinkEdge
 
 __all__ = [
     'User',
@@ -22,6 +23,12 @@ __all__ = [
     'KYCRecord',
     'FraudCheck',
     'RiskScore',
+    'UserBaseline',
+    'DeviceReputation',
+    'DeviceUser',
+    'LinkCluster',
+    'LinkNode',
+    'LinkEdge',
 ]
 
 
@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime
 from decimal import Decimal
+from typing import Dict, List
 import uuid
 
 class Account(db.Model):
@@ -11,6 +12,7 @@ class Account(db.Model):
     account_type = db.Column(db.String(50), default='standard', nullable=False)  # standard, business, merchant
     status = db.Column(db.String(50), default='active', nullable=False, index=True)  # active, suspended, closed
     currency = db.Column(db.String(3), default='USD', nullable=False, index=True)
+    wallet_shards = db.Column(db.Integer, default=1, nullable=False)  # >1 spreads wallets over sub-wallet rows
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -25,14 +27,16 @@ class Account(db.Model):
             'account_type': self.account_type,
             'status': self.status,
             'currency': self.currency,
+            'wallet_shards': self.wallet_shards,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
         
         if include_balance:
-            total_balance = sum(w.balance for w in self.wallets)
+            wallets = self.wallets.all()
+            total_balance = sum(w.balance for w in wallets)
             data['total_balance'] = float(total_balance)
-            data['wallets'] = [w.to_dict() for w in self.wallets]
+            data['wallets'] = merge_wallet_shards(wallets)
         
         return data
     
@@ -46,13 +50,14 @@ class Wallet(db.Model):
     account_id = db.Column(db.String(36), db.ForeignKey('accounts.id'), nullable=False, index=True)
     wallet_type = db.Column(db.String(50), nullable=False)  # main, escrow, reserve
     currency = db.Column(db.String(3), nullable=False, index=True)
+    shard = db.Column(db.Integer, default=0, nullable=False)  # 0 is the primary wallet
     balance = db.Column(db.Numeric(20, 2), default=Decimal('0.00'), nullable=False)
     available_balance = db.Column(db.Numeric(20, 2), default=Decimal('0.00'), nullable=False)
     frozen_balance = db.Column(db.Numeric(20, 2), default=Decimal('0.00'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('account_id', 'wallet_type', 'currency', name='unique_wallet'),)
+    __table_args__ = (db.UniqueConstraint('account_id', 'wallet_type', 'currency', 'shard', name='unique_wallet'),)
     
     def to_dict(self):
         return {
@@ -60,6 +65,7 @@ class Wallet(db.Model):
             'account_id': self.account_id,
             'wallet_type': self.wallet_type,
             'currency': self.currency,
+            'shard': self.shard,
             'balance': float(self.balance),
             'available_balance': float(self.available_balance),
             'frozen_balance': float(self.frozen_balance),
@@ -70,4 +76,24 @@ class Wallet(db.Model):
     def __repr__(self):
         return f'<Wallet {self.wallet_type} {self.currency}>'
 
-
+def merge_wallet_shards(wallets: List[Wallet]) -> List[Dict]:
+    """
+    Collapse sub-wallet shards into one entry per wallet type and currency.
+    
+    The entry carries the primary (shard 0) wallet's id and the summed
+    balances of all its shards, so callers see a single logical wallet.
+    """
+    groups: Dict[tuple, List[Wallet]] = {}
+    for wallet in sorted(wallets, key=lambda w: w.shard or 0):
+        groups.setdefault((wallet.wallet_type, wallet.currency), []).append(wallet)
+    
+    merged = []
+    for shards in groups.values():
+        data = shards[0].to_dict()
+        data['balance'] = float(sum(w.balance for w in shards))
+        data['available_balance'] = float(sum(w.available_balance for w in shards))
+        data['frozen_balance'] = float(sum(w.frozen_balance for w in shards))
+        data['shards'] = len(shards)
+        del data['shard']
+        merged.append(data)
+    return merged
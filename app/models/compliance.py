@@ -6,7 +6,8 @@ class ComplianceCheck(db.Model):
     __tablename__ = 'compliance_checks'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    transaction_id = db.Column(db.String(36), db.ForeignKey('transactions.id'), nullable=False, unique=True, index=True)
+    # Null for checks of a user rather than a transaction (sanctions re-screening)
+    transaction_id = db.Column(db.String(36), db.ForeignKey('transactions.id'), nullable=True, unique=True, index=True)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
     check_type = db.Column(db.String(50), nullable=False, index=True)  # aml, kyc, sanctions, pep
     status = db.Column(db.String(50), default='pending', nullable=False, index=True)  # pending, passed, failed, review
@@ -56,9 +57,17 @@ class KYCRecord(db.Model):
     provider = db.Column(db.String(100))
     provider_reference = db.Column(db.String(255))
     metadata = db.Column(db.JSON)
+    # Verification worker holding the record, and until when (also delays retries)
+    claimed_by = db.Column(db.String(100), nullable=True)
+    claim_expires_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Pending records are claimed oldest first
+    __table_args__ = (
+        db.Index('ix_kyc_records_status_created', 'status', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
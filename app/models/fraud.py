@@ -10,6 +10,7 @@ class FraudCheck(db.Model):
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
     risk_score = db.Column(db.Float, nullable=False, index=True)
     risk_level = db.Column(db.String(50), nullable=False, index=True)  # low, medium, high, critical
+    amount = db.Column(db.Numeric(20, 2), default=0, server_default='0', nullable=False)  # Transaction amount, for review order
     status = db.Column(db.String(50), default='pending', nullable=False)  # pending, approved, rejected, review
     rules_triggered = db.Column(db.JSON)  # List of triggered fraud rules
     device_fingerprint = db.Column(db.String(255))
@@ -18,12 +19,26 @@ class FraudCheck(db.Model):
     geolocation = db.Column(db.JSON)
     velocity_checks = db.Column(db.JSON)  # Transaction velocity data
     pattern_analysis = db.Column(db.JSON)  # Behavioral pattern analysis
+    features = db.Column(db.JSON)  # Feature vector the score was computed from (see fraud_features)
+    degraded_features = db.Column(db.JSON)  # Input lookups that missed their latency budget, if any
     decision_reason = db.Column(db.Text)
     reviewed_by = db.Column(db.String(36), nullable=True)
     reviewed_at = db.Column(db.DateTime, nullable=True)
+    review_claimed_by = db.Column(db.String(36), nullable=True)  # Analyst holding the review lease
+    review_lease_expires_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Triage and queue-age scans: checks of one status in keyset order
+        db.Index('ix_fraud_checks_status_created', 'status', 'created_at', 'id'),
+        # Manual review queue, highest risk and amount first; only 'review' rows are indexed
+        db.Index(
+            'ix_fraud_checks_review_queue', 'risk_score', 'amount', 'id',
+            postgresql_where=db.text("status = 'review'"), sqlite_where=db.text("status = 'review'")
+        ),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -31,11 +46,15 @@ class FraudCheck(db.Model):
             'user_id': self.user_id,
             'risk_score': self.risk_score,
             'risk_level': self.risk_level,
+            'amount': float(self.amount) if self.amount is not None else None,
             'status': self.status,
             'rules_triggered': self.rules_triggered,
+            'degraded_features': self.degraded_features,
             'decision_reason': self.decision_reason,
             'reviewed_by': self.reviewed_by,
             'reviewed_at': self.reviewed_at.isoformat() if self.reviewed_at else None,
+            'review_claimed_by': self.review_claimed_by,
+            'review_lease_expires_at': self.review_lease_expires_at.isoformat() if self.review_lease_expires_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
     
@@ -54,8 +73,19 @@ class RiskScore(db.Model):
     device_score = db.Column(db.Float)
     location_score = db.Column(db.Float)
     kyc_score = db.Column(db.Float)
+    sample_count = db.Column(db.Integer, default=0, nullable=False)  # fraud checks folded into the scores
+    is_current = db.Column(db.Boolean, default=False, nullable=False)  # live row; others are history snapshots
     calculated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     
+    __table_args__ = (
+        # At most one live row per user
+        db.Index(
+            'uq_risk_scores_current_user', 'user_id', unique=True,
+            postgresql_where=db.text('is_current'), sqlite_where=db.text('is_current')
+        ),
+        db.Index('ix_risk_scores_user_calculated', 'user_id', 'calculated_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -67,6 +97,7 @@ class RiskScore(db.Model):
             'device_score': self.device_score,
             'location_score': self.location_score,
             'kyc_score': self.kyc_score,
+            'sample_count': self.sample_count,
             'calculated_at': self.calculated_at.isoformat() if self.calculated_at else None,
         }
     
@@ -74,3 +105,96 @@ class RiskScore(db.Model):
         return f'<RiskScore {self.user_id} score={self.overall_score}>'
 
 
+
+class UserBaseline(db.Model):
+    __tablename__ = 'user_baselines'
+    
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    sample_count = db.Column(db.Integer, default=0, nullable=False)
+    stats = db.Column(db.LargeBinary, nullable=False)  # Fixed-size record, see behavior_baseline.Baseline
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserBaseline {self.user_id} samples={self.sample_count}>'
+
+class DeviceReputation(db.Model):
+    __tablename__ = 'device_reputations'
+    
+    fingerprint = db.Column(db.String(255), primary_key=True)
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    user_count = db.Column(db.Integer, default=0, nullable=False)  # Distinct users, see DeviceUser
+    check_count = db.Column(db.Integer, default=0, nullable=False)
+    approved_count = db.Column(db.Integer, default=0, nullable=False)  # Fraud checks by final status
+    rejected_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    @property
+    def fraud_rate(self) -> float:
+        """Share of decided checks that were rejected"""
+        decided = self.approved_count + self.rejected_count
+        return self.rejected_count / decided if decided else 0.0
+    
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'first_seen_at': self.first_seen_at.isoformat() if self.first_seen_at else None,
+            'last_seen_at': self.last_seen_at.isoformat() if self.last_seen_at else None,
+            'user_count': self.user_count,
+            'check_count': self.check_count,
+            'approved_count': self.approved_count,
+            'rejected_count': self.rejected_count,
+            'fraud_rate': self.fraud_rate,
+        }
+    
+    def __repr__(self):
+        return f'<DeviceReputation {self.fingerprint} users={self.user_count}>'
+
+class DeviceUser(db.Model):
+    __tablename__ = 'device_users'
+    
+    fingerprint = db.Column(db.String(255), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+# Users linked by shared devices and IP addresses (see FraudRingService)
+class LinkCluster(db.Model):
+    __tablename__ = 'link_clusters'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    check_count = db.Column(db.Integer, default=0, nullable=False)
+    approved_count = db.Column(db.Integer, default=0, nullable=False)
+    rejected_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    @property
+    def fraud_rate(self) -> float:
+        """Share of decided checks in the cluster that were rejected"""
+        decided = self.approved_count + self.rejected_count
+        return self.rejected_count / decided if decided else 0.0
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_count': self.user_count,
+            'check_count': self.check_count,
+            'approved_count': self.approved_count,
+            'rejected_count': self.rejected_count,
+            'fraud_rate': self.fraud_rate,
+        }
+    
+    def __repr__(self):
+        return f'<LinkCluster {self.id} users={self.user_count}>'
+
+class LinkNode(db.Model):
+    __tablename__ = 'link_nodes'
+    
+    node = db.Column(db.String(300), primary_key=True)  # 'u:<user_id>', 'd:<fingerprint>' or 'ip:<address>'
+    cluster_id = db.Column(db.String(36), db.ForeignKey('link_clusters.id'), nullable=False, index=True)
+    user_count = db.Column(db.Integer, default=0, nullable=False)  # Distinct users on a device/IP node
+
+class LinkEdge(db.Model):
+    __tablename__ = 'link_edges'
+    
+    node = db.Column(db.String(300), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
@@ -34,12 +34,35 @@ class Transaction(db.Model):
     settlement_id = db.Column(db.String(36), db.ForeignKey('settlements.id'), nullable=True)
     fraud_check_id = db.Column(db.String(36), db.ForeignKey('fraud_checks.id'), nullable=True)
     compliance_check_id = db.Column(db.String(36), db.ForeignKey('compliance_checks.id'), nullable=True)
+    # Committed before its deferred compliance check resolved (COMPLIANCE_ASYNC_ENABLED)
+    compliance_pending = db.Column(db.Boolean, default=False, nullable=False)
     metadata = db.Column(db.JSON)
     error_message = db.Column(db.Text)
     processed_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Per-user window aggregates are answered from this index alone on Postgres
+        db.Index(
+            'ix_transactions_user_created',
+            'user_id',
+            'created_at',
+            postgresql_include=['transaction_type', 'status', 'amount', 'fee']
+        ),
+        # Completed transactions not yet settled, walked in id order per currency
+        db.Index(
+            'ix_transactions_unsettled', 'currency', 'id',
+            postgresql_where=db.text("status = 'COMPLETED' AND settlement_id IS NULL"),
+            sqlite_where=db.text("status = 'COMPLETED' AND settlement_id IS NULL")
+        ),
+        # Provisional transactions still waiting for their compliance check
+        db.Index(
+            'ix_transactions_compliance_pending', 'created_at',
+            postgresql_where=db.text('compliance_pending'), sqlite_where=db.text('compliance_pending')
+        ),
+    )
+    
     # Relationships
     source_wallet = db.relationship('Wallet', foreign_keys=[source_wallet_id], backref='outgoing_transactions')
     destination_wallet = db.relationship('Wallet', foreign_keys=[destination_wallet_id], backref='incoming_transactions')
@@ -61,6 +84,7 @@ class Transaction(db.Model):
             'source_wallet_id': self.source_wallet_id,
             'destination_wallet_id': self.destination_wallet_id,
             'error_message': self.error_message,
+            'compliance_pending': bool(self.compliance_pending),
             'processed_at': self.processed_at.isoformat() if self.processed_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
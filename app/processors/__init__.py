@@ -1,9 +1,33 @@
 from app.processors.settlement_processor import SettlementProcessor
 from app.processors.fraud_processor import FraudProcessor
+from app.processors.rescoring_processor import RescoringProcessor
+from app.processors.risk_score_processor import RiskScoreProcessor
+from app.processors.baseline_processor import BaselineProcessor
+from app.processors.device_reputation_processor import DeviceReputationProcessor
+from app.processors.link_graph_processor import LinkGraphProcessor
+from app.processors.shadow_report_processor import ShadowReportProcessor
+from app.processors.sanctions_list_processor import SanctionsListProcessor
+from app.processors.aml_sweep_processor import AmlSweepProcessor
+from app.processors.sanctions_rescreen_processor import SanctionsRescreenProcessor
+from app.processors.provisional_compliance_processor import ProvisionalComplianceProcessor
+from app.processors.kyc_requirement_processor import KycRequirementProcessor
+from app.processors.kyc_verification_processor import KycVerificationProcessor
 
 __all__ = [
     'SettlementProcessor',
     'FraudProcessor',
+    'RescoringProcessor',
+    'RiskScoreProcessor',
+    'BaselineProcessor',
+    'DeviceReputationProcessor',
+    'LinkGraphProcessor',
+    'ShadowReportProcessor',
+    'SanctionsListProcessor',
+    'AmlSweepProcessor',
+    'SanctionsRescreenProcessor',
+    'ProvisionalComplianceProcessor',
+    'KycRequirementProcessor',
+    'KycVerificationProcessor',
 ]
 
 
@@ -0,0 +1,138 @@
+from app import db
+from app.repositories.compliance_repository import ComplianceRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.services.aml_detector import EXCLUDED_STATUSES, aml_detector
+from app.utils.logger import get_logger
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+logger = get_logger(__name__)
+
+def partition_bounds(partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Split the (hex UUID) user id space into [first, end) ranges; None is open-ended"""
+    cuts = [f"{(i * 0x10000) // partitions:04x}" for i in range(1, partitions)]
+    return list(zip([None] + cuts, cuts + [None]))
+
+class AmlSweepProcessor:
+    """
+    Sweep historical transactions for structuring.
+    
+    The user id space is split into partitions swept concurrently, each in
+    its own app context and database session. A partition pages through its
+    users' near-threshold transactions in (user_id, created_at, id) keyset
+    order and replays them through its own StructuringDetector, so every
+    window sees the user's transactions in time order as the online path
+    did. A flagged transaction without a compliance check gets one
+    ('review', flag 'aml_risk'): each page's checks are bulk-inserted and
+    linked in one statement each and committed together, so an interrupted
+    or repeated sweep never flags a transaction twice.
+    """
+    
+    def __init__(self, partitions: int = 8, page_size: int = 5000):
+        self.partitions = max(1, partitions)
+        self.page_size = page_size
+    
+    def run(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict:
+        """Flag structuring in transactions created in [since, until)"""
+        app = current_app._get_current_object()
+        bounds = partition_bounds(self.partitions)
+        with ThreadPoolExecutor(max_workers=self.partitions, thread_name_prefix='aml-sweep') as pool:
+            results = list(pool.map(lambda user_range: self._sweep(app, user_range, since, until), bounds))
+        
+        totals = {key: sum(r[key] for r in results) for key in ('users', 'transactions', 'flagged', 'checks_created')}
+        totals['partitions'] = len(bounds)
+        logger.info(f"AML sweep done: {totals}")
+        return totals
+    
+    def _sweep(self, app, user_range: Tuple[Optional[str], Optional[str]], since: Optional[datetime],
+               until: Optional[datetime]) -> Dict[str, int]:
+        with app.app_context():
+            transaction_repo = TransactionRepository()
+            compliance_repo = ComplianceRepository()
+            detector = aml_detector.clone()
+            low, high = Decimal(detector.near_cents) / 100, Decimal(detector.threshold_cents) / 100
+            # Transactions up to a window before since still count towards its first flags
+            replay_from = since - timedelta(seconds=detector.window_seconds) if since else None
+            
+            counts = {'users': 0, 'transactions': 0, 'flagged': 0, 'checks_created': 0}
+            user_id, after = None, None
+            while True:
+                rows = transaction_repo.get_amount_band_page(
+                    low, high, self.page_size, user_range, after, replay_from, until, EXCLUDED_STATUSES
+                )
+                if not rows:
+                    break
+                
+                checks, links = [], []
+                for row in rows:
+                    if row.user_id != user_id:
+                        detector.clear()
+                        user_id = row.user_id
+                        counts['users'] += 1
+                    result = detector.assess(row.user_id, row.amount, row.destination_wallet_id, row.created_at)
+                    detector.record(row.user_id, row.amount, row.destination_wallet_id, row.created_at)
+                    counts['transactions'] += 1
+                    if not result['flagged'] or (since and row.created_at < since):
+                        continue
+                    counts['flagged'] += 1
+                    if row.compliance_check_id is None:
+                        check_id = str(uuid.uuid4())
+                        checks.append(self._check_row(check_id, row, result))
+                        links.append({'id': row.id, 'compliance_check_id': check_id})
+                
+                try:
+                    compliance_repo.insert_checks(checks)
+                    transaction_repo.link_compliance_checks(links)
+                    db.session.commit()
+                except Exception as e:
+                    logger.error(f"AML sweep failed in users {user_range}: {str(e)}")
+                    db.session.rollback()
+                    raise
+                counts['checks_created'] += len(checks)
+                after = (rows[-1].user_id, rows[-1].created_at, rows[-1].id)
+            
+            logger.info(f"AML sweep of users {user_range}: {counts}")
+            return counts
+    
+    def _check_row(self, check_id: str, row, result: Dict) -> Dict:
+        now = datetime.utcnow()
+        return {
+            'id': check_id,
+            'transaction_id': row.id,
+            'user_id': row.user_id,
+            'check_type': 'aml',
+            'status': 'review',
+            'result': {'aml': result},
+            'flags': ['aml_risk'],
+            'provider': 'internal',
+            'created_at': now,
+            'updated_at': now
+        }
+
+def main():
+    """python -m app.processors.aml_sweep_processor [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--partitions N]"""
+    import argparse
+    import json
+    import os
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Flag structuring in historical transactions')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='first transaction date to flag')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='end of the sweep (exclusive)')
+    parser.add_argument('--partitions', type=int, help='concurrent partitions (default AML_SWEEP_PARTITIONS)')
+    parser.add_argument('--page-size', type=int, default=5000)
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        result = AmlSweepProcessor(
+            args.partitions or app.config['AML_SWEEP_PARTITIONS'], args.page_size
+        ).run(args.since, args.until)
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
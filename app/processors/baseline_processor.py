@@ -0,0 +1,102 @@
+from app import db
+from app.models.transaction import Transaction, TransactionStatus
+from app.repositories.fraud_repository import FraudRepository
+from app.services.behavior_baseline import Baseline
+from app.services.feature_cache import feature_cache
+from app.utils.logger import get_logger
+from datetime import datetime
+from sqlalchemy import select
+from typing import Dict, Optional
+
+logger = get_logger(__name__)
+
+class BaselineProcessor:
+    """
+    Rebuild every user's behavioural baseline from the transactions table.
+    
+    Transactions are streamed ordered by user, so only the current user's
+    baseline is held in memory and each transaction is read exactly once.
+    Finished baselines are bulk-inserted in batches, and the old ones are
+    replaced in the same database transaction. Failed and cancelled
+    transactions are skipped, as in FraudService.update_baselines.
+    
+    Transactions created while the job runs may be learned twice or not at
+    all, so run it before enabling traffic or in a quiet window.
+    """
+    
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self.fraud_repo = FraudRepository()
+    
+    def bootstrap(self, until: Optional[datetime] = None) -> Dict[str, int]:
+        stmt = select(
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.created_at,
+            Transaction.transaction_type
+        ).where(
+            Transaction.status.notin_([TransactionStatus.FAILED, TransactionStatus.CANCELLED])
+        ).order_by(Transaction.user_id, Transaction.created_at)
+        if until:
+            stmt = stmt.where(Transaction.created_at < until)
+        
+        users = 0
+        transactions = 0
+        pending = []
+        
+        def emit(user_id: str, baseline: Baseline):
+            pending.append({
+                'user_id': user_id,
+                'sample_count': baseline.count,
+                'stats': baseline.pack(),
+                'updated_at': datetime.utcnow()
+            })
+            if len(pending) >= self.batch_size:
+                self.fraud_repo.insert_baselines(pending)
+                pending.clear()
+        
+        try:
+            self.fraud_repo.delete_all_baselines()
+            
+            user_id, baseline = None, None
+            for row in db.session.execute(stmt.execution_options(yield_per=self.batch_size)):
+                if row.user_id != user_id:
+                    if baseline is not None:
+                        emit(user_id, baseline)
+                    user_id, baseline = row.user_id, Baseline()
+                    users += 1
+                baseline.update(float(row.amount), row.created_at.hour, row.transaction_type)
+                transactions += 1
+                if transactions % 100000 == 0:
+                    logger.info(f"Baseline bootstrap: {transactions} transactions, {users} users")
+            if baseline is not None:
+                emit(user_id, baseline)
+            self.fraud_repo.insert_baselines(pending)
+            
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error bootstrapping baselines: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        feature_cache.clear()
+        logger.info(f"Baselines bootstrapped: {users} users from {transactions} transactions")
+        return {'users': users, 'transactions': transactions}
+
+def main():
+    """python -m app.processors.baseline_processor [--batch-size N]"""
+    import argparse
+    import os
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Rebuild behavioural baselines from transaction history')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        result = BaselineProcessor(args.batch_size).bootstrap()
+    print(f"{result['users']} baselines built from {result['transactions']} transactions")
+
+if __name__ == '__main__':
+    main()
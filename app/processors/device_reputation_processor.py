@@ -0,0 +1,45 @@
+from app import db
+from app.repositories.device_repository import DeviceRepository
+from app.services.device_reputation import device_reputation
+from app.utils.logger import get_logger
+from typing import Dict
+
+logger = get_logger(__name__)
+
+class DeviceReputationProcessor:
+    """Rebuild the device reputation index from fraud_checks"""
+    
+    def __init__(self):
+        self.device_repo = DeviceRepository()
+    
+    def rebuild(self) -> Dict[str, int]:
+        """
+        Replace device_reputations and device_users with aggregates computed
+        by the database in one pass over fraud_checks, then reload this
+        process's filter. Other processes pick up the rebuilt rows on their
+        next refresh.
+        """
+        try:
+            devices = self.device_repo.rebuild_from_fraud_checks()
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error rebuilding device reputation: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        fingerprints = device_reputation.load()
+        logger.info(f"Device reputation rebuilt: {devices} devices")
+        return {'devices': devices, 'fingerprints': fingerprints}
+
+def main():
+    """python -m app.processors.device_reputation_processor"""
+    import os
+    from app import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        result = DeviceReputationProcessor().rebuild()
+    print(f"{result['devices']} devices indexed")
+
+if __name__ == '__main__':
+    main()
@@ -1,54 +1,83 @@
 from app.services.fraud_service import FraudService
+from app.services.transaction_holds import TransactionHoldService
 from app.repositories.transaction_repository import TransactionRepository
-from app.models.transaction import TransactionStatus
+from app.repositories.unit_of_work import unit_of_work
+from app.models.fraud import FraudCheck
+from app.models.transaction import Transaction
 from app.utils.logger import get_logger
+from typing import Dict, List, Optional, Tuple
 
 logger = get_logger(__name__)
 
+REJECTION_MESSAGE = "Transaction rejected due to high fraud risk"
+
 class FraudProcessor:
     """Background processor for fraud checks"""
     
-    def __init__(self):
+    def __init__(self, batch_size: int = 500):
         self.fraud_service = FraudService()
         self.transaction_repo = TransactionRepository()
+        self.holds = TransactionHoldService()
+        self.batch_size = batch_size
+    
+    def process_pending_fraud_checks(self, max_batches: Optional[int] = None) -> int:
+        """
+        Review pending high-risk checks until the backlog is empty.
+        
+        Each batch claims up to batch_size checks together with their
+        transactions in one locking query, applies the decisions with one
+        UPDATE per outcome and commits once. Claimed rows are skipped by
+        other workers, so several processes can drain the backlog side by
+        side. Returns the number of checks reviewed.
+        """
+        reviewed = 0
+        after = None
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            try:
+                with unit_of_work():
+                    claimed = self.fraud_service.fraud_repo.claim_pending_high_risk(self.batch_size, after)
+                    if not claimed:
+                        break
+                    last = claimed[-1][0]
+                    after = (last.created_at, last.id)
+                    self._apply_decisions(claimed)
+            except Exception as e:
+                logger.error(f"Error processing fraud checks: {str(e)}")
+                break
+            reviewed += len(claimed)
+            batches += 1
+            logger.info(f"Processed {len(claimed)} fraud checks ({reviewed} so far)")
+        return reviewed
+    
+    def _apply_decisions(self, claimed: List[Tuple[FraudCheck, Transaction]]):
+        by_decision: Dict[Tuple[str, str], List[FraudCheck]] = {}
+        rejected_transactions = []
+        for fraud_check, transaction in claimed:
+            status, reason = self._decide(fraud_check)
+            by_decision.setdefault((status, reason), []).append(fraud_check)
+            if status == 'rejected':
+                rejected_transactions.append(transaction.id)
+        
+        changes = []
+        for (status, reason), fraud_checks in by_decision.items():
+            self.fraud_service.fraud_repo.bulk_set_status([c.id for c in fraud_checks], status, reason)
+            changes += [(c, c.status, status) for c in fraud_checks]
+        # Rejected transactions were processed under a hold; undo it in the same commit
+        self.holds.reverse(rejected_transactions, REJECTION_MESSAGE)
+        self.fraud_service.record_decisions(changes)
     
-    def process_pending_fraud_checks(self):
-        """Process transactions requiring fraud review"""
-        try:
-            # Get high-risk fraud checks
-            fraud_checks = self.fraud_service.fraud_repo.get_high_risk_checks(limit=50)
-            
-            for fraud_check in fraud_checks:
-                transaction = self.transaction_repo.get_by_id(fraud_check.transaction_id)
-                if not transaction:
-                    continue
-                
-                # Automated review logic based on risk score
-                if fraud_check.risk_level == 'critical':
-                    # Auto-reject critical risk
-                    transaction.status = TransactionStatus.FAILED
-                    transaction.error_message = "Transaction rejected due to high fraud risk"
-                    fraud_check.status = 'rejected'
-                    fraud_check.decision_reason = "Auto-rejected: Critical risk level"
-                elif fraud_check.risk_level == 'high' and fraud_check.risk_score > 0.8:
-                    # Auto-reject very high risk
-                    transaction.status = TransactionStatus.FAILED
-                    transaction.error_message = "Transaction rejected due to high fraud risk"
-                    fraud_check.status = 'rejected'
-                    fraud_check.decision_reason = "Auto-rejected: High risk score"
-                else:
-                    # Mark for manual review
-                    fraud_check.status = 'review'
-                    fraud_check.decision_reason = "Pending manual review"
-                
-                self.transaction_repo.update(transaction)
-                self.fraud_service.fraud_repo.update(fraud_check)
-                logger.info(f"Processed fraud check: {fraud_check.id} status={fraud_check.status}")
-        except Exception as e:
-            logger.error(f"Error processing fraud checks: {str(e)}")
+    def _decide(self, fraud_check: FraudCheck) -> Tuple[str, str]:
+        """Automated review logic based on risk score: (status, decision reason)"""
+        if fraud_check.risk_level == 'critical':
+            # Auto-reject critical risk
+            return 'rejected', "Auto-rejected: Critical risk level"
+        if fraud_check.risk_level == 'high' and fraud_check.risk_score > 0.8:
+            # Auto-reject very high risk
+            return 'rejected', "Auto-rejected: High risk score"
+        # Mark for manual review
+        return 'review', "Pending manual review"
     
     # TODO: Add machine learning model integration
     # TODO: Add real-time fraud rule updates
     # TODO: Add fraud pattern learning
-
-
@@ -0,0 +1,63 @@
+from app.services.compliance_service import ComplianceService
+from app.utils.logger import get_logger
+from typing import Optional, TextIO
+import csv
+
+logger = get_logger(__name__)
+
+FIELDS = ['user_id', 'email', 'kyc_status', 'volume', 'transaction_count', 'last_transaction_at']
+
+class KycRequirementProcessor:
+    """
+    Export every user whose recent volume requires KYC.
+    
+    Users without verified KYC whose transaction volume over the last days
+    reaches KYC_REQUIRED_AMOUNT are written as CSV rows in user id order.
+    They are read in keyset pages of page_size, each its own short query,
+    so memory stays flat and no transaction is held open for the whole
+    export. A stopped export can continue with after set to the last
+    user id written.
+    """
+    
+    def __init__(self, days: Optional[int] = None, page_size: int = 5000):
+        self.days = days
+        self.page_size = page_size
+        self.compliance_service = ComplianceService()
+    
+    def export(self, out: TextIO, after: Optional[str] = None) -> int:
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        if after is None:
+            writer.writeheader()
+        count = 0
+        for page in self.compliance_service.iter_users_requiring_kyc(self.page_size, self.days, after):
+            writer.writerows(page)
+            count += len(page)
+            logger.info(f"KYC requirement export: {count} users, last {page[-1]['user_id']}")
+        return count
+
+def main():
+    """python -m app.processors.kyc_requirement_processor [--days N] [--output FILE] [--after USER_ID]"""
+    import argparse
+    import os
+    import sys
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Export users whose recent volume requires KYC')
+    parser.add_argument('--days', type=int, help='volume window (default KYC_VOLUME_WINDOW_DAYS)')
+    parser.add_argument('--output', help='CSV file to write (default stdout)')
+    parser.add_argument('--after', help='continue after this user id (appends without a header)')
+    parser.add_argument('--page-size', type=int, default=5000)
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        processor = KycRequirementProcessor(args.days, args.page_size)
+        if args.output:
+            with open(args.output, 'a' if args.after else 'w', newline='') as out:
+                count = processor.export(out, args.after)
+        else:
+            count = processor.export(sys.stdout, args.after)
+    print(f"{count} users require KYC", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
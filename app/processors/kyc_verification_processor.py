@@ -0,0 +1,199 @@
+from app.repositories.compliance_repository import ComplianceRepository
+from app.repositories.unit_of_work import unit_of_work
+from app.repositories.user_repository import UserRepository
+from app.services.feature_cache import feature_cache
+from app.services.kyc_providers import KycDecision, KycProviderError
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import os
+import random
+import socket
+import time
+
+logger = get_logger(__name__)
+
+class KycVerificationProcessor:
+    """
+    Verify pending KYC submissions with the configured provider.
+    
+    Each batch is claimed, oldest first, under a lease of lease_seconds
+    (rows locked by another worker are skipped), so several workers can
+    run side by side. The claim commits before the provider is called. The
+    batch is then sent to the provider on at most concurrency threads.
+    Retryable failures (KycProviderError) are retried up to max_attempts
+    times with jittered exponential backoff from backoff_seconds. Decisions
+    are written back in one commit, with one bulk UPDATE of the records
+    and one per outcome of User.kyc_status. A record the provider could
+    not decide is released and becomes claimable again after
+    retry_delay_seconds. The lease should outlast a batch: decisions are
+    only written for records still claimed by this worker, and records
+    another worker reclaimed in the meantime are counted as lost.
+    """
+    
+    def __init__(self, provider, batch_size: int = 100, concurrency: int = 8, max_attempts: int = 4,
+                 backoff_seconds: float = 0.5, retry_delay_seconds: float = 60.0, lease_seconds: float = 300.0,
+                 worker_id: Optional[str] = None):
+        self.provider = provider
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.retry_delay_seconds = retry_delay_seconds
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.compliance_repo = ComplianceRepository()
+        self.user_repo = UserRepository()
+    
+    def run(self, max_batches: Optional[int] = None) -> Dict:
+        """Verify batches until nothing is claimable (or max_batches); returns totals"""
+        totals = {'batches': 0, 'records': 0, 'verified': 0, 'rejected': 0, 'deferred': 0, 'lost': 0}
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='kyc') as pool:
+            while max_batches is None or totals['batches'] < max_batches:
+                batch_started = time.monotonic()
+                submissions = self._claim()
+                if not submissions:
+                    break
+                decisions = list(pool.map(self._verify, submissions))
+                counts = self._apply(submissions, decisions)
+                
+                elapsed = time.monotonic() - batch_started
+                metrics.observe('kyc.batch', elapsed * 1000)
+                totals['batches'] += 1
+                totals['records'] += len(submissions)
+                for key, count in counts.items():
+                    totals[key] += count
+                logger.info(
+                    f"KYC batch of {len(submissions)}: {counts['verified']} verified, {counts['rejected']} rejected, "
+                    f"{counts['deferred']} deferred, {counts['lost']} lost, {len(submissions) / max(elapsed, 1e-9):.1f} records/s"
+                )
+        
+        elapsed = time.monotonic() - started
+        totals['elapsed_seconds'] = round(elapsed, 3)
+        totals['records_per_second'] = round(totals['records'] / elapsed, 1) if elapsed else 0.0
+        return totals
+    
+    def watch(self, poll_seconds: float = 5.0):
+        """Keep verifying, polling every poll_seconds while nothing is pending"""
+        while True:
+            if not self.run()['records']:
+                time.sleep(poll_seconds)
+    
+    def _claim(self) -> List[Dict]:
+        now = datetime.utcnow()
+        with unit_of_work():
+            records = self.compliance_repo.claim_pending_kyc(
+                self.worker_id, self.batch_size, now, now + timedelta(seconds=self.lease_seconds)
+            )
+            # Plain dicts, so provider threads never touch the session
+            submissions = [
+                {
+                    'id': r.id,
+                    'user_id': r.user_id,
+                    'document_type': r.document_type,
+                    'document_number': r.document_number,
+                    'document_front_url': r.document_front_url,
+                    'document_back_url': r.document_back_url,
+                    'selfie_url': r.selfie_url
+                }
+                for r in records
+            ]
+        metrics.incr('kyc.claimed', len(submissions))
+        return submissions
+    
+    def _verify(self, submission: Dict) -> Optional[KycDecision]:
+        """The provider's decision, or None if it could not give one"""
+        for attempt in range(self.max_attempts):
+            start = time.perf_counter()
+            try:
+                decision = self.provider.verify(submission)
+                metrics.observe('kyc.provider', (time.perf_counter() - start) * 1000)
+                return decision
+            except KycProviderError as e:
+                metrics.incr('kyc.provider.error')
+                if attempt + 1 == self.max_attempts:
+                    logger.warning(f"KYC record {submission['id']} not verified after {self.max_attempts} attempts: {str(e)}")
+                    return None
+                metrics.incr('kyc.retry')
+                time.sleep(self.backoff_seconds * 2 ** attempt * (0.5 + random.random()))
+            except Exception as e:
+                metrics.incr('kyc.provider.error')
+                logger.error(f"KYC provider failed on record {submission['id']}: {str(e)}")
+                return None
+    
+    def _apply(self, submissions: List[Dict], decisions: List[Optional[KycDecision]]) -> Dict[str, int]:
+        now = datetime.utcnow()
+        retry_at = now + timedelta(seconds=self.retry_delay_seconds)
+        rows = []
+        for submission, decision in zip(submissions, decisions):
+            if decision is None:
+                rows.append({'id': submission['id'], 'claimed_by': None, 'claim_expires_at': retry_at, 'updated_at': now})
+                continue
+            rows.append({
+                'id': submission['id'],
+                'status': decision.status,
+                'provider': self.provider.name,
+                'provider_reference': decision.reference,
+                'verified_at': now if decision.status == 'verified' else None,
+                'rejection_reason': decision.reason,
+                'claimed_by': None,
+                'claim_expires_at': None,
+                'updated_at': now
+            })
+        
+        verified, rejected = [], []
+        with unit_of_work():
+            # A batch that outlived its lease may have been reclaimed; the new owner decides those records
+            updated = self.compliance_repo.update_kyc_records(rows, self.worker_id)
+            for submission, decision in zip(submissions, decisions):
+                if decision is not None and submission['id'] in updated:
+                    (verified if decision.status == 'verified' else rejected).append(submission['user_id'])
+            self.user_repo.set_kyc_statuses(sorted(set(verified)), sorted(set(rejected) - set(verified)))
+        # Bulk UPDATEs bypass the ORM events that keep cached KYC statuses fresh; with
+        # FEATURE_CACHE_INVALIDATION = 'redis' this reaches the web processes' caches too
+        feature_cache.invalidate_many(set(verified) | set(rejected))
+        
+        counts = {
+            'verified': len(verified),
+            'rejected': len(rejected),
+            'deferred': len(updated) - len(verified) - len(rejected),
+            'lost': len(rows) - len(updated)
+        }
+        for key, count in counts.items():
+            metrics.incr(f"kyc.{key}", count)
+        return counts
+
+def main():
+    """python -m app.processors.kyc_verification_processor [--watch] [--max-batches N]"""
+    import argparse
+    import json
+    from app import create_app
+    from app.services.kyc_providers import create_provider
+    
+    parser = argparse.ArgumentParser(description='Verify pending KYC submissions with the configured provider')
+    parser.add_argument('--watch', action='store_true', help='keep running, polling every KYC_POLL_SECONDS')
+    parser.add_argument('--max-batches', type=int)
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        config = app.config
+        processor = KycVerificationProcessor(
+            create_provider(config['KYC_PROVIDER'], config),
+            config['KYC_BATCH_SIZE'],
+            config['KYC_MAX_CONCURRENCY'],
+            config['KYC_MAX_ATTEMPTS'],
+            config['KYC_RETRY_BACKOFF_SECONDS'],
+            config['KYC_RETRY_DELAY_SECONDS'],
+            config['KYC_CLAIM_LEASE_SECONDS']
+        )
+        if args.watch:
+            processor.watch(config['KYC_POLL_SECONDS'])
+        else:
+            print(json.dumps(processor.run(args.max_batches), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+from app import db
+from app.models.fraud import FraudCheck, LinkCluster, LinkEdge, LinkNode
+from app.repositories.link_repository import LinkRepository
+from app.services.fraud_ring_service import linked_nodes, user_node
+from app.utils.logger import get_logger
+from app.utils.union_find import UnionFind
+from datetime import datetime
+from sqlalchemy import select
+from typing import Dict
+import heapq
+import json
+import uuid
+
+logger = get_logger(__name__)
+
+class LinkGraphProcessor:
+    """
+    Rebuild the linked-account graph from fraud_checks.
+    
+    Checks are streamed once in creation order through an in-memory
+    union-find with the same hub rule as FraudRingService, so the rebuilt
+    clusters match what the online updates would have produced. The link
+    tables are then replaced in a single database transaction.
+    """
+    
+    def __init__(self, hub_users: int = 50, batch_size: int = 10000):
+        self.hub_users = hub_users
+        self.batch_size = batch_size
+        self.link_repo = LinkRepository()
+    
+    def rebuild(self, top: int = 20) -> Dict:
+        """Rebuild the graph and return a summary with the top largest clusters"""
+        stmt = select(
+            FraudCheck.user_id,
+            FraudCheck.device_fingerprint,
+            FraudCheck.ip_address,
+            FraudCheck.status
+        ).order_by(FraudCheck.created_at)
+        
+        components = UnionFind()
+        edges = set()
+        node_users: Dict[str, int] = {}
+        user_stats: Dict[str, list] = {}  # user node -> [checks, approved, rejected]
+        checks = 0
+        
+        for row in db.session.execute(stmt.execution_options(yield_per=self.batch_size)):
+            own = user_node(row.user_id)
+            components.add(own)
+            stats = user_stats.setdefault(own, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += row.status == 'approved'
+            stats[2] += row.status == 'rejected'
+            for node in linked_nodes(row.device_fingerprint, row.ip_address):
+                if (node, row.user_id) not in edges:
+                    edges.add((node, row.user_id))
+                    node_users[node] = node_users.get(node, 0) + 1
+                    if node_users[node] <= self.hub_users:
+                        components.union(own, node)
+                elif node_users[node] <= self.hub_users:
+                    components.union(own, node)
+            checks += 1
+            if checks % 100000 == 0:
+                logger.info(f"Link graph rebuild: {checks} checks, {len(components)} nodes")
+        
+        cluster_ids = {root: str(uuid.uuid4()) for root in components.roots()}
+        clusters = {
+            cluster_id: {'id': cluster_id, 'user_count': 0, 'check_count': 0, 'approved_count': 0,
+                         'rejected_count': 0, 'created_at': datetime.utcnow()}
+            for cluster_id in cluster_ids.values()
+        }
+        nodes = []
+        for node in components:
+            cluster = clusters[cluster_ids[components.find(node)]]
+            nodes.append({'node': node, 'cluster_id': cluster['id'], 'user_count': node_users.get(node, 0)})
+            if node in user_stats:
+                cluster['user_count'] += 1
+                user_checks, approved, rejected = user_stats[node]
+                cluster['check_count'] += user_checks
+                cluster['approved_count'] += approved
+                cluster['rejected_count'] += rejected
+        
+        try:
+            self.link_repo.delete_all()
+            self._insert(LinkCluster, list(clusters.values()))
+            self._insert(LinkNode, nodes)
+            self._insert(LinkEdge, [{'node': node, 'user_id': user_id} for node, user_id in edges])
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error rebuilding link graph: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        largest = heapq.nlargest(top, clusters.values(), key=lambda c: c['user_count'])
+        logger.info(f"Link graph rebuilt: {len(nodes)} nodes in {len(clusters)} clusters from {checks} checks")
+        return {
+            'checks': checks,
+            'nodes': len(nodes),
+            'edges': len(edges),
+            'clusters': len(clusters),
+            'hubs': sum(1 for users in node_users.values() if users > self.hub_users),
+            'largest': [
+                {
+                    'cluster_id': c['id'],
+                    'user_count': c['user_count'],
+                    'check_count': c['check_count'],
+                    'rejected_count': c['rejected_count'],
+                    'fraud_rate': c['rejected_count'] / (c['approved_count'] + c['rejected_count'])
+                    if c['approved_count'] + c['rejected_count'] else 0.0
+                }
+                for c in largest
+            ]
+        }
+    
+    def _insert(self, model, rows):
+        for i in range(0, len(rows), self.batch_size):
+            self.link_repo.insert_rows(model, rows[i:i + self.batch_size])
+
+def main():
+    """python -m app.processors.link_graph_processor [--top N] [--output FILE]"""
+    import argparse
+    import os
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Rebuild the linked-account graph from fraud checks')
+    parser.add_argument('--top', type=int, default=20, help='largest clusters to report')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        report = LinkGraphProcessor(app.config['LINK_HUB_USERS']).rebuild(args.top)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
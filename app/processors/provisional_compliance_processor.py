@@ -0,0 +1,72 @@
+from app import db
+from app.repositories.transaction_repository import TransactionRepository
+from app.services.compliance_service import ComplianceService
+from app.utils.logger import get_logger
+from datetime import datetime, timedelta
+from typing import Dict
+
+logger = get_logger(__name__)
+
+class ProvisionalComplianceProcessor:
+    """
+    Resolve provisional transactions whose deferred compliance check never ran.
+    
+    A deferred check lives only in its process's queue, so a restart or a
+    failing job leaves the transaction compliance_pending. Transactions
+    pending for longer than stale_seconds are checked here, oldest first,
+    with the same ComplianceService.resolve_deferred the queue uses: a
+    passed check releases the held balance change, any other status
+    reverses it.
+    """
+    
+    def __init__(self, stale_seconds: int = 300, batch_size: int = 500):
+        self.stale_seconds = stale_seconds
+        self.batch_size = batch_size
+        self.transaction_repo = TransactionRepository()
+        self.compliance_service = ComplianceService()
+    
+    def run(self) -> Dict[str, int]:
+        before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        counts = {'resolved': 0, 'reversed': 0, 'errors': 0}
+        after = None
+        while True:
+            rows = self.transaction_repo.get_provisional_page(before, self.batch_size, after)
+            if not rows:
+                break
+            for row in rows:
+                try:
+                    compliance_check = self.compliance_service.resolve_deferred(row.id)
+                except Exception as e:
+                    db.session.rollback()
+                    counts['errors'] += 1
+                    logger.error(f"Deferred compliance check of {row.id} failed: {str(e)}")
+                    continue
+                counts['resolved'] += 1
+                if compliance_check and compliance_check.status != 'passed':
+                    counts['reversed'] += 1
+            after = (rows[-1].created_at, rows[-1].id)
+        
+        logger.info(f"Provisional compliance sweep done: {counts}")
+        return counts
+
+def main():
+    """python -m app.processors.provisional_compliance_processor [--stale-seconds N]"""
+    import argparse
+    import json
+    import os
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Resolve transactions whose deferred compliance check never ran')
+    parser.add_argument('--stale-seconds', type=int,
+                        help='only transactions pending this long (default COMPLIANCE_ASYNC_STALE_SECONDS)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        stale_seconds = app.config['COMPLIANCE_ASYNC_STALE_SECONDS'] if args.stale_seconds is None else args.stale_seconds
+        result = ProvisionalComplianceProcessor(stale_seconds, args.batch_size).run()
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+from app import db
+from app.repositories.fraud_repository import FraudRepository
+from app.utils.logger import get_logger
+from datetime import datetime, timedelta
+from flask import current_app
+from typing import Dict, Optional
+
+logger = get_logger(__name__)
+
+class RiskScoreProcessor:
+    """Periodic compaction of RiskScore history"""
+    
+    def __init__(self):
+        self.fraud_repo = FraudRepository()
+    
+    def compact(self, daily_after_days: Optional[int] = None, history_days: Optional[int] = None,
+                now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Snapshot live scores into history and downsample older snapshots.
+        
+        Live rows changed since their last snapshot are copied as history.
+        Snapshots newer than daily_after_days are kept as-is, older ones are
+        thinned to the last snapshot per user per day, and snapshots older
+        than history_days are dropped. Live rows are never touched.
+        """
+        now = now or datetime.utcnow()
+        if daily_after_days is None:
+            daily_after_days = current_app.config['RISK_SCORE_DAILY_AFTER_DAYS']
+        if history_days is None:
+            history_days = current_app.config['RISK_SCORE_HISTORY_DAYS']
+        
+        try:
+            snapshots = self.fraud_repo.snapshot_current_scores()
+            deleted = self.fraud_repo.downsample_history(
+                daily_before=now - timedelta(days=daily_after_days),
+                delete_before=now - timedelta(days=history_days)
+            )
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error compacting risk scores: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        logger.info(f"Risk scores compacted: {snapshots} snapshots taken, {deleted} old snapshots removed")
+        return {'snapshots': snapshots, 'deleted': deleted}
@@ -0,0 +1,78 @@
+from app.services.sanctions_screening import sanctions_screener, write_snapshot
+from app.utils.logger import get_logger
+from typing import Dict, Iterator, List
+import csv
+import os
+
+logger = get_logger(__name__)
+
+class SanctionsListProcessor:
+    """
+    Compile sanctions list exports into the screening snapshot.
+    
+    Each <list>.csv in lists_dir (ofac.csv, un.csv, eu.csv, ...) holds one
+    designated party per row with columns id, name, aliases (';'-separated)
+    and program; the file stem names the list. The snapshot is replaced
+    atomically and this process's screener reloads it; other processes pick
+    it up on their next reload check.
+    """
+    
+    def __init__(self, lists_dir: str, snapshot_path: str):
+        self.lists_dir = lists_dir
+        self.snapshot_path = snapshot_path
+    
+    def compile(self) -> Dict[str, int]:
+        files = sorted(f for f in os.listdir(self.lists_dir) if f.endswith('.csv'))
+        if not files:
+            raise ValueError(f"No sanctions list files (*.csv) in {self.lists_dir}")
+        
+        counts = write_snapshot(self._entries(files), self.snapshot_path)
+        logger.info(f"Sanctions snapshot {self.snapshot_path}: {counts['entries']} entries from {', '.join(files)}")
+        if sanctions_screener.path == self.snapshot_path:
+            sanctions_screener.load()
+        return counts
+    
+    def _entries(self, files: List[str]) -> Iterator[Dict]:
+        for filename in files:
+            list_name = filename[:-4]
+            with open(os.path.join(self.lists_dir, filename), newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    names = [row.get('name') or ''] + (row.get('aliases') or '').split(';')
+                    names = [n.strip() for n in names if n.strip()]
+                    if not names:
+                        logger.warning(f"{filename}: skipping entry {row.get('id')!r} without a name")
+                        continue
+                    yield {'list': list_name, 'id': row.get('id'), 'program': row.get('program'), 'names': names}
+
+def main():
+    """python -m app.processors.sanctions_list_processor [--lists-dir DIR] [--output FILE] [--rescreen]"""
+    import argparse
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Compile sanctions lists into the screening snapshot')
+    parser.add_argument('--lists-dir', help='directory of <list>.csv files (default SANCTIONS_LISTS_DIR)')
+    parser.add_argument('--output', help='snapshot path (default SANCTIONS_SNAPSHOT_PATH)')
+    parser.add_argument('--rescreen', action='store_true', help='then re-screen every user against the new snapshot')
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        counts = SanctionsListProcessor(
+            args.lists_dir or app.config['SANCTIONS_LISTS_DIR'],
+            args.output or app.config['SANCTIONS_SNAPSHOT_PATH']
+        ).compile()
+        print(f"{counts['entries']} entries, {counts['names']} names compiled")
+        
+        if args.rescreen:
+            from app.processors.sanctions_rescreen_processor import SanctionsRescreenProcessor
+            result = SanctionsRescreenProcessor(
+                args.output or app.config['SANCTIONS_SNAPSHOT_PATH'],
+                app.config['SANCTIONS_RESCREEN_CHECKPOINT_PATH'],
+                app.config['SANCTIONS_RESCREEN_WORKERS'],
+                threshold=app.config['SANCTIONS_MATCH_THRESHOLD'],
+                cache_size=app.config['SANCTIONS_CACHE_SIZE']
+            ).run()
+            print(f"{result['users']} users re-screened, {result['matched']} matched")
+
+if __name__ == '__main__':
+    main()
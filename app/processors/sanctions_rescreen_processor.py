@@ -0,0 +1,181 @@
+from app import db
+from app.repositories.compliance_repository import ComplianceRepository
+from app.repositories.user_repository import UserRepository
+from app.services.sanctions_screening import SanctionsIndex
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import json
+import multiprocessing
+import os
+import time
+import uuid
+
+logger = get_logger(__name__)
+
+# The snapshot as mapped by this worker process
+_index: Optional[SanctionsIndex] = None
+
+def _open_index(path: str, cache_size: int):
+    global _index
+    _index = SanctionsIndex(path, cache_size)
+
+def _screen_chunk(rows: List[Tuple[str, str, str]], threshold: float) -> List[Tuple[str, List[Dict]]]:
+    """(user id, matches) of the users in rows that match a listed name"""
+    hits = []
+    for user_id, first_name, last_name in rows:
+        matches = _index.find(f"{first_name or ''} {last_name or ''}", threshold)
+        if matches:
+            hits.append((user_id, matches))
+    return hits
+
+class SanctionsRescreenProcessor:
+    """
+    Re-screen every user against the current sanctions snapshot.
+    
+    Users are streamed in id order from a server-side cursor and handed in
+    chunks to a pool of worker processes. Each worker maps the snapshot once,
+    so all of them screen against the same page-cache copy and matching is
+    not serialised by the GIL. Results are collected in submission order
+    with at most two chunks per worker in flight. Each chunk's matches are
+    bulk-inserted as user-level compliance checks ('review', flag
+    'sanctions_match', provider_reference 'rescreen:<snapshot>') and
+    committed; then the checkpoint file records the chunk's last user id.
+    
+    A run against the same snapshot resumes after the checkpoint, skipping
+    users a previous attempt already recorded; a new snapshot starts over.
+    """
+    
+    def __init__(self, snapshot_path: str, checkpoint_path: str, workers: Optional[int] = None,
+                 chunk_size: int = 2000, threshold: float = 0.8, cache_size: int = 10000):
+        self.snapshot_path = snapshot_path
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.user_repo = UserRepository()
+        self.compliance_repo = ComplianceRepository()
+    
+    def run(self, restart: bool = False) -> Dict:
+        snapshot = self._snapshot_id()
+        state = None if restart else self._load_checkpoint(snapshot)
+        if state and state['done']:
+            logger.info(f"Sanctions re-screen for snapshot {snapshot} already complete")
+            return state
+        if state:
+            logger.info(f"Resuming sanctions re-screen after user {state['after']} ({state['users']} done)")
+        else:
+            state = {
+                'snapshot': snapshot, 'after': None, 'users': 0, 'matched': 0, 'done': False,
+                'started_at': datetime.utcnow().isoformat()
+            }
+        
+        started, resumed_users = time.monotonic(), state['users']
+        context = multiprocessing.get_context('spawn')  # workers never inherit the parent's connections
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_open_index,
+                                 initargs=(self.snapshot_path, self.cache_size)) as pool:
+            in_flight = deque()
+            for rows in self.user_repo.iter_names(self.chunk_size, state['after']):
+                in_flight.append((rows[-1][0], len(rows), pool.submit(_screen_chunk, rows, self.threshold)))
+                if len(in_flight) >= 2 * self.workers:
+                    self._complete(state, *in_flight.popleft())
+                    self._log_progress(state, started, resumed_users)
+            while in_flight:
+                self._complete(state, *in_flight.popleft())
+        
+        state['done'] = True
+        state['elapsed_seconds'] = round(time.monotonic() - started, 1)
+        self._save_checkpoint(state)
+        logger.info(f"Sanctions re-screen complete: {state['users']} users, {state['matched']} matched")
+        return state
+    
+    def _complete(self, state: Dict, last_id: str, user_count: int, future):
+        hits = future.result()
+        reference = f"rescreen:{state['snapshot']}"
+        if hits:
+            # A previous attempt may have committed this chunk before it could checkpoint
+            recorded = self.compliance_repo.get_users_with_reference([user_id for user_id, _ in hits], reference)
+            hits = [(user_id, matches) for user_id, matches in hits if user_id not in recorded]
+        try:
+            self.compliance_repo.insert_checks([self._check_row(u, matches, reference) for u, matches in hits])
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Sanctions re-screen failed after user {state['after']}: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        state['after'] = last_id
+        state['users'] += user_count
+        state['matched'] += len(hits)
+        self._save_checkpoint(state)
+        metrics.incr('sanctions.rescreen.users', user_count)
+        metrics.incr('sanctions.rescreen.matched', len(hits))
+    
+    def _check_row(self, user_id: str, matches: List[Dict], reference: str) -> Dict:
+        now = datetime.utcnow()
+        return {
+            'id': str(uuid.uuid4()),
+            'transaction_id': None,
+            'user_id': user_id,
+            'check_type': 'sanctions',
+            'status': 'review',
+            'result': {'sanctions': {'screened': True, 'flagged': True, 'matches': matches}},
+            'flags': ['sanctions_match'],
+            'provider': 'internal',
+            'provider_reference': reference,
+            'created_at': now,
+            'updated_at': now
+        }
+    
+    def _log_progress(self, state: Dict, started: float, resumed_users: int):
+        if state['users'] % (self.chunk_size * 100) < self.chunk_size:
+            rate = (state['users'] - resumed_users) / max(time.monotonic() - started, 1e-9)
+            logger.info(f"Sanctions re-screen: {state['users']} users, {state['matched']} matched, {rate:.0f} users/s")
+    
+    def _snapshot_id(self) -> str:
+        stat = os.stat(self.snapshot_path)
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    
+    def _load_checkpoint(self, snapshot: str) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path) as f:
+            state = json.load(f)
+        return state if state.get('snapshot') == snapshot else None
+    
+    def _save_checkpoint(self, state: Dict):
+        state['updated_at'] = datetime.utcnow().isoformat()
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+def main():
+    """python -m app.processors.sanctions_rescreen_processor [--workers N] [--restart]"""
+    import argparse
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Re-screen every user against the sanctions snapshot')
+    parser.add_argument('--workers', type=int, help='screening processes (default SANCTIONS_RESCREEN_WORKERS)')
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start from the first user')
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        result = SanctionsRescreenProcessor(
+            app.config['SANCTIONS_SNAPSHOT_PATH'],
+            app.config['SANCTIONS_RESCREEN_CHECKPOINT_PATH'],
+            args.workers or app.config['SANCTIONS_RESCREEN_WORKERS'],
+            args.chunk_size,
+            app.config['SANCTIONS_MATCH_THRESHOLD'],
+            app.config['SANCTIONS_CACHE_SIZE']
+        ).run(args.restart)
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+from app.repositories.fraud_repository import FraudRepository
+from app.services.shadow_scoring import LIVE_FLAGGED, RECORD, RULES_DIFFER, SHADOW_FLAGGED
+from app.utils.logger import get_logger
+from app.utils.metrics import Histogram
+from typing import Dict, Iterator, List, Tuple
+import json
+import os
+import uuid
+
+logger = get_logger(__name__)
+
+# Scoring time bounds in microseconds
+LATENCY_BUCKETS_US = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+class _Confusion:
+    """Flag counts against analyst decisions: rejected is fraud, approved is not, None is unlabelled"""
+    
+    def __init__(self):
+        self.flagged = 0
+        self.true_positive = 0
+        self.false_positive = 0
+        self.false_negative = 0
+    
+    def add(self, flagged: bool, status: str):
+        self.flagged += flagged
+        if status == 'rejected':
+            if flagged:
+                self.true_positive += 1
+            else:
+                self.false_negative += 1
+        elif status == 'approved' and flagged:
+            self.false_positive += 1
+    
+    def summary(self) -> Dict:
+        labelled = self.true_positive + self.false_positive
+        actual = self.true_positive + self.false_negative
+        return {
+            'flagged': self.flagged,
+            'precision': self.true_positive / labelled if labelled else None,
+            'recall': self.true_positive / actual if actual else None
+        }
+
+class ShadowReportProcessor:
+    """
+    Summarize shadow scoring logs against the live scorer.
+    
+    Each candidate's log is streamed in batches. Only analyst decisions
+    are labels: a check's status otherwise comes from the live scorer
+    itself (approved when it did not flag, rejected by automated review),
+    which would credit live and penalise any disagreeing candidate by
+    construction. Since only live-flagged checks reach an analyst, recall
+    is measured over fraud the live scorer caught; checks only the
+    candidate flagged stay unlabelled and are counted as shadow_only so
+    they can be sampled for review. Unlabelled checks count towards flag
+    and latency figures only.
+    """
+    
+    def __init__(self, log_dir: str, batch_size: int = 5000):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.fraud_repo = FraudRepository()
+    
+    def report(self) -> Dict[str, Dict]:
+        names = sorted(f[:-4] for f in os.listdir(self.log_dir) if f.endswith('.bin'))
+        return {name: self.summarize(os.path.join(self.log_dir, f"{name}.bin")) for name in names}
+    
+    def summarize(self, path: str) -> Dict:
+        live, shadow = _Confusion(), _Confusion()
+        live_us, shadow_us = Histogram(LATENCY_BUCKETS_US), Histogram(LATENCY_BUCKETS_US)
+        records = disagreements = rules_differ = unlabelled = shadow_only = 0
+        
+        for batch in self._batches(path):
+            statuses = self.fraud_repo.get_reviewed_statuses(check_id for check_id, *_ in batch)
+            for check_id, flags, live_time, shadow_time in batch:
+                status = statuses.get(check_id)
+                live_flagged, shadow_flagged = bool(flags & LIVE_FLAGGED), bool(flags & SHADOW_FLAGGED)
+                if status is None:
+                    unlabelled += 1
+                    shadow_only += shadow_flagged and not live_flagged
+                live.add(live_flagged, status)
+                shadow.add(shadow_flagged, status)
+                live_us.observe(live_time)
+                shadow_us.observe(shadow_time)
+                records += 1
+                disagreements += live_flagged != shadow_flagged
+                rules_differ += bool(flags & RULES_DIFFER)
+        
+        live_summary, shadow_summary = live.summary(), shadow.summary()
+        live_latency, shadow_latency = live_us.snapshot(), shadow_us.snapshot()
+        return {
+            'records': records,
+            'unlabelled': unlabelled,
+            'shadow_only': shadow_only,
+            'disagreements': disagreements,
+            'disagreement_rate': disagreements / records if records else 0.0,
+            'rules_differ': rules_differ,
+            'live': dict(live_summary, latency_us=live_latency),
+            'shadow': dict(shadow_summary, latency_us=shadow_latency),
+            'precision_delta': shadow_summary['precision'] - live_summary['precision']
+            if shadow_summary['precision'] is not None and live_summary['precision'] is not None else None,
+            'latency_delta_us': {
+                key: shadow_latency[key] - live_latency[key] for key in ('mean', 'p50', 'p95', 'p99')
+            }
+        }
+    
+    def _batches(self, path: str) -> Iterator[List[Tuple[str, int, int, int]]]:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(RECORD.size * self.batch_size)
+                whole = len(chunk) - len(chunk) % RECORD.size  # a torn last record is skipped
+                if not whole:
+                    return
+                yield [
+                    (str(uuid.UUID(bytes=key)), flags, live_time, shadow_time)
+                    for key, flags, _, _, live_time, shadow_time in RECORD.iter_unpack(chunk[:whole])
+                ]
+
+def main():
+    """python -m app.processors.shadow_report_processor [--log-dir DIR] [--output FILE]"""
+    import argparse
+    from app import create_app
+    
+    parser = argparse.ArgumentParser(description='Compare shadow fraud scorers with the live scorer')
+    parser.add_argument('--log-dir', help='shadow log directory (default SHADOW_LOG_DIR)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        report = ShadowReportProcessor(args.log_dir or app.config['SHADOW_LOG_DIR']).report()
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
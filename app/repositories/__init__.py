@@ -5,6 +5,9 @@ from app.repositories.payment_repository import PaymentRepository
 from app.repositories.settlement_repository import SettlementRepository
 from app.repositories.fraud_repository import FraudRepository
 from app.repositories.compliance_repository import ComplianceRepository
+from app.repositories.device_repository import DeviceRepository
+from app.repositories.link_repository import LinkRepository
+from app.repositories.unit_of_work import unit_of_work
 
 __all__ = [
     'UserRepository',
@@ -14,6 +17,9 @@ __all__ = [
     'SettlementRepository',
     'FraudRepository',
     'ComplianceRepository',
+    'DeviceRepository',
+    'LinkRepository',
+    'unit_of_work',
 ]
 
 
@@ -1,7 +1,10 @@
 from app.repositories.base_repository import BaseRepository
 from app.models.account import Account, Wallet
 from typing import Optional, List
+from decimal import Decimal
+from sqlalchemy import update
 from app import db
+from app.repositories.unit_of_work import commit
 
 class AccountRepository(BaseRepository):
     def __init__(self):
@@ -22,9 +25,142 @@ class AccountRepository(BaseRepository):
         return Wallet.query.filter_by(
             account_id=account_id,
             wallet_type=wallet_type,
-            currency=currency
+            currency=currency,
+            shard=0
         ).first()
     
+    def get_wallet_shards(self, account_id: str, wallet_type: str, currency: str) -> List[Wallet]:
+        """All sub-wallets of a wallet, primary (shard 0) first"""
+        return Wallet.query.filter_by(
+            account_id=account_id,
+            wallet_type=wallet_type,
+            currency=currency
+        ).order_by(Wallet.shard).all()
+    
+    def lock_wallets(self, wallet_ids: List[str]) -> List[Wallet]:
+        """SELECT ... FOR UPDATE in wallet id order, so lockers never deadlock"""
+        return Wallet.query.filter(
+            Wallet.id.in_(set(wallet_ids))
+        ).order_by(Wallet.id).with_for_update().populate_existing().all()
+    
+    def credit(self, wallet_id: str, amount: Decimal) -> Optional[Wallet]:
+        """Atomically add amount to balance and available balance"""
+        return self._change_balance(wallet_id, available=amount, balance=amount)
+    
+    def credit_frozen(self, wallet_id: str, amount: Decimal) -> Optional[Wallet]:
+        """Atomically add amount to balance as frozen funds the owner cannot spend yet"""
+        return self._change_balance(wallet_id, balance=amount, frozen=amount)
+    
+    def unfreeze(self, wallet_id: str, amount: Decimal) -> Optional[Wallet]:
+        """Atomically move amount from frozen back to available; None if less is frozen"""
+        return self._change_balance(wallet_id, available=amount, frozen=-amount)
+    
+    def debit_frozen(self, wallet_id: str, amount: Decimal) -> Optional[Wallet]:
+        """Atomically remove amount of frozen funds from the wallet; None if less is frozen"""
+        return self._change_balance(wallet_id, balance=-amount, frozen=-amount)
+    
+    def debit(self, wallet_id: str, amount: Decimal, sweep_wallet_ids: List[str] = ()) -> Optional[Wallet]:
+        """
+        Atomically remove amount; returns None if available balance is insufficient.
+        
+        When sweep_wallet_ids (sibling shards) are given and the wallet alone
+        cannot cover amount, the shortfall is swept in from them first.
+        """
+        wallet = self._change_balance(wallet_id, available=-amount, balance=-amount)
+        if wallet or not sweep_wallet_ids:
+            return wallet
+        self.lock_wallets([wallet_id, *sweep_wallet_ids])
+        self._sweep(wallet_id, sweep_wallet_ids, amount)
+        return self._change_balance(wallet_id, available=-amount, balance=-amount)
+    
+    def freeze(self, wallet_id: str, amount: Decimal, sweep_wallet_ids: List[str] = ()) -> Optional[Wallet]:
+        """Atomically move amount from available to frozen; None if insufficient"""
+        wallet = self._change_balance(wallet_id, available=-amount, frozen=amount)
+        if wallet or not sweep_wallet_ids:
+            return wallet
+        self.lock_wallets([wallet_id, *sweep_wallet_ids])
+        self._sweep(wallet_id, sweep_wallet_ids, amount)
+        return self._change_balance(wallet_id, available=-amount, frozen=amount)
+    
+    def transfer(self, source_wallet_id: str, destination_wallet_id: str, amount: Decimal,
+                 credit_amount: Optional[Decimal] = None, sweep_wallet_ids: List[str] = (),
+                 hold: bool = False) -> bool:
+        """
+        Debit source and credit destination within the current transaction.
+        
+        All rows involved (including any source shards to sweep from) are
+        locked in wallet id order before any of them changes, so two transfers
+        running in opposite directions cannot deadlock. With hold, the credit
+        lands as frozen funds (see credit_frozen). Returns False, leaving the
+        wallets untouched, if the source cannot cover amount.
+        """
+        credit_amount = amount if credit_amount is None else credit_amount
+        self.lock_wallets([source_wallet_id, destination_wallet_id, *sweep_wallet_ids])
+        
+        if sweep_wallet_ids:
+            self._sweep(source_wallet_id, sweep_wallet_ids, amount)
+        if not self._change_balance(source_wallet_id, available=-amount, balance=-amount):
+            return False
+        if hold:
+            self.credit_frozen(destination_wallet_id, credit_amount)
+        else:
+            self.credit(destination_wallet_id, credit_amount)
+        return True
+    
+    def _sweep(self, wallet_id: str, shard_ids: List[str], amount: Decimal) -> Decimal:
+        """
+        Move available funds from sibling shards into wallet until it covers amount.
+        
+        Callers must hold the row locks (see lock_wallets). Only the shortfall
+        is moved, and nothing moves when the shards together cannot cover it,
+        so a failed debit leaves every shard as it was. Returns the amount swept.
+        """
+        wallets = {
+            w.id: w for w in
+            Wallet.query.filter(Wallet.id.in_([wallet_id, *shard_ids])).populate_existing().all()
+        }
+        shortfall = amount - wallets[wallet_id].available_balance
+        shards = [wallets[i] for i in shard_ids if i in wallets and i != wallet_id]
+        if shortfall <= 0 or sum(w.available_balance for w in shards) < shortfall:
+            return Decimal('0.00')
+        
+        swept = Decimal('0.00')
+        for shard in sorted(shards, key=lambda w: w.available_balance, reverse=True):
+            take = min(shard.available_balance, shortfall - swept)
+            if take <= 0:
+                break
+            self._change_balance(shard.id, available=-take, balance=-take)
+            self._change_balance(wallet_id, available=take, balance=take)
+            swept += take
+        return swept
+    
+    def _change_balance(self, wallet_id: str, available: Decimal = Decimal('0.00'),
+                        balance: Decimal = Decimal('0.00'), frozen: Decimal = Decimal('0.00')) -> Optional[Wallet]:
+        """
+        Apply balance deltas with a single conditional UPDATE ... RETURNING.
+        
+        A negative available (or frozen) delta is guarded by available_balance
+        >= amount (frozen_balance >= amount) in the WHERE clause, so concurrent
+        debits serialize on the row lock and can never overdraw the wallet or
+        lose each other's updates. The returned row refreshes the wallet
+        already loaded in the session, if any.
+        """
+        criteria = [Wallet.id == wallet_id]
+        if available < 0:
+            criteria.append(Wallet.available_balance >= -available)
+        if frozen < 0:
+            criteria.append(Wallet.frozen_balance >= -frozen)
+        
+        stmt = update(Wallet).where(*criteria).values(
+            available_balance=Wallet.available_balance + available,
+            balance=Wallet.balance + balance,
+            frozen_balance=Wallet.frozen_balance + frozen
+        ).returning(Wallet).execution_options(
+            synchronize_session=False,
+            populate_existing=True
+        )
+        return db.session.scalars(stmt).first()
+    
     def get_or_create_wallet(self, account_id: str, wallet_type: str, currency: str) -> Wallet:
         wallet = self.get_wallet(account_id, wallet_type, currency)
         if not wallet:
@@ -34,7 +170,7 @@ class AccountRepository(BaseRepository):
                 currency=currency
             )
             db.session.add(wallet)
-            db.session.commit()
+            commit()
         return wallet
 
 
@@ -1,4 +1,5 @@
 from app import db
+from app.repositories.unit_of_work import commit
 from typing import List, Optional, Type, TypeVar
 
 T = TypeVar('T')
@@ -10,6 +11,12 @@ class BaseRepository:
     def get_by_id(self, id: str) -> Optional[T]:
         return self.model.query.get(id)
     
+    def get_many(self, ids) -> List[T]:
+        ids = [i for i in set(ids) if i]
+        if not ids:
+            return []
+        return self.model.query.filter(self.model.id.in_(ids)).all()
+    
     def get_all(self, limit: Optional[int] = None, offset: int = 0) -> List[T]:
         query = self.model.query
         if limit:
@@ -18,16 +25,33 @@ class BaseRepository:
     
     def create(self, entity: T) -> T:
         db.session.add(entity)
-        db.session.commit()
+        commit()
         return entity
     
     def update(self, entity: T) -> T:
-        db.session.commit()
+        commit()
+        return entity
+    
+    def add(self, entity: T) -> T:
+        """Flush-only create: stage entity without committing"""
+        db.session.add(entity)
+        db.session.flush()
+        return entity
+    
+    def add_all(self, entities: List[T]) -> List[T]:
+        """Flush-only bulk create"""
+        db.session.add_all(entities)
+        db.session.flush()
+        return entities
+    
+    def save(self, entity: T) -> T:
+        """Flush-only update: write pending changes without committing"""
+        db.session.flush()
         return entity
     
     def delete(self, entity: T) -> bool:
         db.session.delete(entity)
-        db.session.commit()
+        commit()
         return True
     
     def count(self) -> int:
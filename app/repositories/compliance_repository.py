@@ -1,6 +1,8 @@
 from app.repositories.base_repository import BaseRepository
 from app.models.compliance import ComplianceCheck, KYCRecord
-from typing import Optional, List
+from datetime import datetime
+from typing import Dict, Optional, List, Tuple
+from sqlalchemy import insert, or_, tuple_, update
 from app import db
 
 class ComplianceRepository(BaseRepository):
@@ -21,7 +23,66 @@ class ComplianceRepository(BaseRepository):
             query = query.limit(limit)
         return query.order_by(ComplianceCheck.created_at.desc()).all()
     
-    def get_pending_kyc(self, limit: int = 100) -> List[KYCRecord]:
-        return KYCRecord.query.filter_by(status='pending').limit(limit).all()
+    def get_pending_kyc(self, limit: int = 100, after: Optional[Tuple[datetime, str]] = None) -> List[KYCRecord]:
+        """Pending records oldest first, strictly after the (created_at, id) keyset after"""
+        query = KYCRecord.query.filter(KYCRecord.status == 'pending')
+        if after:
+            query = query.filter(tuple_(KYCRecord.created_at, KYCRecord.id) > tuple_(*after))
+        return query.order_by(KYCRecord.created_at, KYCRecord.id).limit(limit).all()
+    
+    def claim_pending_kyc(self, worker_id: str, limit: int, now: datetime, lease_until: datetime) -> List[KYCRecord]:
+        """
+        Lease up to limit unclaimed (or lease-expired) pending records to
+        worker_id, oldest first. Rows locked by a concurrent claim are skipped.
+        """
+        claimed = KYCRecord.query.filter(
+            KYCRecord.status == 'pending',
+            or_(KYCRecord.claim_expires_at.is_(None), KYCRecord.claim_expires_at <= now)
+        ).order_by(
+            KYCRecord.created_at, KYCRecord.id
+        ).limit(limit).with_for_update(skip_locked=True).all()
+        for kyc_record in claimed:
+            kyc_record.claimed_by = worker_id
+            kyc_record.claim_expires_at = lease_until
+        return claimed
+    
+    def update_kyc_records(self, rows: List[Dict], worker_id: str) -> set:
+        """
+        Bulk update KYC records by primary key, given as column dicts with
+        'id', where they are still pending and claimed by worker_id. Records
+        another worker reclaimed after the lease expired are left alone.
+        Returns the ids that were updated.
+        """
+        if not rows:
+            return set()
+        # Lock the rows we still own, so the claim cannot move before the UPDATE
+        owned = {
+            record_id for (record_id,) in db.session.query(KYCRecord.id).filter(
+                KYCRecord.id.in_([row['id'] for row in rows]),
+                KYCRecord.claimed_by == worker_id,
+                KYCRecord.status == 'pending'
+            ).with_for_update()
+        }
+        rows = [row for row in rows if row['id'] in owned]
+        if rows:
+            db.session.execute(
+                update(KYCRecord).where(KYCRecord.claimed_by == worker_id, KYCRecord.status == 'pending'),
+                rows,
+                execution_options={'synchronize_session': None}
+            )
+        return owned
+    
+    def get_users_with_reference(self, user_ids: List[str], provider_reference: str) -> set:
+        """Which of user_ids already have a check with provider_reference"""
+        rows = db.session.query(ComplianceCheck.user_id).filter(
+            ComplianceCheck.user_id.in_(user_ids),
+            ComplianceCheck.provider_reference == provider_reference
+        )
+        return {user_id for (user_id,) in rows}
+    
+    def insert_checks(self, rows: List[Dict]):
+        """Bulk insert compliance check rows given as column dicts"""
+        if rows:
+            db.session.execute(insert(ComplianceCheck), rows)
 
 
@@ -0,0 +1,117 @@
+from app.repositories.base_repository import BaseRepository
+from app.models.fraud import DeviceReputation, DeviceUser, FraudCheck
+from typing import Dict, Iterator, Optional
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from app import db
+
+# Final fraud check statuses counted per device
+_OUTCOME_COLUMNS = {'approved': 'approved_count', 'rejected': 'rejected_count'}
+
+class DeviceRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(DeviceReputation)
+    
+    def get_by_fingerprint(self, fingerprint: str) -> Optional[DeviceReputation]:
+        return db.session.get(DeviceReputation, fingerprint)
+    
+    def record_sighting(self, fingerprint: str, user_id: str, seen_at: datetime, status: str) -> bool:
+        """
+        Count one fraud check on a device; returns True if the device was new.
+        
+        Counters are incremented atomically in the database, so concurrent
+        checks on the same device never lose each other's updates.
+        """
+        new_user = self._add_user(fingerprint, user_id, seen_at)
+        values = {
+            'last_seen_at': seen_at,
+            'check_count': DeviceReputation.check_count + 1,
+            'user_count': DeviceReputation.user_count + int(new_user),
+        }
+        if status in _OUTCOME_COLUMNS:
+            column = _OUTCOME_COLUMNS[status]
+            values[column] = getattr(DeviceReputation, column) + 1
+        stmt = update(DeviceReputation).where(
+            DeviceReputation.fingerprint == fingerprint
+        ).values(**values).execution_options(synchronize_session=False)
+        
+        if db.session.execute(stmt).rowcount:
+            return False
+        try:
+            with db.session.begin_nested():
+                db.session.add(DeviceReputation(
+                    fingerprint=fingerprint,
+                    first_seen_at=seen_at,
+                    last_seen_at=seen_at,
+                    user_count=int(new_user),
+                    check_count=1,
+                    approved_count=int(status == 'approved'),
+                    rejected_count=int(status == 'rejected')
+                ))
+            return True
+        except IntegrityError:
+            db.session.execute(stmt)
+            return False
+    
+    def _add_user(self, fingerprint: str, user_id: str, seen_at: datetime) -> bool:
+        if db.session.get(DeviceUser, (fingerprint, user_id)) is not None:
+            return False
+        try:
+            with db.session.begin_nested():
+                db.session.add(DeviceUser(fingerprint=fingerprint, user_id=user_id, first_seen_at=seen_at))
+            return True
+        except IntegrityError:
+            return False
+    
+    def add_outcomes(self, fingerprint: str, deltas: Dict[str, int]):
+        """Adjust outcome counters by per-status deltas, e.g. {'pending': -1, 'rejected': 1}"""
+        values = {
+            _OUTCOME_COLUMNS[status]: getattr(DeviceReputation, _OUTCOME_COLUMNS[status]) + delta
+            for status, delta in deltas.items() if status in _OUTCOME_COLUMNS and delta
+        }
+        if values:
+            db.session.execute(
+                update(DeviceReputation).where(
+                    DeviceReputation.fingerprint == fingerprint
+                ).values(**values).execution_options(synchronize_session=False)
+            )
+    
+    def iter_fingerprints(self, since: Optional[datetime] = None, batch_size: int = 50000) -> Iterator[str]:
+        """Stream known fingerprints, optionally only those first seen at or after since"""
+        stmt = select(DeviceReputation.fingerprint)
+        if since:
+            stmt = stmt.where(DeviceReputation.first_seen_at >= since)
+        return db.session.scalars(stmt.execution_options(yield_per=batch_size))
+    
+    def rebuild_from_fraud_checks(self) -> int:
+        """Replace the whole index with aggregates of fraud_checks; returns devices written"""
+        db.session.execute(delete(DeviceUser))
+        db.session.execute(delete(DeviceReputation))
+        
+        has_device = FraudCheck.device_fingerprint.isnot(None)
+        db.session.execute(insert(DeviceUser).from_select(
+            ['fingerprint', 'user_id', 'first_seen_at'],
+            select(
+                FraudCheck.device_fingerprint,
+                FraudCheck.user_id,
+                func.min(FraudCheck.created_at)
+            ).where(has_device).group_by(FraudCheck.device_fingerprint, FraudCheck.user_id)
+        ))
+        
+        def outcome_count(status):
+            return func.coalesce(func.sum(case((FraudCheck.status == status, 1), else_=0)), 0)
+        
+        return db.session.execute(insert(DeviceReputation).from_select(
+            ['fingerprint', 'first_seen_at', 'last_seen_at', 'user_count', 'check_count',
+             'approved_count', 'rejected_count'],
+            select(
+                FraudCheck.device_fingerprint,
+                func.min(FraudCheck.created_at),
+                func.max(FraudCheck.created_at),
+                func.count(FraudCheck.user_id.distinct()),
+                func.count(FraudCheck.id),
+                outcome_count('approved'),
+                outcome_count('rejected')
+            ).where(has_device).group_by(FraudCheck.device_fingerprint)
+        )).rowcount
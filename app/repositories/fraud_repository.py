@@ -1,7 +1,13 @@
 from app.repositories.base_repository import BaseRepository
-from app.models.fraud import FraudCheck, RiskScore
-from typing import Optional, List
+from app.models.fraud import FraudCheck, RiskScore, UserBaseline
+from app.models.transaction import Transaction
+from typing import Dict, Optional, List, Tuple
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from datetime import datetime
 from app import db
+import uuid
 
 class FraudRepository(BaseRepository):
     def __init__(self):
@@ -16,6 +22,92 @@ class FraudRepository(BaseRepository):
             FraudCheck.status == 'pending'
         ).limit(limit).all()
     
+    def claim_pending_high_risk(self, limit: int, after: Optional[Tuple[datetime, str]] = None
+                                ) -> List[Tuple[FraudCheck, Transaction]]:
+        """
+        Lock up to limit pending high-risk checks with their transactions, in
+        (created_at, id) order after the keyset after.
+        
+        Rows locked by another worker are skipped (FOR UPDATE SKIP LOCKED on
+        databases that support it), so concurrent workers claim disjoint
+        batches. Locks are held until the caller commits.
+        """
+        query = db.session.query(FraudCheck, Transaction).join(
+            Transaction, Transaction.id == FraudCheck.transaction_id
+        ).filter(
+            FraudCheck.status == 'pending',
+            FraudCheck.risk_level.in_(['high', 'critical'])
+        )
+        if after:
+            query = query.filter(tuple_(FraudCheck.created_at, FraudCheck.id) > tuple_(*after))
+        return query.order_by(FraudCheck.created_at, FraudCheck.id).limit(limit).with_for_update(
+            skip_locked=True, of=FraudCheck
+        ).all()
+    
+    def bulk_set_status(self, check_ids: List[str], status: str, decision_reason: str):
+        """Set status and decision reason on many checks in one statement"""
+        if check_ids:
+            db.session.execute(
+                update(FraudCheck).where(FraudCheck.id.in_(check_ids)).values(
+                    status=status,
+                    decision_reason=decision_reason,
+                    updated_at=datetime.utcnow()
+                ).execution_options(synchronize_session=False)
+            )
+    
+    def get_review_page(self, limit: int, after: Optional[Tuple] = None) -> List[FraudCheck]:
+        """
+        Checks awaiting manual review, highest (risk_score, amount, id) first,
+        strictly after the keyset after. Served from the partial review-queue
+        index, so each page costs O(limit) however deep the queue is.
+        """
+        query = FraudCheck.query.filter(FraudCheck.status == 'review')
+        if after:
+            query = query.filter(tuple_(FraudCheck.risk_score, FraudCheck.amount, FraudCheck.id) < tuple_(*after))
+        return query.order_by(
+            FraudCheck.risk_score.desc(), FraudCheck.amount.desc(), FraudCheck.id.desc()
+        ).limit(limit).all()
+    
+    def claim_reviews(self, analyst_id: str, limit: int, now: datetime, lease_until: datetime) -> List[FraudCheck]:
+        """
+        Lease up to limit unleased (or lease-expired) review items to analyst_id,
+        in queue priority order. Rows locked by a concurrent claim are skipped.
+        """
+        claimed = FraudCheck.query.filter(
+            FraudCheck.status == 'review',
+            db.or_(FraudCheck.review_lease_expires_at.is_(None), FraudCheck.review_lease_expires_at <= now)
+        ).order_by(
+            FraudCheck.risk_score.desc(), FraudCheck.amount.desc(), FraudCheck.id.desc()
+        ).limit(limit).with_for_update(skip_locked=True).all()
+        for fraud_check in claimed:
+            fraud_check.review_claimed_by = analyst_id
+            fraud_check.review_lease_expires_at = lease_until
+        return claimed
+    
+    def lock_review(self, check_id: str) -> Optional[FraudCheck]:
+        return FraudCheck.query.filter_by(id=check_id).with_for_update().populate_existing().first()
+    
+    def get_review_queue_stats(self, now: datetime) -> Dict:
+        """Queue depth, leased items and oldest item, from the two status indexes"""
+        depth, leased = db.session.query(
+            func.count(FraudCheck.id),
+            func.count(FraudCheck.id).filter(FraudCheck.review_lease_expires_at > now)
+        ).filter(FraudCheck.status == 'review').one()
+        oldest = db.session.query(func.min(FraudCheck.created_at)).filter(FraudCheck.status == 'review').scalar()
+        return {'depth': depth, 'leased': leased, 'oldest_created_at': oldest}
+    
+    def get_reviewed_statuses(self, check_ids) -> Dict[str, str]:
+        """Status per fraud check id for checks an analyst decided, in one query"""
+        check_ids = [c for c in set(check_ids) if c]
+        if not check_ids:
+            return {}
+        rows = db.session.query(FraudCheck.id, FraudCheck.status).filter(
+            FraudCheck.id.in_(check_ids),
+            FraudCheck.reviewed_by.isnot(None),
+            FraudCheck.status.in_(['approved', 'rejected'])
+        ).all()
+        return dict(rows)
+    
     def get_by_user(self, user_id: str, limit: Optional[int] = None) -> List[FraudCheck]:
         query = FraudCheck.query.filter_by(user_id=user_id)
         if limit:
@@ -23,8 +115,161 @@ class FraudRepository(BaseRepository):
         return query.order_by(FraudCheck.created_at.desc()).all()
     
     def get_latest_risk_score(self, user_id: str) -> Optional[RiskScore]:
-        return RiskScore.query.filter_by(user_id=user_id).order_by(
-            RiskScore.calculated_at.desc()
-        ).first()
-
-
+        return RiskScore.query.filter_by(user_id=user_id, is_current=True).first()
+    
+    def get_current_scores(self, user_ids) -> Dict[str, float]:
+        """Live overall risk score per user, in one query"""
+        user_ids = [u for u in set(user_ids) if u]
+        if not user_ids:
+            return {}
+        rows = db.session.query(RiskScore.user_id, RiskScore.overall_score).filter(
+            RiskScore.user_id.in_(user_ids),
+            RiskScore.is_current.is_(True)
+        ).all()
+        return {user_id: score for user_id, score in rows}
+    
+    def apply_risk_sample(self, user_id: str, scores: Dict[str, float], window: int) -> RiskScore:
+        """
+        Fold one sample of component scores into the user's live RiskScore row.
+        
+        Each column moves toward the sample by 1 / min(sample_count + 1, window),
+        a running mean over the first window samples and an exponential moving
+        average after that. The update is a single UPDATE ... RETURNING on the
+        user's live row, so concurrent checks never lose each other's samples.
+        The first sample inserts the row; if a concurrent insert wins the
+        unique index the sample is applied as an update instead. Components
+        left out of a sample (e.g. skipped by a degraded check) stay NULL
+        until a sample carries them.
+        """
+        weight = case(
+            (RiskScore.sample_count + 1 < window, 1.0 / (RiskScore.sample_count + 1)),
+            else_=1.0 / window
+        )
+        stmt = update(RiskScore).where(
+            RiskScore.user_id == user_id,
+            RiskScore.is_current.is_(True)
+        ).values(
+            sample_count=RiskScore.sample_count + 1,
+            calculated_at=datetime.utcnow(),
+            **{
+                # A component missing so far (NULL) takes the sample as is
+                column: func.coalesce(getattr(RiskScore, column) + (value - getattr(RiskScore, column)) * weight, value)
+                for column, value in scores.items()
+            }
+        ).returning(RiskScore).execution_options(
+            synchronize_session=False,
+            populate_existing=True
+        )
+        
+        risk_score = db.session.scalars(stmt).first()
+        if risk_score:
+            return risk_score
+        
+        try:
+            with db.session.begin_nested():
+                risk_score = RiskScore(user_id=user_id, is_current=True, sample_count=1, **scores)
+                db.session.add(risk_score)
+            return risk_score
+        except IntegrityError:
+            return db.session.scalars(stmt).first()
+    
+    def snapshot_current_scores(self, batch_size: int = 5000) -> int:
+        """Copy every live row changed since its last snapshot into history; returns rows copied"""
+        history = aliased(RiskScore)
+        newer_snapshot = select(history.id).where(
+            history.user_id == RiskScore.user_id,
+            history.is_current.is_(False),
+            history.calculated_at >= RiskScore.calculated_at
+        ).exists()
+        columns = [c for c in RiskScore.__table__.columns if c.key not in ('id', 'is_current')]
+        rows = db.session.execute(
+            select(*columns).where(
+                RiskScore.is_current.is_(True),
+                ~newer_snapshot
+            ).execution_options(yield_per=batch_size)
+        ).mappings()
+        
+        copied = 0
+        pending = []
+        for row in rows:
+            pending.append(dict(row, id=str(uuid.uuid4()), is_current=False))
+            if len(pending) >= batch_size:
+                db.session.execute(insert(RiskScore), pending)
+                copied += len(pending)
+                pending = []
+        if pending:
+            db.session.execute(insert(RiskScore), pending)
+            copied += len(pending)
+        return copied
+    
+    def downsample_history(self, daily_before: datetime, delete_before: datetime) -> int:
+        """
+        Thin history snapshots: keep all after daily_before, the last one per
+        user per day before it, and none before delete_before. Returns rows deleted.
+        """
+        expired = db.session.execute(
+            delete(RiskScore).where(
+                RiskScore.is_current.is_(False),
+                RiskScore.calculated_at < delete_before
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        
+        later = aliased(RiskScore)
+        later_same_day = select(later.id).where(
+            later.user_id == RiskScore.user_id,
+            later.is_current.is_(False),
+            func.date(later.calculated_at) == func.date(RiskScore.calculated_at),
+            later.calculated_at > RiskScore.calculated_at
+        ).exists()
+        thinned = db.session.execute(
+            delete(RiskScore).where(
+                RiskScore.is_current.is_(False),
+                RiskScore.calculated_at < daily_before,
+                later_same_day
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        return expired + thinned
+    
+    def get_baseline_stats(self, user_ids) -> Dict[str, bytes]:
+        """Packed behavioural baseline per user, in one query"""
+        user_ids = [u for u in set(user_ids) if u]
+        if not user_ids:
+            return {}
+        rows = db.session.query(UserBaseline.user_id, UserBaseline.stats).filter(
+            UserBaseline.user_id.in_(user_ids)
+        ).all()
+        return {user_id: stats for user_id, stats in rows}
+    
+    def lock_baselines(self, user_ids, empty_stats: bytes) -> Dict[str, UserBaseline]:
+        """
+        Lock the baseline rows of user_ids for update, creating missing ones
+        with empty_stats. Rows are locked in user_id order so concurrent
+        batches cannot deadlock; a row created concurrently is locked instead.
+        """
+        user_ids = sorted(u for u in set(user_ids) if u)
+        if not user_ids:
+            return {}
+        query = UserBaseline.query.filter(UserBaseline.user_id.in_(user_ids)).order_by(
+            UserBaseline.user_id
+        ).with_for_update().populate_existing()
+        baselines = {b.user_id: b for b in query.all()}
+        
+        for user_id in user_ids:
+            if user_id in baselines:
+                continue
+            try:
+                with db.session.begin_nested():
+                    baseline = UserBaseline(user_id=user_id, sample_count=0, stats=empty_stats)
+                    db.session.add(baseline)
+                baselines[user_id] = baseline
+            except IntegrityError:
+                baselines[user_id] = UserBaseline.query.filter_by(user_id=user_id).with_for_update().one()
+        return baselines
+    
+    def delete_all_baselines(self) -> int:
+        return db.session.execute(delete(UserBaseline)).rowcount
+    
+    def insert_baselines(self, rows: List[Dict]):
+        """Bulk insert baseline rows given as column dicts"""
+        if rows:
+            db.session.execute(insert(UserBaseline), rows)
@@ -0,0 +1,126 @@
+from app.repositories.base_repository import BaseRepository
+from app.models.fraud import LinkCluster, LinkEdge, LinkNode
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+# Final fraud check statuses counted per cluster
+_OUTCOME_COLUMNS = {'approved': 'approved_count', 'rejected': 'rejected_count'}
+
+class LinkRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(LinkCluster)
+    
+    def get_node(self, node: str) -> Optional[LinkNode]:
+        return db.session.get(LinkNode, node, populate_existing=True)
+    
+    def get_node_clusters(self, nodes: List[str]) -> List[Tuple[str, int, LinkCluster]]:
+        """(node, node user_count, cluster) for each existing node, in one query"""
+        nodes = [n for n in set(nodes) if n]
+        if not nodes:
+            return []
+        rows = db.session.execute(
+            select(LinkNode.node, LinkNode.user_count, LinkCluster).join(
+                LinkCluster, LinkCluster.id == LinkNode.cluster_id
+            ).where(LinkNode.node.in_(nodes))
+        )
+        return [tuple(row) for row in rows]
+    
+    def get_cluster_ids(self, nodes: List[str]) -> Dict[str, str]:
+        rows = db.session.query(LinkNode.node, LinkNode.cluster_id).filter(LinkNode.node.in_(nodes))
+        return dict(rows.all())
+    
+    def create_node(self, node: str, cluster_id: Optional[str] = None, user_count: int = 0) -> bool:
+        """
+        Insert a node, in a new single-node cluster unless cluster_id is given.
+        Returns False if the node was created concurrently.
+        """
+        try:
+            with db.session.begin_nested():
+                if cluster_id is None:
+                    cluster = LinkCluster(user_count=1 if node.startswith('u:') else 0)
+                    db.session.add(cluster)
+                    db.session.flush()
+                    cluster_id = cluster.id
+                db.session.add(LinkNode(node=node, cluster_id=cluster_id, user_count=user_count))
+            return True
+        except IntegrityError:
+            return False
+    
+    def add_edge(self, node: str, user_id: str) -> bool:
+        """Record that user_id was seen on node; returns False if already known"""
+        if db.session.get(LinkEdge, (node, user_id)) is not None:
+            return False
+        try:
+            with db.session.begin_nested():
+                db.session.add(LinkEdge(node=node, user_id=user_id))
+            return True
+        except IntegrityError:
+            return False
+    
+    def increment_node_users(self, node: str):
+        db.session.execute(
+            update(LinkNode).where(LinkNode.node == node).values(
+                user_count=LinkNode.user_count + 1
+            ).execution_options(synchronize_session=False)
+        )
+    
+    def lock_clusters(self, cluster_ids) -> List[LinkCluster]:
+        """Lock clusters for update in id order, so concurrent merges cannot deadlock"""
+        return LinkCluster.query.filter(LinkCluster.id.in_(list(cluster_ids))).order_by(
+            LinkCluster.id
+        ).with_for_update().populate_existing().all()
+    
+    def merge_clusters(self, root: LinkCluster, others: List[LinkCluster]):
+        """Move every node of others into root and fold their counters into it"""
+        other_ids = [c.id for c in others]
+        db.session.execute(
+            update(LinkNode).where(LinkNode.cluster_id.in_(other_ids)).values(
+                cluster_id=root.id
+            ).execution_options(synchronize_session=False)
+        )
+        for column in ('user_count', 'check_count', 'approved_count', 'rejected_count'):
+            setattr(root, column, getattr(root, column) + sum(getattr(c, column) for c in others))
+        db.session.flush()
+        db.session.execute(
+            delete(LinkCluster).where(LinkCluster.id.in_(other_ids)).execution_options(synchronize_session=False)
+        )
+        for cluster in others:
+            db.session.expunge(cluster)
+    
+    def record_check(self, cluster_id: str, status: str):
+        values = {'check_count': LinkCluster.check_count + 1}
+        if status in _OUTCOME_COLUMNS:
+            column = _OUTCOME_COLUMNS[status]
+            values[column] = getattr(LinkCluster, column) + 1
+        self._update_counters(cluster_id, values)
+    
+    def add_outcomes(self, cluster_id: str, deltas: Dict[str, int]):
+        """Adjust outcome counters by per-status deltas, e.g. {'pending': -1, 'rejected': 1}"""
+        values = {
+            _OUTCOME_COLUMNS[status]: getattr(LinkCluster, _OUTCOME_COLUMNS[status]) + delta
+            for status, delta in deltas.items() if status in _OUTCOME_COLUMNS and delta
+        }
+        if values:
+            self._update_counters(cluster_id, values)
+    
+    def _update_counters(self, cluster_id: str, values: Dict):
+        db.session.execute(
+            update(LinkCluster).where(LinkCluster.id == cluster_id).values(**values).execution_options(
+                synchronize_session=False
+            )
+        )
+    
+    def get_largest_clusters(self, limit: int = 20) -> List[LinkCluster]:
+        return LinkCluster.query.order_by(LinkCluster.user_count.desc()).limit(limit).all()
+    
+    def delete_all(self):
+        db.session.execute(delete(LinkEdge))
+        db.session.execute(delete(LinkNode))
+        db.session.execute(delete(LinkCluster))
+    
+    def insert_rows(self, model, rows: List[Dict]):
+        """Bulk insert rows given as column dicts into a link table"""
+        if rows:
+            db.session.execute(insert(model), rows)
@@ -1,12 +1,19 @@
 from app.repositories.base_repository import BaseRepository
 from app.models.settlement import Settlement, SettlementBatch, SettlementStatus
-from typing import Optional, List
+from typing import Dict, Optional, List
+from sqlalchemy import insert
 from app import db
+from app.repositories.unit_of_work import commit
 
 class SettlementRepository(BaseRepository):
     def __init__(self):
         super().__init__(Settlement)
     
+    def insert_settlements(self, rows: List[Dict]):
+        """Bulk insert settlement rows given as column dicts"""
+        if rows:
+            db.session.execute(insert(Settlement), rows)
+    
     def get_pending_batches(self) -> List[SettlementBatch]:
         return SettlementBatch.query.filter_by(status=SettlementStatus.PENDING).all()
     
@@ -17,7 +24,7 @@ class SettlementRepository(BaseRepository):
             status=SettlementStatus.PENDING
         )
         db.session.add(batch)
-        db.session.commit()
+        commit()
         return batch
     
     def get_all_batches(self, limit: Optional[int] = None) -> List[SettlementBatch]:
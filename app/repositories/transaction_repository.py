@@ -1,9 +1,11 @@
 from app.repositories.base_repository import BaseRepository
+from app.models.settlement import Settlement
 from app.models.transaction import Transaction, TransactionStatus
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from app import db
 from datetime import datetime, timedelta
-from sqlalchemy import and_, or_
+from decimal import Decimal
+from sqlalchemy import and_, or_, func, select, tuple_, update
 
 class TransactionRepository(BaseRepository):
     def __init__(self):
@@ -35,6 +37,40 @@ class TransactionRepository(BaseRepository):
             )
         ).limit(limit).all()
     
+    def get_pending_settlement_page(self, currency: str, limit: int, after: Optional[str] = None) -> List:
+        """
+        (id, account_id, amount, fee, net_amount) of completed, unsettled
+        transactions in currency, in id order strictly after the id after,
+        read from ix_transactions_unsettled. The rows stay locked until the
+        caller commits; rows locked by another settlement run are skipped.
+        """
+        query = db.session.query(
+            Transaction.id,
+            Transaction.account_id,
+            Transaction.amount,
+            Transaction.fee,
+            Transaction.net_amount
+        ).filter(
+            Transaction.status == TransactionStatus.COMPLETED,
+            Transaction.settlement_id.is_(None),
+            Transaction.currency == currency
+        )
+        if after:
+            query = query.filter(Transaction.id > after)
+        return query.order_by(Transaction.id).limit(limit).with_for_update(skip_locked=True).all()
+    
+    def link_settlements(self, transaction_ids: List[str]):
+        """Point each transaction at its settlement row, in one correlated UPDATE"""
+        if transaction_ids:
+            db.session.execute(
+                update(Transaction).where(Transaction.id.in_(transaction_ids)).values(
+                    settlement_id=select(Settlement.id).where(
+                        Settlement.transaction_id == Transaction.id
+                    ).scalar_subquery(),
+                    updated_at=datetime.utcnow()
+                ).execution_options(synchronize_session=False)
+            )
+    
     def get_by_reference(self, reference_id: str) -> Optional[Transaction]:
         return Transaction.query.filter_by(reference_id=reference_id).first()
     
@@ -50,24 +86,166 @@ class TransactionRepository(BaseRepository):
             query = query.filter_by(account_id=account_id)
         return query.order_by(Transaction.created_at).all()
     
+    def get_existing_references(self, reference_ids) -> set:
+        reference_ids = [r for r in set(reference_ids) if r]
+        if not reference_ids:
+            return set()
+        rows = db.session.query(Transaction.reference_id).filter(
+            Transaction.reference_id.in_(reference_ids)
+        )
+        return {reference_id for (reference_id,) in rows}
+    
+    def lock_many(self, transaction_ids: List[str]) -> List[Transaction]:
+        """SELECT ... FOR UPDATE in id order, refreshed from the locked rows"""
+        return Transaction.query.filter(
+            Transaction.id.in_(set(transaction_ids))
+        ).order_by(Transaction.id).with_for_update().populate_existing().all()
+    
+    def get_amount_band_page(self, low: Decimal, high: Decimal, limit: int,
+                             user_range: Tuple[Optional[str], Optional[str]] = (None, None),
+                             after: Optional[Tuple[str, datetime, str]] = None,
+                             since: Optional[datetime] = None, until: Optional[datetime] = None,
+                             exclude_statuses=()) -> List:
+        """
+        Transactions with low <= amount < high of users in [user_range), in
+        (user_id, created_at, id) order strictly after the keyset after. Rows
+        carry only the columns needed to replay them, and each page is a
+        range scan of ix_transactions_user_created.
+        """
+        query = db.session.query(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.destination_wallet_id,
+            Transaction.compliance_check_id,
+            Transaction.created_at
+        ).filter(
+            Transaction.amount >= low,
+            Transaction.amount < high
+        )
+        first_user, end_user = user_range
+        if first_user is not None:
+            query = query.filter(Transaction.user_id >= first_user)
+        if end_user is not None:
+            query = query.filter(Transaction.user_id < end_user)
+        if since:
+            query = query.filter(Transaction.created_at >= since)
+        if until:
+            query = query.filter(Transaction.created_at < until)
+        if exclude_statuses:
+            query = query.filter(Transaction.status.notin_(exclude_statuses))
+        if after:
+            query = query.filter(tuple_(Transaction.user_id, Transaction.created_at, Transaction.id) > tuple_(*after))
+        return query.order_by(Transaction.user_id, Transaction.created_at, Transaction.id).limit(limit).all()
+    
+    def link_compliance_checks(self, links: List[Dict]):
+        """Set compliance_check_id on many transactions, given as {'id', 'compliance_check_id'} dicts"""
+        if links:
+            db.session.execute(update(Transaction), links)
+    
+    def resolve_provisional(self, transaction_id: str, compliance_check_id: Optional[str]) -> bool:
+        """
+        Record the deferred compliance check of a provisional transaction and
+        clear compliance_pending; the caller releases or reverses the held
+        balance change. Returns False when the transaction was not waiting
+        for a check, e.g. another worker already resolved it.
+        """
+        result = db.session.execute(
+            update(Transaction).where(
+                Transaction.id == transaction_id,
+                Transaction.compliance_pending
+            ).values(
+                compliance_pending=False,
+                compliance_check_id=compliance_check_id,
+                updated_at=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+    
+    def get_provisional_page(self, before: datetime, limit: int = 500,
+                             after: Optional[Tuple[datetime, str]] = None) -> List:
+        """
+        (id, created_at) of transactions created before before that still wait
+        for a deferred compliance check, oldest first, strictly after the
+        (created_at, id) keyset after
+        """
+        query = db.session.query(Transaction.id, Transaction.created_at).filter(
+            Transaction.compliance_pending,
+            Transaction.created_at < before
+        )
+        if after:
+            query = query.filter(tuple_(Transaction.created_at, Transaction.id) > tuple_(*after))
+        return query.order_by(Transaction.created_at, Transaction.id).limit(limit).all()
+    
+    def count_by_user(self, user_ids, days: int = 30) -> dict:
+        """Transaction count per user over the last days, in one grouped query"""
+        user_ids = [u for u in set(user_ids) if u]
+        if not user_ids:
+            return {}
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        rows = db.session.query(
+            Transaction.user_id,
+            func.count(Transaction.id)
+        ).filter(
+            Transaction.user_id.in_(user_ids),
+            Transaction.created_at >= cutoff
+        ).group_by(Transaction.user_id)
+        return dict(rows.all())
+    
     def get_user_transaction_summary(self, user_id: str, days: int = 30) -> dict:
         """Get transaction summary for fraud/risk analysis"""
         cutoff = datetime.utcnow() - timedelta(days=days)
-        transactions = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.created_at >= cutoff
-            )
-        ).all()
-        
-        return {
-            'total_count': len(transactions),
-            'total_amount': sum(float(t.amount) for t in transactions),
-            'avg_amount': sum(float(t.amount) for t in transactions) / len(transactions) if transactions else 0,
+        return self.summarize(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= cutoff
+        )
+    
+    def build_summary_query(self, *criteria):
+        """Aggregate query with one row per (transaction_type, status) matching criteria"""
+        return db.session.query(
+            Transaction.transaction_type,
+            Transaction.status,
+            func.count(Transaction.id).label('count'),
+            func.sum(Transaction.amount).label('total_amount'),
+            func.sum(Transaction.fee).label('total_fees')
+        ).filter(*criteria).group_by(
+            Transaction.transaction_type,
+            Transaction.status
+        )
+    
+    def summarize(self, *criteria) -> dict:
+        """Count, Decimal-exact totals and by_type/by_status breakdowns in one query"""
+        summary = {
+            'total_count': 0,
+            'total_amount': Decimal('0.00'),
+            'total_fees': Decimal('0.00'),
+            'avg_amount': Decimal('0.00'),
             'by_type': {},
             'by_status': {},
         }
+        
+        for transaction_type, status, count, total_amount, total_fees in self.build_summary_query(*criteria):
+            total_amount = self._to_decimal(total_amount)
+            status = status.value if isinstance(status, TransactionStatus) else status
+            
+            summary['total_count'] += count
+            summary['total_amount'] += total_amount
+            summary['total_fees'] += self._to_decimal(total_fees)
+            for key, group in (('by_type', transaction_type), ('by_status', status)):
+                bucket = summary[key].setdefault(group, {'count': 0, 'total_amount': Decimal('0.00')})
+                bucket['count'] += count
+                bucket['total_amount'] += total_amount
+        
+        if summary['total_count']:
+            summary['avg_amount'] = (summary['total_amount'] / summary['total_count']).quantize(Decimal('0.01'))
+        return summary
+    
+    @staticmethod
+    def _to_decimal(value) -> Decimal:
+        # Some drivers (e.g. SQLite) return SUM(Numeric) as float
+        if value is None:
+            return Decimal('0.00')
+        return value if isinstance(value, Decimal) else Decimal(str(value)).quantize(Decimal('0.01'))
     
-    # TODO: Add indexes for better query performance
     # TODO: Implement transaction archiving for old transactions
 
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from app import db
+
+_DEPTH_KEY = 'unit_of_work_depth'
+
+def in_unit_of_work() -> bool:
+    """Return True while the current session is inside a unit of work"""
+    return db.session.info.get(_DEPTH_KEY, 0) > 0
+
+def commit():
+    """Commit the session, or only flush it when inside a unit of work"""
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+@contextmanager
+def unit_of_work():
+    """
+    Group repository writes into a single commit.
+    
+    Inside the block repository create/update/delete calls flush instead of
+    committing. The outermost block commits once on success and rolls back
+    everything on error, so a failed step never leaves half-written state.
+    """
+    session = db.session
+    depth = session.info.get(_DEPTH_KEY, 0)
+    session.info[_DEPTH_KEY] = depth + 1
+    try:
+        yield session
+    except Exception:
+        session.info[_DEPTH_KEY] = depth
+        if depth == 0:
+            session.rollback()
+        raise
+    session.info[_DEPTH_KEY] = depth
+    if depth == 0:
+        session.commit()
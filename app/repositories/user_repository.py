@@ -1,6 +1,9 @@
 from app.repositories.base_repository import BaseRepository
 from app.models.user import User
-from typing import Optional, List
+from app.models.transaction import Transaction
+from datetime import datetime
+from typing import Iterator, Optional, List, Tuple
+from sqlalchemy import func, select, update
 from app import db
 
 class UserRepository(BaseRepository):
@@ -13,9 +16,89 @@ class UserRepository(BaseRepository):
     def get_by_username(self, username: str) -> Optional[User]:
         return User.query.filter_by(username=username).first()
     
-    def get_users_requiring_kyc(self, amount_threshold: float) -> List[User]:
-        # TODO: Implement proper query to find users requiring KYC based on transaction amounts
-        # This is a placeholder - needs proper implementation
-        return User.query.filter_by(kyc_status='pending').all()
-
-
+    def set_kyc_statuses(self, verified_ids: List[str], rejected_ids: List[str]):
+        """
+        Bulk-set kyc_status, one statement per outcome. A rejection never
+        downgrades a user already verified by another document. These
+        UPDATEs bypass the ORM, so callers must drop the users from
+        feature_cache after commit.
+        """
+        if verified_ids:
+            db.session.execute(
+                update(User).where(User.id.in_(verified_ids)).values(
+                    kyc_status='verified', updated_at=datetime.utcnow()
+                ).execution_options(synchronize_session=False)
+            )
+        if rejected_ids:
+            db.session.execute(
+                update(User).where(User.id.in_(rejected_ids), User.kyc_status != 'verified').values(
+                    kyc_status='rejected', updated_at=datetime.utcnow()
+                ).execution_options(synchronize_session=False)
+            )
+    
+    def iter_names(self, chunk_size: int, after: Optional[str] = None) -> Iterator[List[Tuple[str, str, str]]]:
+        """
+        (id, first_name, last_name) of every user in id order after the id
+        after, in chunks. Rows come from a server-side cursor on a connection
+        of its own, so memory stays flat and the caller's session can commit
+        between chunks.
+        """
+        stmt = select(User.id, User.first_name, User.last_name).order_by(User.id)
+        if after:
+            stmt = stmt.where(User.id > after)
+        with db.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+            for chunk in result.partitions(chunk_size):
+                yield [tuple(row) for row in chunk]
+    
+    def get_users_requiring_kyc(self, amount_threshold: float, since: datetime, until: Optional[datetime] = None,
+                                limit: int = 1000, after: Optional[str] = None,
+                                exclude_statuses=()) -> List:
+        """
+        One page of users without verified KYC whose transaction volume in
+        [since, until) reaches amount_threshold, in user id order strictly
+        after the id after. Rows are (user_id, email, kyc_status, volume,
+        transaction_count, last_transaction_at).
+        
+        Volume is one grouped aggregate walked in user id order over
+        ix_transactions_user_created, so a page stops reading as soon as it
+        has limit qualifying users and the next page starts from the last
+        one's id, however many users there are.
+        """
+        volume = func.sum(Transaction.amount)
+        query = db.session.query(
+            Transaction.user_id,
+            User.email,
+            User.kyc_status,
+            volume.label('volume'),
+            func.count().label('transaction_count'),
+            func.max(Transaction.created_at).label('last_transaction_at')
+        ).join(
+            User, User.id == Transaction.user_id
+        ).filter(
+            Transaction.created_at >= since,
+            User.kyc_status != 'verified'
+        )
+        if until:
+            query = query.filter(Transaction.created_at < until)
+        if exclude_statuses:
+            query = query.filter(Transaction.status.notin_(exclude_statuses))
+        if after:
+            query = query.filter(Transaction.user_id > after)
+        return query.group_by(
+            Transaction.user_id, User.email, User.kyc_status
+        ).having(
+            volume >= amount_threshold
+        ).order_by(Transaction.user_id).limit(limit).all()
+    
+    def iter_users_requiring_kyc(self, amount_threshold: float, since: datetime, until: Optional[datetime] = None,
+                                 page_size: int = 1000, after: Optional[str] = None,
+                                 exclude_statuses=()) -> Iterator[List]:
+        """Pages of get_users_requiring_kyc until the last one; each page is its own short query"""
+        while True:
+            page = self.get_users_requiring_kyc(amount_threshold, since, until, page_size, after, exclude_statuses)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = page[-1].user_id
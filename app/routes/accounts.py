@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.middleware.auth_middleware import require_admin
 from app.services.account_service import AccountService
 from app.utils.logger import get_logger
 
@@ -48,4 +49,22 @@ def get_balance(account_id):
         logger.error(f"Error getting balance: {str(e)}")
         return jsonify({'error': 'Failed to get balance'}), 500
 
-
+@accounts_bp.route('/<account_id>/wallet-shards', methods=['POST'])
+@jwt_required()
+@require_admin
+def enable_wallet_sharding(account_id):
+    """Opt a hot account into sharded main wallets; body {"shards": K}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        shards = data.get('shards')
+        if not isinstance(shards, int) or isinstance(shards, bool):
+            return jsonify({'error': 'Shard count is required'}), 400
+        
+        account = account_service.enable_wallet_sharding(account_id, shards)
+        return jsonify(account.to_dict(include_balance=True)), 200
+    except ValueError as e:
+        status = 404 if str(e) == "Account not found" else 400
+        return jsonify({'error': str(e)}), status
+    except Exception as e:
+        logger.error(f"Error enabling wallet sharding: {str(e)}")
+        return jsonify({'error': 'Failed to enable wallet sharding'}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.middleware.auth_middleware import require_admin
 from app.services.compliance_service import ComplianceService
 from app.utils.logger import get_logger
 
@@ -7,6 +8,8 @@ logger = get_logger(__name__)
 compliance_bp = Blueprint('compliance', __name__)
 compliance_service = ComplianceService()
 
+MAX_PAGE_SIZE = 1000
+
 @compliance_bp.route('/kyc', methods=['POST'])
 @jwt_required()
 def submit_kyc():
@@ -38,6 +41,22 @@ def get_kyc_status():
         logger.error(f"Error getting KYC status: {str(e)}")
         return jsonify({'error': 'Failed to get KYC status'}), 500
 
+@compliance_bp.route('/kyc/required', methods=['GET'])
+@jwt_required()
+@require_admin
+def list_users_requiring_kyc():
+    """Users whose recent volume requires KYC, by user id; follow next_cursor for the next page"""
+    try:
+        limit = max(1, min(int(request.args.get('limit') or 100), MAX_PAGE_SIZE))
+        days = request.args.get('days', type=int)
+        page = compliance_service.kyc_required_page(limit, request.args.get('cursor'), days)
+        return jsonify(page), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error listing users requiring KYC: {str(e)}")
+        return jsonify({'error': 'Failed to list users requiring KYC'}), 500
+
 @compliance_bp.route('/checks', methods=['GET'])
 @jwt_required()
 def get_compliance_checks():
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.middleware.auth_middleware import require_admin
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,6 +14,8 @@ def transaction_report():
         from app.repositories.transaction_repository import TransactionRepository
         from datetime import datetime, timedelta
         
+        from app.models.transaction import Transaction
+        
         transaction_repo = TransactionRepository()
         
         # Get date range from query params
@@ -20,19 +23,16 @@ def transaction_report():
         start_date = datetime.utcnow() - timedelta(days=days)
         end_date = datetime.utcnow()
         
-        transactions = transaction_repo.get_by_date_range(start_date, end_date)
-        user_transactions = [t for t in transactions if t.user_id == user_id]
-        
-        total_amount = sum(float(t.amount) for t in user_transactions)
-        total_fees = sum(float(t.fee) for t in user_transactions)
+        summary = transaction_repo.summarize(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= start_date,
+            Transaction.created_at <= end_date
+        )
         
-        by_type = {}
-        by_status = {}
-        
-        for t in user_transactions:
-            by_type[t.transaction_type] = by_type.get(t.transaction_type, 0) + 1
-            status = t.status.value if hasattr(t.status, 'value') else t.status
-            by_status[status] = by_status.get(status, 0) + 1
+        total_amount = float(summary['total_amount'])
+        total_fees = float(summary['total_fees'])
+        by_type = {k: v['count'] for k, v in summary['by_type'].items()}
+        by_status = {k: v['count'] for k, v in summary['by_status'].items()}
         
         report = {
             'period': {
@@ -41,7 +41,7 @@ def transaction_report():
                 'days': days
             },
             'summary': {
-                'total_transactions': len(user_transactions),
+                'total_transactions': summary['total_count'],
                 'total_amount': total_amount,
                 'total_fees': total_fees,
                 'net_amount': total_amount - total_fees
@@ -116,4 +116,16 @@ def fraud_report():
         logger.error(f"Error generating fraud report: {str(e)}")
         return jsonify({'error': 'Failed to generate fraud report'}), 500
 
+@reports_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+@require_admin
+def metrics_report():
+    """Process-local counters and stage timings (ms), optionally filtered by name prefix"""
+    try:
+        from app.utils.metrics import metrics
+        return jsonify(metrics.snapshot(request.args.get('prefix', ''))), 200
+    except Exception as e:
+        logger.error(f"Error generating metrics report: {str(e)}")
+        return jsonify({'error': 'Failed to generate metrics report'}), 500
+
 
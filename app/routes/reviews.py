@@ -0,0 +1,98 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.middleware.auth_middleware import require_admin
+from app.services.review_queue_service import ReviewQueueService
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+reviews_bp = Blueprint('reviews', __name__)
+review_service = ReviewQueueService()
+
+MAX_PAGE_SIZE = 200
+
+def _limit(value, default: int) -> int:
+    return max(1, min(int(value or default), MAX_PAGE_SIZE))
+
+@reviews_bp.route('', methods=['GET'])
+@jwt_required()
+@require_admin
+def list_reviews():
+    """One page of the queue, highest priority first; follow next_cursor for the next page"""
+    try:
+        page = review_service.list_page(_limit(request.args.get('limit'), 50), request.args.get('cursor'))
+        return jsonify(page), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error listing review queue: {str(e)}")
+        return jsonify({'error': 'Failed to list review queue'}), 500
+
+@reviews_bp.route('/stats', methods=['GET'])
+@jwt_required()
+@require_admin
+def review_stats():
+    try:
+        return jsonify(review_service.stats()), 200
+    except Exception as e:
+        logger.error(f"Error getting review queue stats: {str(e)}")
+        return jsonify({'error': 'Failed to get review queue stats'}), 500
+
+@reviews_bp.route('/claim', methods=['POST'])
+@jwt_required()
+@require_admin
+def claim_reviews():
+    try:
+        analyst_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+        claimed = review_service.claim(analyst_id, _limit(data.get('limit'), 1))
+        return jsonify([c.to_dict() for c in claimed]), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error claiming reviews: {str(e)}")
+        return jsonify({'error': 'Failed to claim reviews'}), 500
+
+@reviews_bp.route('/<check_id>/renew', methods=['POST'])
+@jwt_required()
+@require_admin
+def renew_review(check_id):
+    try:
+        fraud_check = review_service.renew(check_id, get_jwt_identity())
+        return jsonify(fraud_check.to_dict()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error renewing review lease: {str(e)}")
+        return jsonify({'error': 'Failed to renew review lease'}), 500
+
+@reviews_bp.route('/<check_id>/release', methods=['POST'])
+@jwt_required()
+@require_admin
+def release_review(check_id):
+    try:
+        fraud_check = review_service.release(check_id, get_jwt_identity())
+        return jsonify(fraud_check.to_dict()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error releasing review: {str(e)}")
+        return jsonify({'error': 'Failed to release review'}), 500
+
+@reviews_bp.route('/<check_id>/decision', methods=['POST'])
+@jwt_required()
+@require_admin
+def decide_review(check_id):
+    try:
+        data = request.get_json() or {}
+        if data.get('decision') not in ('approve', 'reject'):
+            return jsonify({'error': "Decision must be 'approve' or 'reject'"}), 400
+        
+        fraud_check = review_service.decide(
+            check_id, get_jwt_identity(), data.get('decision'), data.get('reason')
+        )
+        return jsonify(fraud_check.to_dict()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error recording review decision: {str(e)}")
+        return jsonify({'error': 'Failed to record review decision'}), 500
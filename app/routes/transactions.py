@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.transaction_service import TransactionService
 from app.utils.logger import get_logger
@@ -38,6 +38,42 @@ def create_transaction():
         logger.error(f"Error creating transaction: {str(e)}")
         return jsonify({'error': 'Failed to create transaction'}), 500
 
+@transactions_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def create_transaction_batch():
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        items = data.get('transactions') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty transactions list is required'}), 400
+        
+        max_size = current_app.config['TRANSACTION_BATCH_MAX_SIZE']
+        if len(items) > max_size:
+            return jsonify({'error': f'Batch exceeds maximum size of {max_size}'}), 400
+        
+        results = transaction_service.create_transactions_batch(user_id, items)
+        created = sum(1 for r in results if r['status'] == 'created')
+        
+        if created == len(results):
+            status_code = 201
+        elif created:
+            status_code = 207
+        else:
+            status_code = 400
+        
+        return jsonify({
+            'created': created,
+            'rejected': len(results) - created,
+            'results': results
+        }), status_code
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating transaction batch: {str(e)}")
+        return jsonify({'error': 'Failed to create transaction batch'}), 500
+
 @transactions_bp.route('', methods=['GET'])
 @jwt_required()
 def get_transactions():
@@ -1,7 +1,8 @@
 from app.repositories.account_repository import AccountRepository
 from app.repositories.user_repository import UserRepository
-from app.models.account import Account, Wallet
+from app.models.account import Account, Wallet, merge_wallet_shards
 from app import db
+from app.repositories.unit_of_work import unit_of_work
 from typing import Dict, Optional
 from app.utils.logger import get_logger
 import uuid
@@ -9,6 +10,8 @@ import uuid
 logger = get_logger(__name__)
 
 class AccountService:
+    MAX_WALLET_SHARDS = 32
+    
     def __init__(self):
         self.account_repo = AccountRepository()
         self.user_repo = UserRepository()
@@ -28,17 +31,17 @@ class AccountService:
             status='active'
         )
         
-        account = self.account_repo.create(account)
-        
-        # Create main wallet
-        wallet = Wallet(
-            id=str(uuid.uuid4()),
-            account_id=account.id,
-            wallet_type='main',
-            currency=account.currency
-        )
-        db.session.add(wallet)
-        db.session.commit()
+        with unit_of_work():
+            account = self.account_repo.create(account)
+            
+            # Create main wallet
+            wallet = Wallet(
+                id=str(uuid.uuid4()),
+                account_id=account.id,
+                wallet_type='main',
+                currency=account.currency
+            )
+            self.account_repo.add(wallet)
         
         logger.info(f"Account created: {account.id} for user {user_id}")
         return account
@@ -61,9 +64,45 @@ class AccountService:
             'total_balance': total_balance,
             'total_available': total_available,
             'total_frozen': total_frozen,
-            'wallets': [w.to_dict() for w in wallets]
+            'wallets': merge_wallet_shards(wallets)
         }
     
+    def enable_wallet_sharding(self, account_id: str, shards: int) -> Account:
+        """
+        Spread the account's main wallets over `shards` sub-wallet rows.
+        
+        Credits are then distributed across the shards and debits sweep from
+        them as needed. Shrinking is not supported: existing shards may hold
+        funds, so the shard count only ever grows.
+        """
+        account = self.account_repo.get_by_id(account_id)
+        if not account:
+            raise ValueError("Account not found")
+        if shards < 1 or shards > self.MAX_WALLET_SHARDS:
+            raise ValueError(f"Shard count must be between 1 and {self.MAX_WALLET_SHARDS}")
+        if shards < (account.wallet_shards or 1):
+            raise ValueError("Shard count cannot be reduced")
+        
+        with unit_of_work():
+            primaries = account.wallets.filter_by(wallet_type='main', shard=0).all()
+            new_shards = [
+                Wallet(
+                    id=str(uuid.uuid4()),
+                    account_id=account.id,
+                    wallet_type=primary.wallet_type,
+                    currency=primary.currency,
+                    shard=shard
+                )
+                for primary in primaries
+                for shard in range(account.wallet_shards or 1, shards)
+            ]
+            self.account_repo.add_all(new_shards)
+            account.wallet_shards = shards
+            self.account_repo.update(account)
+        
+        logger.info(f"Account {account_id} main wallets sharded {shards} ways")
+        return account
+    
     # TODO: Add account suspension
     # TODO: Add account closure
     # TODO: Add account limits management
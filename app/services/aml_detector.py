@@ -0,0 +1,305 @@
+from app import db
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.velocity_store import parse_window, to_cents, to_epoch
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.utils.logger import get_logger
+import threading
+import uuid
+
+logger = get_logger(__name__)
+
+# Transactions that never moved money are not part of a pattern
+EXCLUDED_STATUSES = (TransactionStatus.FAILED, TransactionStatus.CANCELLED)
+
+# Records between sweeps of users whose window has emptied
+_SWEEP_EVERY = 10000
+
+# (user_id, epoch, cents, counterparty)
+WindowEntry = Tuple[str, float, int, Optional[str]]
+
+class _UserWindow:
+    """Near-threshold transactions of one user, oldest first, with running totals"""
+    
+    __slots__ = ('entries', 'cents', 'counterparties')
+    
+    def __init__(self):
+        self.entries = deque()  # (epoch, cents, counterparty)
+        self.cents = 0
+        self.counterparties = Counter()
+    
+    def expire(self, cutoff: float):
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            _, cents, counterparty = entries.popleft()
+            self.cents -= cents
+            if counterparty is not None:
+                self.counterparties[counterparty] -= 1
+                if not self.counterparties[counterparty]:
+                    del self.counterparties[counterparty]
+    
+    def add(self, epoch: float, cents: int, counterparty: Optional[str]):
+        self.entries.append((epoch, cents, counterparty))
+        self.cents += cents
+        if counterparty is not None:
+            self.counterparties[counterparty] += 1
+
+class InMemoryStructuringBackend:
+    """Per-process windows"""
+    
+    def __init__(self):
+        self._users: Dict[str, _UserWindow] = {}
+        self._lock = threading.Lock()
+        self._records = 0
+    
+    def add_many(self, entries: Iterable[WindowEntry], window_seconds: int):
+        with self._lock:
+            for user_id, epoch, cents, counterparty in entries:
+                window = self._users.get(user_id)
+                if window is None:
+                    window = self._users[user_id] = _UserWindow()
+                window.expire(epoch - window_seconds)
+                window.add(epoch, cents, counterparty)
+                self._records += 1
+                if self._records % _SWEEP_EVERY == 0:
+                    self._sweep(epoch - window_seconds)
+    
+    def read(self, user_id: str, cutoff: float) -> Tuple[int, int, Set[str]]:
+        """(count, cents, counterparties) of the user's entries after cutoff"""
+        with self._lock:
+            window = self._users.get(user_id)
+            if window is None:
+                return 0, 0, set()
+            window.expire(cutoff)
+            return len(window.entries), window.cents, set(window.counterparties)
+    
+    def clear(self):
+        with self._lock:
+            self._users = {}
+    
+    def _sweep(self, cutoff: float):
+        """Drop users whose whole window has expired; called with the lock held"""
+        for user_id in [u for u, w in self._users.items() if not w.entries or w.entries[-1][0] <= cutoff]:
+            del self._users[user_id]
+
+class RedisStructuringBackend:
+    """
+    Windows in Redis, one sorted set per user scored by epoch, so every
+    process assesses against the near-threshold transactions of all of them.
+    
+    Accepts any client exposing the redis-py sorted set/pipeline API. A
+    user's set only ever holds near-threshold amounts of one window, so
+    reading it whole stays cheap.
+    """
+    
+    def __init__(self, client, prefix: str = 'aml'):
+        self.client = client
+        self.prefix = prefix
+    
+    @classmethod
+    def from_url(cls, url: str, prefix: str = 'aml') -> 'RedisStructuringBackend':
+        import redis
+        return cls(redis.Redis.from_url(url), prefix)
+    
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}:{user_id}"
+    
+    def add_many(self, entries: Iterable[WindowEntry], window_seconds: int, chunk_size: int = 5000):
+        pipe = self.client.pipeline(transaction=False)
+        pending = 0
+        for user_id, epoch, cents, counterparty in entries:
+            key = self._key(user_id)
+            # The random prefix keeps equal splits from collapsing into one member
+            pipe.zadd(key, {f"{uuid.uuid4().hex}:{cents}:{counterparty or ''}": epoch})
+            pipe.zremrangebyscore(key, '-inf', epoch - window_seconds)
+            pipe.expire(key, window_seconds)
+            pending += 1
+            if pending >= chunk_size:
+                pipe.execute()
+                pending = 0
+        if pending:
+            pipe.execute()
+    
+    def read(self, user_id: str, cutoff: float) -> Tuple[int, int, Set[str]]:
+        """(count, cents, counterparties) of the user's entries after cutoff"""
+        count, cents, counterparties = 0, 0, set()
+        for member in self.client.zrangebyscore(self._key(user_id), f"({cutoff}", '+inf'):
+            member = member.decode() if isinstance(member, bytes) else member
+            _, member_cents, counterparty = member.split(':', 2)
+            count += 1
+            cents += int(member_cents)
+            if counterparty:
+                counterparties.add(counterparty)
+        return count, cents, counterparties
+    
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*", count=1000))
+        for i in range(0, len(keys), 1000):
+            self.client.delete(*keys[i:i + 1000])
+
+class StructuringDetector:
+    """
+    Flags structuring: repeated amounts just under the KYC_REQUIRED_AMOUNT
+    reporting threshold that add up to it inside a rolling window. The
+    transaction that completes the pattern and each later split are flagged.
+    
+    Only near-threshold amounts (at least near_ratio of the threshold and
+    below it) are kept, per user and in arrival order, with running totals
+    of their amount and counterparties (destination wallets). Assessing or
+    recording a transaction expires the user's oldest entries and reads or
+    updates the totals, so each costs amortised constant time whatever the
+    user's history. The windows live in a backend: per process by default,
+    or in Redis (AML_BACKEND=redis) so that splits spread over several
+    worker processes add up. They are rebuilt from the transactions table at
+    startup and fed committed transactions through
+    ComplianceService.observe_transaction.
+    """
+    
+    def __init__(self, threshold: float = 10000.0, window: str = '3d', near_ratio: float = 0.8,
+                 min_count: int = 3, backend=None):
+        self.backend = backend or InMemoryStructuringBackend()
+        self.configure(threshold, window, near_ratio, min_count)
+    
+    def configure(self, threshold: float, window: str, near_ratio: float, min_count: int):
+        if not 0 < near_ratio < 1:
+            raise ValueError(f"AML near-threshold ratio must be between 0 and 1: {near_ratio}")
+        self.threshold_cents = int(round(threshold * 100))
+        self.near_cents = int(round(threshold * near_ratio * 100))
+        self.window = window
+        self.window_seconds = parse_window(window)
+        self.near_ratio = near_ratio
+        self.min_count = max(2, min_count)
+    
+    def init_app(self, app):
+        if app.config['AML_BACKEND'] == 'redis':
+            self.backend = RedisStructuringBackend.from_url(app.config['REDIS_URL'])
+        else:
+            self.backend = InMemoryStructuringBackend()
+        self.configure(
+            app.config['KYC_REQUIRED_AMOUNT'],
+            app.config['AML_STRUCTURING_WINDOW'],
+            app.config['AML_NEAR_THRESHOLD_RATIO'],
+            app.config['AML_STRUCTURING_MIN_COUNT']
+        )
+        if app.config['AML_REBUILD_ON_STARTUP']:
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    logger.warning(f"AML structuring rebuild skipped: {str(e)}")
+    
+    def clone(self) -> 'StructuringDetector':
+        """An empty in-memory detector with the same settings"""
+        return StructuringDetector(self.threshold_cents / 100, self.window, self.near_ratio, self.min_count)
+    
+    def clear(self):
+        self.backend.clear()
+    
+    def is_near_threshold(self, amount) -> bool:
+        return self.near_cents <= to_cents(amount) < self.threshold_cents
+    
+    def assess(self, user_id: str, amount, counterparty: Optional[str] = None, at: Optional[datetime] = None,
+               pending: Iterable[Tuple[int, Optional[str]]] = ()) -> Dict:
+        """
+        AML result for a transaction of amount by user at time at (default now),
+        counting it with the user's window without recording it. pending lists
+        (cents, counterparty) of the user's near-threshold transactions not yet
+        recorded, such as earlier items of the same batch.
+        """
+        epoch = to_epoch(at)
+        pending = list(pending)
+        near = self.is_near_threshold(amount)
+        if near:
+            pending.append((to_cents(amount), counterparty))
+        
+        count, cents, known = self.backend.read(user_id, epoch - self.window_seconds)
+        count += len(pending)
+        cents += sum(c for c, _ in pending)
+        unseen = {c for _, c in pending if c is not None and c not in known}
+        return self._result(count, cents, len(known) + len(unseen), near)
+    
+    def assess_transaction(self, transaction: Transaction, counterparty: Optional[str] = None) -> Dict:
+        """
+        counterparty is the destination wallet the transaction will credit;
+        it defaults to destination_wallet_id, which is only set once the
+        transaction has been processed.
+        """
+        return self.assess(transaction.user_id, transaction.amount, counterparty or transaction.destination_wallet_id,
+                           transaction.created_at)
+    
+    def assess_many(self, transactions: List[Transaction],
+                    counterparties: Optional[List[Optional[str]]] = None) -> List[Dict]:
+        """Results aligned with transactions, each counting the same user's earlier items"""
+        staged: Dict[str, List[Tuple[int, Optional[str]]]] = {}
+        results = []
+        for transaction, counterparty in zip(transactions, counterparties or [None] * len(transactions)):
+            counterparty = counterparty or transaction.destination_wallet_id
+            prior = staged.setdefault(transaction.user_id, [])
+            results.append(self.assess(transaction.user_id, transaction.amount, counterparty,
+                                       transaction.created_at, prior))
+            if self.is_near_threshold(transaction.amount):
+                prior.append((to_cents(transaction.amount), counterparty))
+        return results
+    
+    def record(self, user_id: str, amount, counterparty: Optional[str] = None, at: Optional[datetime] = None):
+        """Add a transaction to the user's window; amounts that are not near the threshold are ignored"""
+        if not self.is_near_threshold(amount):
+            return
+        self.backend.add_many([(user_id, to_epoch(at), to_cents(amount), counterparty)], self.window_seconds)
+    
+    def record_transaction(self, transaction: Transaction):
+        self.record(transaction.user_id, transaction.amount, transaction.destination_wallet_id,
+                    transaction.created_at)
+    
+    def rebuild(self, batch_size: int = 10000) -> int:
+        """Reload every user's window from the transactions table; returns rows read"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+        rows = db.session.query(
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.destination_wallet_id,
+            Transaction.created_at
+        ).filter(
+            Transaction.created_at >= cutoff,
+            Transaction.amount >= Decimal(self.near_cents) / 100,
+            Transaction.amount < Decimal(self.threshold_cents) / 100,
+            Transaction.status.notin_(EXCLUDED_STATUSES)
+        ).order_by(Transaction.created_at).execution_options(yield_per=batch_size)
+        
+        self.clear()
+        row_count = 0
+        entries: List[WindowEntry] = []
+        for user_id, amount, counterparty, created_at in rows:
+            entries.append((user_id, to_epoch(created_at), to_cents(amount), counterparty))
+            row_count += 1
+            if len(entries) >= batch_size:
+                self.backend.add_many(entries, self.window_seconds)
+                entries = []
+        if entries:
+            self.backend.add_many(entries, self.window_seconds)
+        logger.info(f"AML structuring windows rebuilt from {row_count} near-threshold transactions")
+        return row_count
+    
+    def _result(self, count: int, cents: int, counterparties: int, near: bool) -> Dict:
+        # Only the split amounts themselves are flagged, not everything the user does afterwards
+        flagged = near and count >= self.min_count and cents >= self.threshold_cents
+        if flagged:
+            # Each further split and each further recipient makes the pattern less incidental
+            risk_score = min(1.0, 0.7 + 0.1 * (count - self.min_count) + 0.05 * max(counterparties - 1, 0))
+        else:
+            risk_score = 0.2 + 0.4 * min(count / self.min_count, 1.0) * min(cents / self.threshold_cents, 1.0)
+        return {
+            'flagged': flagged,
+            'risk_score': round(risk_score, 4),
+            'details': {
+                'structuring': flagged,
+                'window': self.window,
+                'near_threshold_count': count,
+                'near_threshold_amount': cents / 100,
+                'counterparties': counterparties
+            }
+        }
+
+aml_detector = StructuringDetector()
@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional
+import math
+import struct
+
+# Transaction types with their own histogram bin; anything else shares the last one
+TRANSACTION_TYPES = ['deposit', 'withdrawal', 'transfer', 'payment', 'refund']
+_TYPE_BINS = len(TRANSACTION_TYPES) + 1
+_TYPE_INDEX = {name: i for i, name in enumerate(TRANSACTION_TYPES)}
+
+# count, amount mean, amount M2, 24 hour-of-day counts, transaction type counts
+_RECORD = struct.Struct(f"<Idd24I{_TYPE_BINS}I")
+RECORD_SIZE = _RECORD.size
+
+# |z| at which an amount counts as maximally unusual in pattern_match
+_ZSCORE_SCALE = 6.0
+
+def _bin_rarity(counts, index: int) -> float:
+    """1 - how common bin index is relative to the user's most common bin (add-one smoothed)"""
+    return 1.0 - (counts[index] + 1) / (max(counts) + 1)
+
+class Baseline:
+    """
+    Constant-memory behavioural statistics of one user's transactions.
+    
+    Amounts are tracked with Welford's online mean and variance; hour of day
+    and transaction type as fixed histograms. update and score are O(1), and
+    the whole state packs into a RECORD_SIZE-byte record.
+    """
+    
+    __slots__ = ('count', 'mean', 'm2', 'hours', 'types')
+    
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 hours: Optional[List[int]] = None, types: Optional[List[int]] = None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.hours = hours or [0] * 24
+        self.types = types or [0] * _TYPE_BINS
+    
+    @classmethod
+    def unpack(cls, record: Optional[bytes]) -> 'Baseline':
+        if not record:
+            return cls()
+        values = _RECORD.unpack(record)
+        return cls(values[0], values[1], values[2], list(values[3:27]), list(values[27:]))
+    
+    def pack(self) -> bytes:
+        return _RECORD.pack(self.count, self.mean, self.m2, *self.hours, *self.types)
+    
+    def copy(self) -> 'Baseline':
+        return Baseline(self.count, self.mean, self.m2, list(self.hours), list(self.types))
+    
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+    
+    def update(self, amount: float, hour: int, transaction_type: str):
+        """Fold one transaction into the statistics"""
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.hours[hour] += 1
+        self.types[_TYPE_INDEX.get(transaction_type, _TYPE_BINS - 1)] += 1
+    
+    def score(self, amount: float, hour: int, transaction_type: str, min_samples: int = 10,
+              zscore_threshold: float = 3.0, rarity_threshold: float = 0.9) -> Dict:
+        """
+        Compare one transaction with the baseline.
+        
+        Returns the amount z-score, the rarity (0 common .. 1 never seen) of its
+        hour and type, an overall pattern_match in [0, 1] and the anomalies
+        found. Anomalies need min_samples transactions of history.
+        """
+        stddev = self.stddev
+        if stddev > 0:
+            zscore = (amount - self.mean) / stddev
+        else:
+            zscore = 0.0 if self.count < 2 or amount == self.mean else math.copysign(_ZSCORE_SCALE, amount - self.mean)
+        zscore = max(-_ZSCORE_SCALE, min(zscore, _ZSCORE_SCALE))
+        hour_rarity = _bin_rarity(self.hours, hour)
+        type_rarity = _bin_rarity(self.types, _TYPE_INDEX.get(transaction_type, _TYPE_BINS - 1))
+        
+        anomalies = []
+        if self.count >= min_samples:
+            if abs(zscore) >= zscore_threshold:
+                anomalies.append('amount_outlier')
+            if hour_rarity >= rarity_threshold:
+                anomalies.append('unusual_hour')
+            if type_rarity >= rarity_threshold:
+                anomalies.append('unusual_type')
+        
+        return {
+            'pattern_match': 1.0 - max(abs(zscore) / _ZSCORE_SCALE, hour_rarity, type_rarity),
+            'amount_zscore': zscore,
+            'hour_rarity': hour_rarity,
+            'type_rarity': type_rarity,
+            'baseline_samples': self.count,
+            'anomalies': anomalies
+        }
@@ -0,0 +1,117 @@
+from app.models.user import User
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, Iterable, Optional
+import threading
+import time
+
+logger = get_logger(__name__)
+
+_NAME_CHANGED_KEY = 'name_changed_user_ids'
+
+class ComplianceResultCache:
+    """
+    Bounded LRU of per-user sanctions screening results, with a TTL per entry.
+    
+    Only clean results are kept (screened against a snapshot, no match), so
+    a burst of large transactions from a vetted user is not re-screened each
+    time while a flagged user always is. Each entry remembers the snapshot
+    it was screened against and is ignored once the screener has loaded
+    another one. Entries are dropped when the user's name changes (on
+    commit). Structuring assessments are not cached: they are per
+    transaction and already cost constant time (aml_detector).
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 600.0, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # user_id -> (expires_at, snapshot, result)
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.max_size = app.config['COMPLIANCE_CACHE_SIZE']
+        self.ttl_seconds = app.config['COMPLIANCE_CACHE_TTL_SECONDS']
+        self.enabled = self.ttl_seconds > 0
+        self.clear()
+    
+    def get(self, user_id: str, snapshot) -> Optional[Dict]:
+        """The user's cached sanctions result for snapshot, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and (entry[0] <= time.monotonic() or entry[1] != snapshot):
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+        metrics.incr('compliance_cache.miss' if entry is None else 'compliance_cache.hit')
+        return entry[2] if entry is not None else None
+    
+    def contains(self, user_id: str, snapshot) -> bool:
+        """Whether get would hit, without touching LRU order or hit counts"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry is not None and entry[0] > time.monotonic() and entry[1] == snapshot
+    
+    def put(self, user_id: str, snapshot, result: Dict):
+        if not self.enabled or not result.get('screened') or result.get('flagged'):
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, snapshot, result)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate_many(self, user_ids: Iterable[str]):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+compliance_cache = ComplianceResultCache()
+
+@event.listens_for(User.first_name, 'set')
+@event.listens_for(User.last_name, 'set')
+def _track_name_change(target, value, oldvalue, initiator):
+    session = object_session(target)
+    if session is not None and target.id and value != oldvalue:
+        session.info.setdefault(_NAME_CHANGED_KEY, set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_name_changes(session):
+    user_ids = session.info.pop(_NAME_CHANGED_KEY, None)
+    if user_ids:
+        compliance_cache.invalidate_many(user_ids)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_name_changes(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(_NAME_CHANGED_KEY, None)
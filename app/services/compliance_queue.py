@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from typing import Any, Callable, Optional
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+import threading
+import time
+
+logger = get_logger(__name__)
+
+class ComplianceQueue:
+    """
+    Background pool that resolves deferred compliance checks.
+    
+    Jobs run on a bounded thread pool, each inside its own app context (and
+    so its own database session), after the request that queued them has
+    committed. At most max_pending jobs are queued or running; callers ask
+    accepting() before deferring and check inline when it says no. A job
+    that raises is logged and counted as 'compliance.async.error'; its
+    transaction stays provisional until ProvisionalComplianceProcessor picks
+    it up. Job wall time is recorded in the 'compliance.async' timing.
+    """
+    
+    def __init__(self, enabled: bool = False, max_workers: int = 4, max_pending: int = 1000):
+        self.enabled = enabled
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.enabled = app.config['COMPLIANCE_ASYNC_ENABLED']
+        self.max_workers = app.config['COMPLIANCE_ASYNC_WORKERS']
+        self.max_pending = app.config['COMPLIANCE_ASYNC_MAX_PENDING']
+        self.shutdown()
+    
+    def accepting(self) -> bool:
+        return self.enabled and self.pending < self.max_pending
+    
+    def submit(self, fn: Callable[..., Any], *args):
+        """Run fn(*args) in the background inside this app's context"""
+        app = current_app._get_current_object()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='compliance')
+            self.pending += 1
+            pool = self._pool
+        metrics.incr('compliance.async.queued')
+        pool.submit(self._call_in_context, app, fn, args)
+    
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+    
+    def _call_in_context(self, app, fn: Callable[..., Any], args: tuple):
+        start = time.perf_counter()
+        try:
+            with app.app_context():
+                fn(*args)
+        except Exception as e:
+            metrics.incr('compliance.async.error')
+            logger.error(f"Deferred compliance check failed: {str(e)}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+            metrics.observe('compliance.async', (time.perf_counter() - start) * 1000)
+
+compliance_queue = ComplianceQueue()
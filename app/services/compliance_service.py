@@ -1,29 +1,67 @@
 from app.repositories.compliance_repository import ComplianceRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.unit_of_work import unit_of_work
 from app.repositories.user_repository import UserRepository
 from app.models.compliance import ComplianceCheck, KYCRecord
 from app.models.transaction import Transaction
+from app.services.aml_detector import EXCLUDED_STATUSES, aml_detector
+from app.services.compliance_cache import compliance_cache
+from app.services.compliance_queue import compliance_queue
+from app.services.sanctions_screening import sanctions_screener
+from app.services.transaction_holds import TransactionHoldService
 from app import db
-from typing import Dict, Optional
+from flask import current_app
+from typing import Dict, Iterator, List, Optional
 from app.utils.logger import get_logger
-from datetime import datetime
+from app.utils.metrics import metrics
+from datetime import datetime, timedelta
+import base64
 import uuid
 
 logger = get_logger(__name__)
 
+def encode_user_cursor(user_id: str) -> str:
+    """Opaque cursor for the position just after user_id"""
+    return base64.urlsafe_b64encode(user_id.encode()).decode()
+
+def decode_user_cursor(cursor: str) -> str:
+    try:
+        user_id = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except Exception:
+        user_id = None
+    if not user_id:
+        raise ValueError("Invalid cursor")
+    return user_id
+
 class ComplianceService:
     def __init__(self):
         self.compliance_repo = ComplianceRepository()
+        self.transaction_repo = TransactionRepository()
         self.user_repo = UserRepository()
+        self.holds = TransactionHoldService()
     
     def check_transaction(self, transaction: Transaction) -> ComplianceCheck:
         """Perform compliance check (AML, sanctions, etc.)"""
+        compliance_check = self.evaluate_transaction(transaction)
+        if not compliance_check:
+            return None
+        return self.record_check(compliance_check)
+    
+    def evaluate_transaction(self, transaction: Transaction, aml_result: Optional[Dict] = None
+                             ) -> Optional[ComplianceCheck]:
+        """
+        Run compliance checks and build the result without writing it.
+        
+        aml_result is the structuring assessment when the caller already made
+        it (to decide whether the check was needed); otherwise it is made here.
+        """
         # Check if transaction requires compliance review
-        from app.config.settings import config
-        if not config.AML_CHECK_ENABLED:
+        if not current_app.config['AML_CHECK_ENABLED']:
             return None
         
         # Run AML check
-        aml_result = self._run_aml_check(transaction)
+        if aml_result is None:
+            aml_result = self._run_aml_check(transaction)
         
         # Run sanctions check
         sanctions_result = self._run_sanctions_check(transaction)
@@ -40,7 +78,7 @@ class ComplianceService:
             flags.append('sanctions_match')
             status = 'failed'
         
-        compliance_check = ComplianceCheck(
+        return ComplianceCheck(
             id=str(uuid.uuid4()),
             transaction_id=transaction.id,
             user_id=transaction.user_id,
@@ -53,30 +91,154 @@ class ComplianceService:
             flags=flags,
             provider='internal'  # TODO: Use external provider
         )
-        
+    
+    def record_check(self, compliance_check: ComplianceCheck) -> ComplianceCheck:
+        """Persist a compliance check; flushes only when inside a unit of work"""
         compliance_check = self.compliance_repo.create(compliance_check)
-        logger.info(f"Compliance check completed: {compliance_check.id} status={status}")
+        logger.info(f"Compliance check completed: {compliance_check.id} status={compliance_check.status}")
         return compliance_check
     
+    def assess_aml(self, transaction: Transaction, counterparty: Optional[str] = None) -> Dict:
+        """
+        Structuring assessment of a transaction against its user's recent
+        near-threshold amounts; counterparty is the destination wallet of a
+        transaction not processed yet
+        """
+        return aml_detector.assess_transaction(transaction, counterparty)
+    
+    def assess_aml_batch(self, transactions: List[Transaction],
+                         counterparties: Optional[List[Optional[str]]] = None) -> List[Dict]:
+        """Assessments aligned with transactions, each counting the same user's earlier items"""
+        return aml_detector.assess_many(transactions, counterparties)
+    
+    def requires_check(self, transaction: Transaction, aml_result: Dict) -> bool:
+        """Above the KYC threshold, or structured to stay under it"""
+        return float(transaction.amount) >= current_app.config['KYC_REQUIRED_AMOUNT'] or aml_result['flagged']
+    
+    def can_defer(self, transaction: Transaction, aml_result: Dict) -> bool:
+        """
+        Whether the transaction's compliance check may resolve after it
+        commits: async mode is on and has room, the amount is under
+        COMPLIANCE_ASYNC_MAX_AMOUNT and does not look structured, and the
+        user's screening is not already cached (then checking inline is
+        as cheap as queueing).
+        """
+        config = current_app.config
+        return (
+            config['AML_CHECK_ENABLED'] and
+            not aml_result['flagged'] and
+            float(transaction.amount) < config['COMPLIANCE_ASYNC_MAX_AMOUNT'] and
+            compliance_queue.accepting() and
+            not compliance_cache.contains(transaction.user_id, sanctions_screener.snapshot)
+        )
+    
+    def defer(self, transaction: Transaction):
+        """Queue the check of a committed provisional transaction"""
+        compliance_queue.submit(self.resolve_deferred, transaction.id)
+    
+    def resolve_deferred(self, transaction_id: str) -> Optional[ComplianceCheck]:
+        """
+        Run the deferred check of a provisional transaction and record it.
+        
+        The transaction's balance change is held while the check is
+        outstanding. A passed check releases it (unless a fraud review still
+        holds it); review or failed reverses it and fails the transaction.
+        Raises ValueError if another worker resolved the transaction meanwhile.
+        """
+        transaction = self.transaction_repo.get_by_id(transaction_id)
+        if transaction is None or not transaction.compliance_pending:
+            return None
+        
+        compliance_check = self.evaluate_transaction(transaction)
+        passed = compliance_check is None or compliance_check.status == 'passed'
+        with unit_of_work():
+            if compliance_check:
+                self.record_check(compliance_check)
+            resolved = self.transaction_repo.resolve_provisional(
+                transaction.id,
+                compliance_check.id if compliance_check else None
+            )
+            if not resolved:
+                raise ValueError(f"Transaction {transaction.id} is no longer awaiting compliance")
+            if passed:
+                self.holds.release([transaction.id])
+            else:
+                self.holds.reverse([transaction.id], f"Compliance check {compliance_check.status}")
+        
+        metrics.incr('compliance.async.passed' if passed else 'compliance.async.reversed')
+        if not passed:
+            logger.warning(f"Transaction {transaction.id} reversed: compliance check {compliance_check.status}")
+        return compliance_check
+    
+    def observe_transaction(self, transaction: Transaction):
+        """Feed a committed transaction into the AML structuring windows"""
+        try:
+            if transaction.status not in EXCLUDED_STATUSES:
+                aml_detector.record_transaction(transaction)
+        except Exception as e:
+            # The transaction is already committed; the windows heal on rebuild
+            logger.error(f"Failed to record transaction for AML: {str(e)}")
+    
     def _run_aml_check(self, transaction: Transaction) -> Dict:
         """Run Anti-Money Laundering check"""
-        # TODO: Implement proper AML checking
-        # - Check transaction patterns
-        # - Check for structuring
-        # - Check for unusual patterns
+        # TODO: Check for unusual patterns beyond structuring
+        return self.assess_aml(transaction)
+    
+    def _run_sanctions_check(self, transaction: Transaction) -> Dict:
+        """Screen the transaction's user against the compiled sanctions lists"""
+        snapshot = sanctions_screener.snapshot
+        cached = compliance_cache.get(transaction.user_id, snapshot)
+        if cached is not None:
+            return cached
+        
+        user = self.user_repo.get_by_id(transaction.user_id)
+        if not user:
+            return {'screened': False, 'flagged': False, 'matches': []}
+        result = sanctions_screener.screen(f"{user.first_name or ''} {user.last_name or ''}")
+        compliance_cache.put(transaction.user_id, snapshot, result)
+        return result
+    
+    def kyc_required_page(self, limit: int = 100, cursor: Optional[str] = None,
+                          days: Optional[int] = None) -> Dict:
+        """
+        One page of users without verified KYC whose volume over the last
+        days (default KYC_VOLUME_WINDOW_DAYS) reaches KYC_REQUIRED_AMOUNT
+        """
+        after = decode_user_cursor(cursor) if cursor else None
+        rows = self.user_repo.get_users_requiring_kyc(
+            current_app.config['KYC_REQUIRED_AMOUNT'], self._kyc_window_start(days),
+            limit=limit, after=after, exclude_statuses=EXCLUDED_STATUSES
+        )
         return {
-            'flagged': False,
-            'risk_score': 0.2,
-            'details': {}
+            'items': [self._kyc_required_dict(row) for row in rows],
+            'next_cursor': encode_user_cursor(rows[-1].user_id) if len(rows) == limit else None
         }
     
-    def _run_sanctions_check(self, transaction: Transaction) -> Dict:
-        """Run sanctions list check"""
-        # TODO: Integrate with sanctions list provider
-        # TODO: Check user against OFAC, UN, EU sanctions lists
+    def iter_users_requiring_kyc(self, page_size: int = 1000, days: Optional[int] = None,
+                                 after: Optional[str] = None) -> Iterator[List[Dict]]:
+        """kyc_required_page's users, every page in turn, one page in memory at a time"""
+        pages = self.user_repo.iter_users_requiring_kyc(
+            current_app.config['KYC_REQUIRED_AMOUNT'], self._kyc_window_start(days),
+            page_size=page_size, after=after, exclude_statuses=EXCLUDED_STATUSES
+        )
+        for rows in pages:
+            yield [self._kyc_required_dict(row) for row in rows]
+    
+    def _kyc_window_start(self, days: Optional[int]) -> datetime:
+        if days is None:
+            days = current_app.config['KYC_VOLUME_WINDOW_DAYS']
+        if days <= 0:
+            raise ValueError(f"KYC volume window must be a positive number of days: {days}")
+        return datetime.utcnow() - timedelta(days=days)
+    
+    def _kyc_required_dict(self, row) -> Dict:
         return {
-            'flagged': False,
-            'matches': []
+            'user_id': row.user_id,
+            'email': row.email,
+            'kyc_status': row.kyc_status,
+            'volume': float(row.volume),
+            'transaction_count': row.transaction_count,
+            'last_transaction_at': row.last_transaction_at.isoformat() if row.last_transaction_at else None
         }
     
     def submit_kyc(self, user_id: str, kyc_data: Dict) -> KYCRecord:
@@ -95,8 +257,7 @@ class ComplianceService:
         
         kyc_record = self.compliance_repo.create(kyc_record)
         
-        # TODO: Submit to KYC provider for verification
-        # TODO: Process verification asynchronously
+        # KycVerificationProcessor submits pending records to the KYC provider
         
         logger.info(f"KYC submitted: {kyc_record.id}")
         return kyc_record
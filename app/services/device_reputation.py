@@ -0,0 +1,133 @@
+from app.models.fraud import DeviceReputation, FraudCheck
+from app.repositories.device_repository import DeviceRepository
+from app.utils.bloom_filter import BloomFilter
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+import threading
+import time
+
+logger = get_logger(__name__)
+
+# Devices first seen this long before the last refresh are re-read, so rows
+# from transactions that committed after the refresh query are not missed
+_REFRESH_OVERLAP = timedelta(seconds=60)
+
+class DeviceReputationIndex:
+    """
+    Device reputation keyed by fingerprint.
+    
+    A Bloom filter over every known fingerprint answers "never seen" in
+    memory; only fingerprints that may be known cost a primary-key lookup
+    on device_reputations. The filter is loaded on startup and refreshed
+    every refresh_seconds with devices first seen since the last refresh,
+    so devices recorded by other processes show up within that interval.
+    Until the filter is loaded, every lookup goes to the database.
+    """
+    
+    def __init__(self, capacity: int = 10000000, error_rate: float = 0.01, refresh_seconds: float = 5.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.device_repo = DeviceRepository()
+        self._filter: Optional[BloomFilter] = None
+        self._loaded_at: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.capacity = app.config['DEVICE_FILTER_CAPACITY']
+        self.error_rate = app.config['DEVICE_FILTER_ERROR_RATE']
+        self.refresh_seconds = app.config['DEVICE_FILTER_REFRESH_SECONDS']
+        self._filter = None
+        if app.config['DEVICE_FILTER_LOAD_ON_STARTUP']:
+            with app.app_context():
+                try:
+                    self.load()
+                except Exception as e:
+                    logger.warning(f"Device filter load skipped: {str(e)}")
+    
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+    
+    def load(self) -> int:
+        """Build a fresh filter from every known fingerprint and swap it in"""
+        started_at = datetime.utcnow()
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        bloom.update(self.device_repo.iter_fingerprints())
+        with self._lock:
+            self._filter = bloom
+            self._loaded_at = started_at
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+        if len(bloom) > self.capacity:
+            logger.warning(f"Device filter holds {len(bloom)} fingerprints, over its capacity of {self.capacity}; "
+                           f"raise DEVICE_FILTER_CAPACITY to keep the false-positive rate at {self.error_rate}")
+        logger.info(f"Device filter loaded: {len(bloom)} fingerprints in {bloom.size_bytes // 1024} KiB")
+        return len(bloom)
+    
+    def lookup(self, fingerprint: Optional[str]) -> Optional[DeviceReputation]:
+        """Reputation of a device, or None if it has never been seen"""
+        if not fingerprint:
+            return None
+        bloom = self._filter
+        if bloom is not None:
+            if time.monotonic() >= self._next_refresh:
+                self._maybe_refresh()
+            if fingerprint not in bloom:
+                metrics.incr('device_filter.negative')
+                return None
+        metrics.incr('device_filter.lookup')
+        return self.device_repo.get_by_fingerprint(fingerprint)
+    
+    def record_check(self, fraud_check: FraudCheck):
+        """Count a fraud check on its device; part of the caller's unit of work"""
+        fingerprint = fraud_check.device_fingerprint
+        if not fingerprint:
+            return
+        self.device_repo.record_sighting(
+            fingerprint, fraud_check.user_id, fraud_check.created_at or datetime.utcnow(), fraud_check.status
+        )
+        # Adding a device that then rolls back only costs a false positive
+        if self._filter is not None:
+            self._filter.add(fingerprint)
+    
+    def record_decisions(self, changes: Iterable[Tuple[Optional[str], str, str]]):
+        """
+        Update outcome counts after fraud check status changes, given as
+        (device_fingerprint, old_status, new_status); one UPDATE per device.
+        """
+        deltas: Dict[str, Counter] = {}
+        for fingerprint, old_status, new_status in changes:
+            if fingerprint and old_status != new_status:
+                counter = deltas.setdefault(fingerprint, Counter())
+                counter[old_status] -= 1
+                counter[new_status] += 1
+        for fingerprint, counter in deltas.items():
+            self.device_repo.add_outcomes(fingerprint, counter)
+    
+    def _maybe_refresh(self):
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already refreshing
+        try:
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+            started_at = datetime.utcnow()
+            self._filter.update(self.device_repo.iter_fingerprints(since=self._loaded_at - _REFRESH_OVERLAP))
+            self._loaded_at = started_at
+        except Exception as e:
+            logger.error(f"Device filter refresh failed: {str(e)}")
+        finally:
+            self._lock.release()
+    
+    def stats(self):
+        bloom = self._filter
+        return {
+            'ready': bloom is not None,
+            'fingerprints': len(bloom) if bloom else 0,
+            'capacity': self.capacity,
+            'size_bytes': bloom.size_bytes if bloom else 0
+        }
+
+device_reputation = DeviceReputationIndex()
@@ -0,0 +1,295 @@
+from app.models.user import User
+from app.services.behavior_baseline import Baseline
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, Iterable, Optional
+import threading
+import time
+
+logger = get_logger(__name__)
+
+_KYC_CHANGED_KEY = 'kyc_changed_user_ids'
+_PENDING_NOTES_KEY = 'feature_cache_pending_notes'
+
+class UserFeatures:
+    """
+    Cached per-user inputs to fraud scoring.
+    
+    Exposes created_at and kyc_status like a User, so it can stand in for one
+    in fraud_features.extract_features.
+    """
+    
+    __slots__ = ('user_id', 'created_at', 'kyc_status', 'history_count', 'last_risk_score', 'baseline',
+                 'expires_at')
+    
+    def __init__(self, user_id: str, created_at: Optional[datetime], kyc_status: Optional[str],
+                 history_count: int, last_risk_score: Optional[float] = None,
+                 baseline: Optional[Baseline] = None, expires_at: float = 0.0):
+        self.user_id = user_id
+        self.created_at = created_at
+        self.kyc_status = kyc_status
+        self.history_count = history_count
+        self.last_risk_score = last_risk_score
+        self.baseline = baseline or Baseline()
+        self.expires_at = expires_at
+
+class RedisInvalidationChannel:
+    """
+    Broadcast feature cache invalidations to every process over Redis pub/sub.
+    
+    Accepts any client exposing the redis-py publish/pubsub API, so a local
+    fake (e.g. fakeredis) can stand in for a real server.
+    """
+    
+    def __init__(self, client, channel: str = 'feature_cache:invalidate', retry_seconds: float = 1.0):
+        self.client = client
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+    
+    @classmethod
+    def from_url(cls, url: str, channel: str = 'feature_cache:invalidate') -> 'RedisInvalidationChannel':
+        import redis
+        return cls(redis.Redis.from_url(url), channel)
+    
+    def publish(self, user_ids: Iterable[str]):
+        self.client.publish(self.channel, ','.join(user_ids))
+    
+    def listen(self, on_invalidate, on_reconnect):
+        """
+        Call on_invalidate(user_ids) for every message, forever. on_reconnect()
+        runs whenever the subscription is (re)established, since messages
+        published while it was down are lost.
+        """
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                on_reconnect()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        data = message['data']
+                        data = data.decode() if isinstance(data, bytes) else data
+                        on_invalidate([user_id for user_id in data.split(',') if user_id])
+            except Exception as e:
+                logger.error(f"Feature cache invalidation channel lost: {str(e)}")
+                metrics.incr('feature_cache.channel.error')
+            time.sleep(self.retry_seconds)
+
+class UserFeatureCache:
+    """
+    Bounded LRU of UserFeatures keyed by user_id, with a TTL per entry.
+    
+    Entries are dropped when the user's KYC status changes (on commit) and
+    updated in place when one of their transactions commits or a recorded
+    fraud check commits, so the history count tracks committed transactions
+    between refreshes. Updates made inside a unit of work are staged in the
+    session and applied after commit, so a rollback never reaches the
+    shared cache. KYC changes made with bulk UPDATE statements bypass the ORM
+    events and must call invalidate_many themselves.
+    
+    The cache is per process. Without a channel, a KYC change committed by
+    another process (e.g. the KYC verification worker) is only seen once the
+    entry expires, after at most ttl_seconds. With a channel attached
+    (FEATURE_CACHE_INVALIDATION = 'redis'), every invalidation is broadcast
+    and applied by all processes, so a hit never serves a stale KYC status
+    for longer than the broadcast takes. A process that loses the channel
+    drops its whole cache on reconnecting.
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.channel: Optional[RedisInvalidationChannel] = None
+        self._entries: 'OrderedDict[str, UserFeatures]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.max_size = app.config['FEATURE_CACHE_SIZE']
+        self.ttl_seconds = app.config['FEATURE_CACHE_TTL_SECONDS']
+        self.enabled = app.config['FEATURE_CACHE_ENABLED']
+        self.clear()
+        if self.enabled and app.config['FEATURE_CACHE_INVALIDATION'] == 'redis' and self.channel is None:
+            self.attach_channel(RedisInvalidationChannel.from_url(
+                app.config['REDIS_URL'], app.config['FEATURE_CACHE_INVALIDATION_CHANNEL']
+            ))
+    
+    def attach_channel(self, channel: RedisInvalidationChannel):
+        """Broadcast invalidations on channel and apply other processes' from a daemon thread"""
+        self.channel = channel
+        threading.Thread(
+            target=channel.listen,
+            args=(self._drop, self._drop_all),
+            name='feature-cache-invalidation',
+            daemon=True
+        ).start()
+    
+    def get(self, user_id: str) -> Optional[UserFeatures]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+        metrics.incr('feature_cache.miss' if entry is None else 'feature_cache.hit')
+        return entry
+    
+    def peek(self, user_id: str) -> Optional[UserFeatures]:
+        """Entry for user_id even if expired, without touching LRU order or hit counts"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._entries.get(user_id)
+    
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, UserFeatures]:
+        """Cached entries for user_ids; missing users are absent from the result"""
+        found = {}
+        for user_id in set(user_ids):
+            entry = self.get(user_id)
+            if entry is not None:
+                found[user_id] = entry
+        return found
+    
+    def put(self, features: UserFeatures) -> UserFeatures:
+        if not self.enabled:
+            return features
+        features.expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[features.user_id] = features
+            self._entries.move_to_end(features.user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return features
+    
+    def invalidate(self, user_id: str):
+        self.invalidate_many([user_id])
+    
+    def invalidate_many(self, user_ids: Iterable[str]):
+        """Drop user_ids here and, with a channel attached, in every other process"""
+        user_ids = list(user_ids)
+        self._drop(user_ids)
+        if self.channel is not None and user_ids:
+            try:
+                self.channel.publish(user_ids)
+            except Exception as e:
+                # Other processes fall back to the TTL
+                logger.error(f"Failed to broadcast feature cache invalidation: {str(e)}")
+                metrics.incr('feature_cache.channel.error')
+    
+    def _drop(self, user_ids: Iterable[str]):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+    
+    def _drop_all(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def note_transaction(self, user_id: str):
+        """A transaction for user committed: count it in the cached history"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.history_count += 1
+    
+    def note_risk_score(self, user_id: str, score: float):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.last_risk_score = score
+    
+    def stage_risk_score(self, session: Session, user_id: str, score: float):
+        """note_risk_score once session commits; discarded if the change rolls back"""
+        self._stage(session, self.note_risk_score, user_id, score)
+    
+    def stage_baseline(self, session: Session, user_id: str, baseline: Baseline):
+        """note_baseline once session commits; discarded if the change rolls back"""
+        self._stage(session, self.note_baseline, user_id, baseline)
+    
+    def _stage(self, session: Session, note, *args):
+        # Tagged with the innermost savepoint, so rolling that back drops the note
+        session.info.setdefault(_PENDING_NOTES_KEY, []).append((session.get_nested_transaction(), note, args))
+    
+    def note_baseline(self, user_id: str, baseline: Baseline):
+        """Replace the cached baseline; cached baselines are never mutated in place"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.baseline = baseline
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+feature_cache = UserFeatureCache()
+
+@event.listens_for(User.kyc_status, 'set')
+def _track_kyc_change(target, value, oldvalue, initiator):
+    session = object_session(target)
+    if session is not None and target.id and value != oldvalue:
+        session.info.setdefault(_KYC_CHANGED_KEY, set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_kyc_changes(session):
+    user_ids = session.info.pop(_KYC_CHANGED_KEY, None)
+    if user_ids:
+        feature_cache.invalidate_many(user_ids)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_kyc_changes(session, previous_transaction):
+    # A savepoint rollback leaves the outer transaction's changes pending
+    if previous_transaction.parent is None:
+        session.info.pop(_KYC_CHANGED_KEY, None)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending_notes(session):
+    if session.in_nested_transaction():
+        return  # a savepoint was released; wait for the outer commit
+    for _, note, args in session.info.pop(_PENDING_NOTES_KEY, ()):
+        note(*args)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_notes(session, previous_transaction):
+    pending = session.info.get(_PENDING_NOTES_KEY)
+    if not pending:
+        return
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_NOTES_KEY, None)
+        return
+    # Drop notes staged inside the rolled-back savepoint or any savepoint within it
+    session.info[_PENDING_NOTES_KEY] = [
+        (transaction, note, args) for transaction, note, args in pending
+        if not _within(transaction, previous_transaction)
+    ]
+
+def _within(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
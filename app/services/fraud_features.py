@@ -0,0 +1,152 @@
+from typing import Dict, Optional
+from datetime import datetime
+
+# Feature vector shared by risk scoring and fraud rules. Every feature is a
+# plain number (booleans as 0/1) so the same definitions work per transaction
+# and, via numpy arrays, over a whole column of historical transactions.
+FEATURES = [
+    'amount',
+    'account_age_days',
+    'history_count_30d',
+    'velocity_count_1h',
+    'velocity_count_24h',
+    'velocity_amount_24h',
+    'has_device',
+    'device_seen',
+    'device_user_count',
+    'device_fraud_rate',
+    'device_age_days',
+    'has_geolocation',
+    'kyc_verified',
+    'hour',
+    'user_risk_score',
+    'amount_zscore',
+    'pattern_anomalies',
+    'cluster_size',
+    'cluster_fraud_rate',
+]
+
+# Component order matches RISK_WEIGHTS
+RISK_COMPONENTS = ['account_age', 'history', 'amount', 'velocity', 'device', 'location', 'kyc']
+RISK_WEIGHTS = [0.1, 0.15, 0.2, 0.2, 0.1, 0.1, 0.15]
+
+VELOCITY_LIMIT_24H = 10
+
+# Risk each component falls back to when its inputs were not available in time
+FALLBACK_COMPONENT = 0.5
+
+# Fraud check input lookups -> the risk components computed from them
+LOOKUP_COMPONENTS = {
+    'user': ['account_age', 'history', 'kyc'],
+    'velocity': ['velocity'],
+    'device': ['device'],
+    'cluster': [],
+}
+
+class _ScalarOps:
+    """The numpy functions used below, for plain floats"""
+    
+    @staticmethod
+    def minimum(a, b):
+        return min(a, b)
+    
+    @staticmethod
+    def maximum(a, b):
+        return max(a, b)
+    
+    @staticmethod
+    def where(condition, a, b):
+        return a if condition else b
+
+def extract_features(transaction, request_data: Dict, user, history_count: int, windows: Dict,
+                     at: Optional[datetime] = None, pattern: Optional[Dict] = None,
+                     device=None, cluster: Optional[Dict] = None) -> Dict[str, float]:
+    """
+    Compute every feature for one transaction; nothing else reads raw inputs.
+    
+    device is the DeviceReputation of the request's fingerprint, or None if
+    the device has never been seen; cluster is FraudRingService.lookup's result.
+    """
+    at = at or transaction.created_at or datetime.utcnow()
+    last_1h = windows.get('1h', {'count': 0, 'amount': 0})
+    last_24h = windows.get('24h', {'count': 0, 'amount': 0})
+    created_at = user.created_at if user else None
+    pattern = pattern or {}
+    cluster = cluster or {}
+    return {
+        'amount': float(transaction.amount),
+        'account_age_days': float((at - created_at).days) if created_at else 0.0,
+        'history_count_30d': float(history_count),
+        'velocity_count_1h': float(last_1h['count']),
+        'velocity_count_24h': float(last_24h['count']),
+        'velocity_amount_24h': float(last_24h['amount']),
+        'has_device': 1.0 if request_data.get('device_fingerprint') else 0.0,
+        'device_seen': 1.0 if device else 0.0,
+        'device_user_count': float(device.user_count) if device else 0.0,
+        'device_fraud_rate': float(device.fraud_rate) if device else 0.0,
+        'device_age_days': float(max((at - device.first_seen_at).days, 0)) if device else 0.0,
+        'has_geolocation': 1.0 if request_data.get('geolocation') else 0.0,
+        'kyc_verified': 1.0 if user and user.kyc_status == 'verified' else 0.0,
+        'hour': float(at.hour),
+        # Live RiskScore of the user, as carried by cached UserFeatures; 0 before the first check
+        'user_risk_score': float(getattr(user, 'last_risk_score', None) or 0.0),
+        # Deviation from the user's behavioural baseline (see behavior_baseline)
+        'amount_zscore': float(pattern.get('amount_zscore', 0.0)),
+        'pattern_anomalies': float(len(pattern.get('anomalies', ()))),
+        # Users linked to this one through shared devices and IPs, this user included
+        'cluster_size': float(cluster.get('cluster_size', 1)),
+        'cluster_fraud_rate': float(cluster.get('cluster_fraud_rate', 0.0)),
+    }
+
+def velocity_risk(count_24h, ops=_ScalarOps):
+    """Velocity component: 0.8 above VELOCITY_LIMIT_24H transactions in 24h, 0.5 above half of it"""
+    return ops.where(
+        count_24h > VELOCITY_LIMIT_24H, 0.8,
+        ops.where(count_24h > VELOCITY_LIMIT_24H // 2, 0.5, 0.0)
+    )
+
+def device_risk(features, ops=_ScalarOps):
+    """
+    Device component for requests with a fingerprint: 0.4 for a device never
+    seen before, otherwise 0.2 raised by the device's fraud rate and by the
+    number of other users seen on it.
+    """
+    shared = ops.minimum(ops.maximum(features['device_user_count'] - 1, 0) / 4, 1.0)
+    known = ops.minimum(0.2 + 0.7 * features['device_fraud_rate'] + 0.1 * shared, 1.0)
+    return ops.where(features['device_seen'] > 0, known, 0.4)
+
+def risk_components(features, ops=_ScalarOps) -> Dict:
+    """
+    Per-component risk (0.0 to 1.0) from features.
+    
+    features is a feature dict for one transaction, or a mapping of feature
+    name to numpy array with ops=numpy for many transactions at once.
+    """
+    return {
+        # Older accounts and longer histories mean lower risk
+        'account_age': 1.0 - ops.minimum(features['account_age_days'] / 365, 1.0),
+        'history': 1.0 - ops.minimum(features['history_count_30d'] / 100, 1.0),
+        'amount': ops.minimum(features['amount'] / 10000, 1.0),
+        'velocity': velocity_risk(features['velocity_count_24h'], ops),
+        'device': ops.where(features['has_device'] > 0, device_risk(features, ops), 0.5),
+        # TODO: Check location against user history
+        'location': ops.where(features['has_geolocation'] > 0, 0.4, 0.5),
+        'kyc': ops.where(features['kyc_verified'] > 0, 0.1, 0.8),
+    }
+
+def risk_score(features, weights=None, ops=_ScalarOps, fallback: Optional[Dict] = None):
+    """Weighted risk score capped at 1.0; fallback replaces the named components"""
+    weights = weights or RISK_WEIGHTS
+    components = risk_components(features, ops)
+    if fallback:
+        components.update(fallback)
+    score = sum(components[name] * weight for name, weight in zip(RISK_COMPONENTS, weights))
+    return ops.minimum(score, 1.0)
+
+def risk_level(score, threshold: float, ops=_ScalarOps):
+    """Bucket a score into low / medium / high / critical relative to threshold"""
+    return ops.where(
+        score >= threshold, 'critical',
+        ops.where(score >= threshold * 0.7, 'high',
+                  ops.where(score >= threshold * 0.4, 'medium', 'low'))
+    )
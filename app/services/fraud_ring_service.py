@@ -0,0 +1,114 @@
+from app.models.fraud import FraudCheck
+from app.repositories.link_repository import LinkRepository
+from app.utils.logger import get_logger
+from flask import current_app
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = get_logger(__name__)
+
+_MERGE_ATTEMPTS = 3
+
+def user_node(user_id: str) -> str:
+    return f"u:{user_id}"
+
+def linked_nodes(device_fingerprint: Optional[str], ip_address: Optional[str]) -> List[str]:
+    """Device and IP nodes a check links its user to"""
+    nodes = []
+    if device_fingerprint:
+        nodes.append(f"d:{device_fingerprint}")
+    if ip_address:
+        nodes.append(f"ip:{ip_address}")
+    return nodes
+
+class FraudRingService:
+    """
+    Connected components of users who share devices or IP addresses.
+    
+    Every node (user, device, IP) maps directly to its cluster, whose row
+    carries the user count and fraud outcomes, so a check's cluster features
+    cost one indexed query. When a check links two clusters the smaller is
+    relabelled into the larger (union by size), so each node moves at most
+    O(log n) times over the life of the graph. Devices and IPs seen with more
+    than LINK_HUB_USERS users (shared NATs, public terminals) stop merging
+    clusters, or a handful of hubs would join everyone into one ring.
+    """
+    
+    def __init__(self):
+        self.link_repo = LinkRepository()
+    
+    def lookup(self, user_id: str, device_fingerprint: Optional[str], ip_address: Optional[str]) -> Dict:
+        """Size and fraud rate of the cluster the user would be in once this check is recorded"""
+        hub_users = current_app.config['LINK_HUB_USERS']
+        own = user_node(user_id)
+        rows = self.link_repo.get_node_clusters([own] + linked_nodes(device_fingerprint, ip_address))
+        clusters = {cluster.id: cluster for node, user_count, cluster in rows if node == own or user_count < hub_users}
+        
+        users = sum(c.user_count for c in clusters.values())
+        if not any(node == own for node, _, _ in rows):
+            users += 1
+        approved = sum(c.approved_count for c in clusters.values())
+        rejected = sum(c.rejected_count for c in clusters.values())
+        return {
+            'cluster_size': users,
+            'cluster_fraud_rate': rejected / (approved + rejected) if approved + rejected else 0.0
+        }
+    
+    def record_check(self, fraud_check: FraudCheck):
+        """Add a check's user-device and user-IP edges to the graph; part of the caller's unit of work"""
+        hub_users = current_app.config['LINK_HUB_USERS']
+        own = user_node(fraud_check.user_id)
+        node = self.link_repo.get_node(own)
+        if node is None:
+            self.link_repo.create_node(own)
+            node = self.link_repo.get_node(own)
+        
+        to_merge = set()
+        for linked in linked_nodes(fraud_check.device_fingerprint, fraud_check.ip_address):
+            new_edge = self.link_repo.add_edge(linked, fraud_check.user_id)
+            if self.link_repo.create_node(linked, node.cluster_id, user_count=1):
+                continue  # a new device or IP simply joins the user's cluster
+            existing = self.link_repo.get_node(linked)
+            if existing is None:
+                continue  # the user's cluster was merged away meanwhile; the offline rebuild links it
+            if new_edge:
+                self.link_repo.increment_node_users(linked)
+            if existing.user_count + int(new_edge) <= hub_users:
+                to_merge.add(linked)
+        
+        if to_merge:
+            self._merge([own] + sorted(to_merge))
+        cluster_id = self.link_repo.get_cluster_ids([own])[own]
+        self.link_repo.record_check(cluster_id, fraud_check.status)
+    
+    def record_decisions(self, changes: Iterable[Tuple[str, str, str]]):
+        """
+        Update cluster outcome counts after fraud check status changes, given
+        as (user_id, old_status, new_status); one UPDATE per cluster.
+        """
+        changes = [(user_node(user_id), old, new) for user_id, old, new in changes if old != new]
+        if not changes:
+            return
+        cluster_ids = self.link_repo.get_cluster_ids(list({node for node, _, _ in changes}))
+        deltas: Dict[str, Counter] = {}
+        for node, old_status, new_status in changes:
+            if node in cluster_ids:
+                counter = deltas.setdefault(cluster_ids[node], Counter())
+                counter[old_status] -= 1
+                counter[new_status] += 1
+        for cluster_id, counter in deltas.items():
+            self.link_repo.add_outcomes(cluster_id, counter)
+    
+    def _merge(self, nodes: List[str]):
+        for _ in range(_MERGE_ATTEMPTS):
+            cluster_ids = set(self.link_repo.get_cluster_ids(nodes).values())
+            if len(cluster_ids) < 2:
+                return
+            clusters = self.link_repo.lock_clusters(cluster_ids)
+            # A concurrent merge may have moved the nodes before we got the locks
+            if set(self.link_repo.get_cluster_ids(nodes).values()) != {c.id for c in clusters}:
+                continue
+            clusters.sort(key=lambda c: c.user_count, reverse=True)
+            self.link_repo.merge_clusters(clusters[0], clusters[1:])
+            return
+        logger.warning(f"Gave up merging link clusters for {nodes[0]} after {_MERGE_ATTEMPTS} attempts")
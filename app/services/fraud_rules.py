@@ -0,0 +1,187 @@
+from app.services.fraud_features import FEATURES
+from app.utils.logger import get_logger
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import threading
+import time
+
+logger = get_logger(__name__)
+
+_COMPARISONS = {'>': '>', '>=': '>=', '<': '<', '<=': '<=', '==': '==', '!=': '!='}
+_MEMBERSHIP = {'in': 'in', 'not_in': 'not in'}
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'fraud_rules.json')
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and value == value  # rejects NaN
+
+class _PlanBuilder:
+    """Turns rule declarations into the source of one evaluate(features) function"""
+    
+    def __init__(self):
+        self.constants: Dict[str, Any] = {}
+        self.features: Dict[str, str] = {}
+        self.conditions: Dict[tuple, str] = {}
+        self.lines: List[str] = []
+    
+    def constant(self, value) -> str:
+        name = f"k{len(self.constants)}"
+        self.constants[name] = value
+        return name
+    
+    def feature(self, feature: str) -> str:
+        if feature not in self.features:
+            self.features[feature] = f"x{len(self.features)}"
+        return self.features[feature]
+    
+    def condition(self, node, path: str) -> str:
+        """Return an expression for node; identical leaves are evaluated once"""
+        if not isinstance(node, dict):
+            raise ValueError(f"{path}: condition must be an object")
+        
+        for combinator, joiner in (('all', ' and '), ('any', ' or ')):
+            if combinator in node:
+                children = node[combinator]
+                if not isinstance(children, list) or not children:
+                    raise ValueError(f"{path}.{combinator}: expected a non-empty list")
+                parts = [self.condition(c, f"{path}.{combinator}[{i}]") for i, c in enumerate(children)]
+                return '(' + joiner.join(parts) + ')'
+        if 'not' in node:
+            return f"(not {self.condition(node['not'], path + '.not')})"
+        
+        feature, op, value = node.get('feature'), node.get('op'), node.get('value')
+        if feature not in FEATURES:
+            raise ValueError(f"{path}: unknown feature {feature!r}")
+        if op in _COMPARISONS:
+            if isinstance(value, bool):
+                value = int(value)
+            if not _is_number(value):
+                raise ValueError(f"{path}: {op} needs a number value")
+            key = (feature, op, value)
+        elif op in _MEMBERSHIP:
+            if not isinstance(value, list) or not all(_is_number(v) for v in value):
+                raise ValueError(f"{path}: {op} needs a list of numbers")
+            value = frozenset(value)
+            key = (feature, op, value)
+        else:
+            raise ValueError(f"{path}: unknown operator {op!r}")
+        
+        if key not in self.conditions:
+            name = f"c{len(self.conditions)}"
+            operator = _COMPARISONS.get(op) or _MEMBERSHIP[op]
+            self.lines.append(f"{name} = {self.feature(feature)} {operator} {self.constant(value)}")
+            self.conditions[key] = name
+        return self.conditions[key]
+
+def compile_rules(rules: List[Dict]) -> Callable[[Dict], List[str]]:
+    """
+    Compile rule declarations into a single function features -> fired rule names.
+    
+    Each rule is {"name": ..., "condition": ..., "enabled": true}, where a
+    condition is {"all": [...]}, {"any": [...]}, {"not": {...}} or a leaf
+    {"feature": ..., "op": ..., "value": ...}. Every feature is read once and
+    every distinct leaf comparison is evaluated once, however many rules
+    share it. Names and values never appear in the generated source; they
+    are bound as constants, so a rule file cannot inject code.
+    """
+    builder = _PlanBuilder()
+    checks = []
+    seen = set()
+    for index, rule in enumerate(rules):
+        if not isinstance(rule, dict) or not isinstance(rule.get('name'), str) or not rule['name']:
+            raise ValueError(f"rules[{index}]: every rule needs a name")
+        if rule['name'] in seen:
+            raise ValueError(f"rules[{index}]: duplicate rule name {rule['name']!r}")
+        seen.add(rule['name'])
+        if not rule.get('enabled', True):
+            continue
+        expression = builder.condition(rule.get('condition'), f"rules[{index}].condition")
+        checks.append((expression, builder.constant(rule['name'])))
+    
+    body = [f"{var} = f[{builder.constant(name)}]" for name, var in builder.features.items()]
+    body += builder.lines
+    body.append("fired = []")
+    body += [f"if {expression}: fired.append({name})" for expression, name in checks]
+    body.append("return fired")
+    source = "def evaluate(f):\n" + "\n".join("    " + line for line in body) + "\n"
+    
+    namespace = dict(builder.constants, __builtins__={})
+    exec(compile(source, '<fraud_rules>', 'exec'), namespace)
+    return namespace['evaluate']
+
+def load_rule_file(path: str) -> List[Dict]:
+    """Read rule declarations from a JSON or (with PyYAML installed) YAML file"""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    rules = data.get('rules') if isinstance(data, dict) else data
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected a list of rules")
+    return rules
+
+class FraudRuleEngine:
+    """
+    Evaluates the fraud rule set against a transaction's feature dict.
+    
+    Rules are compiled once per load. The rule file's modification time is
+    checked at most every reload_seconds during evaluation; a changed file is
+    recompiled and swapped in, and a file that fails to compile is logged and
+    ignored so the last good rule set stays active.
+    """
+    
+    def __init__(self, path: Optional[str] = None, reload_seconds: float = 5.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.rule_count = 0
+        self._plan: Callable[[Dict], List[str]] = compile_rules([])
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.path = app.config['FRAUD_RULES_PATH']
+        self.reload_seconds = app.config['FRAUD_RULES_RELOAD_SECONDS']
+        self.load()
+    
+    def load(self) -> int:
+        """(Re)load rules from path; raises ValueError/OSError on a bad file"""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            self.load_rules(load_rule_file(self.path))
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.reload_seconds
+        logger.info(f"Loaded {self.rule_count} fraud rules from {self.path}")
+        return self.rule_count
+    
+    def load_rules(self, rules: List[Dict]):
+        """Compile and activate a rule set given directly"""
+        plan = compile_rules(rules)
+        self._plan, self.rule_count = plan, sum(1 for r in rules if r.get('enabled', True))
+    
+    def evaluate(self, features: Dict[str, float]) -> List[str]:
+        """Names of the rules that fire for features"""
+        if self.path and time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return self._plan(features)
+    
+    def _maybe_reload(self):
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already checking
+        try:
+            self._next_check = time.monotonic() + self.reload_seconds
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            self.load_rules(load_rule_file(self.path))
+            self._mtime = mtime
+            logger.info(f"Reloaded {self.rule_count} fraud rules from {self.path}")
+        except Exception as e:
+            logger.error(f"Fraud rules reload failed, keeping previous rules: {str(e)}")
+        finally:
+            self._lock.release()
+
+fraud_rule_engine = FraudRuleEngine(DEFAULT_RULES_PATH)
@@ -2,184 +2,334 @@ from app.repositories.fraud_repository import FraudRepository
 from app.repositories.transaction_repository import TransactionRepository
 from app.repositories.user_repository import UserRepository
 from app.models.fraud import FraudCheck, RiskScore
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.velocity_store import velocity_store
+from app.services import fraud_features
+from app.services.fraud_rules import fraud_rule_engine
+from app.services.feature_cache import feature_cache, UserFeatures
+from app.services.behavior_baseline import Baseline
+from app.services.device_reputation import device_reputation
+from app.services.fraud_ring_service import FraudRingService
+from app.services.shadow_scoring import shadow_scoring
+from app.services.precheck_executor import feature_executor
 from app import db
-from typing import Dict, Optional
+from flask import current_app
+from typing import Dict, List, Optional, Tuple
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 from datetime import datetime
 import uuid
 
 logger = get_logger(__name__)
 
+# fraud_features risk component -> RiskScore column
+RISK_SCORE_COLUMNS = {
+    'account_age': 'account_age_score',
+    'history': 'transaction_history_score',
+    'velocity': 'velocity_score',
+    'device': 'device_score',
+    'location': 'location_score',
+    'kyc': 'kyc_score',
+}
+
 class FraudService:
     def __init__(self):
         self.fraud_repo = FraudRepository()
         self.transaction_repo = TransactionRepository()
         self.user_repo = UserRepository()
+        self.velocity_store = velocity_store
+        self.rule_engine = fraud_rule_engine
+        self.feature_cache = feature_cache
+        self.device_reputation = device_reputation
+        self.fraud_rings = FraudRingService()
+        self.shadow_scoring = shadow_scoring
+        self.feature_executor = feature_executor
     
     def check_transaction(self, transaction: Transaction, request_data: Dict) -> FraudCheck:
         """Perform comprehensive fraud check on transaction"""
-        # Calculate risk score
-        risk_score = self._calculate_risk_score(transaction, request_data)
+        fraud_check = self.evaluate_transaction(transaction, request_data)
+        return self.record_check(fraud_check)
+    
+    def evaluate_transaction(self, transaction: Transaction, request_data: Dict) -> FraudCheck:
+        """
+        Score a transaction and build its fraud check without writing it.
+        
+        The user, velocity, device and cluster lookups run side by side, each
+        under its own latency budget. A lookup that misses its budget or fails
+        is replaced by the user's cached features, even expired ones, or by
+        FALLBACK_COMPONENT for the risk components it feeds, and the check
+        lists it in degraded_features.
+        """
+        user_id = transaction.user_id
+        fingerprint = request_data.get('device_fingerprint')
+        cached_user = self.feature_cache.peek(user_id)
+        outcomes = self.feature_executor.run({
+            'user': lambda: self.get_user_features([user_id]).get(user_id),
+            'velocity': lambda: self.velocity_store.get_velocity(user_id),
+            'device': lambda: self.device_reputation.lookup(fingerprint),
+            'cluster': lambda: self.fraud_rings.lookup(user_id, fingerprint, request_data.get('ip_address')),
+        })
+        degraded = [name for name, outcome in outcomes.items() if not outcome.ok]
+        if degraded:
+            metrics.incr('fraud.degraded')
+        
+        user = outcomes['user'].result if outcomes['user'].ok else cached_user
+        return self._build_check(
+            transaction, request_data, user, user.history_count if user else 0, outcomes['velocity'].result or {},
+            user.baseline if user else Baseline(), outcomes['device'].result, outcomes['cluster'].result,
+            degraded=degraded
+        )
+    
+    def evaluate_batch(self, transactions: List[Transaction], request_data: List[Dict]) -> List[FraudCheck]:
+        """
+        Score many transactions, loading each user's history once for the
+        batch. An item whose scoring raises gets the exception in place of
+        its check, so the caller can reject that item alone.
+        """
+        user_ids = {t.user_id for t in transactions}
+        users = self.get_user_features(user_ids)
+        history_counts = {user_id: features.history_count for user_id, features in users.items()}
+        windows = {user_id: self.velocity_store.get_velocity(user_id) for user_id in user_ids}
+        # Private copies: the cached baselines are shared and never mutated
+        baselines = {user_id: features.baseline.copy() for user_id, features in users.items()}
+        fingerprints = {data.get('device_fingerprint') for data in request_data} - {None}
+        devices = {fingerprint: self.device_reputation.lookup(fingerprint) for fingerprint in fingerprints}
+        links = {
+            (t.user_id, data.get('device_fingerprint'), data.get('ip_address'))
+            for t, data in zip(transactions, request_data)
+        }
+        clusters = {link: self.fraud_rings.lookup(*link) for link in links}
+        
+        fraud_checks = []
+        for transaction, data in zip(transactions, request_data):
+            user_id = transaction.user_id
+            baseline = baselines.setdefault(user_id, Baseline())
+            try:
+                fraud_checks.append(self._build_check(
+                    transaction, data, users.get(user_id), history_counts.get(user_id, 0), windows[user_id], baseline,
+                    devices.get(data.get('device_fingerprint')),
+                    clusters[(user_id, data.get('device_fingerprint'), data.get('ip_address'))]
+                ))
+            except Exception as e:
+                logger.error(f"Fraud check of batch item {transaction.id} failed: {str(e)}")
+                fraud_checks.append(e)
+                continue
+            
+            # Later items see earlier ones, as if they had been created one by one
+            history_counts[user_id] = history_counts.get(user_id, 0) + 1
+            for window in windows[user_id].values():
+                window['count'] += 1
+                window['amount'] += transaction.amount
+            self._observe_baseline(baseline, transaction)
+        
+        return fraud_checks
+    
+    def get_user_features(self, user_ids) -> Dict[str, UserFeatures]:
+        """
+        Per-user scoring inputs, served from the feature cache where possible.
+        
+        Cache misses are loaded together: users, 30-day history counts, live
+        risk scores and behavioural baselines cost one query each however
+        many users missed.
+        """
+        user_ids = set(user_ids)
+        found = self.feature_cache.get_many(user_ids)
+        missing = user_ids - found.keys()
+        if missing:
+            history_counts = self.transaction_repo.count_by_user(missing, 30)
+            latest_scores = self.fraud_repo.get_current_scores(missing)
+            baseline_stats = self.fraud_repo.get_baseline_stats(missing)
+            for user in self.user_repo.get_many(missing):
+                found[user.id] = self.feature_cache.put(UserFeatures(
+                    user.id,
+                    user.created_at,
+                    user.kyc_status,
+                    history_counts.get(user.id, 0),
+                    latest_scores.get(user.id),
+                    Baseline.unpack(baseline_stats.get(user.id))
+                ))
+        return found
+    
+    def _build_check(self, transaction: Transaction, request_data: Dict, user, history_count: int,
+                     windows: Dict, baseline: Baseline, device=None,
+                     cluster: Optional[Dict] = None, degraded: Optional[List[str]] = None) -> FraudCheck:
+        # Features are computed once and shared by scoring and rules
+        velocity = self._check_velocity(windows)
+        pattern = self._analyze_patterns(transaction, baseline)
+        features = fraud_features.extract_features(
+            transaction, request_data, user, history_count, windows,
+            pattern=pattern, device=device, cluster=cluster
+        )
+        
+        # Components are per transaction; the stored RiskScore (their history
+        # average) only reaches scoring as the user_risk_score rule input
+        risk_score = self._calculate_risk_score(features, self._fallback_components(degraded, user))
         risk_level = self._determine_risk_level(risk_score)
         
         # Check fraud rules
-        rules_triggered = self._check_fraud_rules(transaction, request_data)
+        rules_triggered = self._check_fraud_rules(features)
+        
+        check_id = str(uuid.uuid4())
+        if not degraded:
+            self.shadow_scoring.submit(check_id, features, risk_score, risk_level, rules_triggered)
         
-        fraud_check = FraudCheck(
-            id=str(uuid.uuid4()),
+        return FraudCheck(
+            id=check_id,
             transaction_id=transaction.id,
             user_id=transaction.user_id,
             risk_score=risk_score,
             risk_level=risk_level,
+            amount=transaction.amount,
             rules_triggered=rules_triggered,
             device_fingerprint=request_data.get('device_fingerprint'),
             ip_address=request_data.get('ip_address'),
             user_agent=request_data.get('user_agent'),
             geolocation=request_data.get('geolocation'),
-            velocity_checks=self._check_velocity(transaction),
-            pattern_analysis=self._analyze_patterns(transaction),
+            velocity_checks=velocity,
+            pattern_analysis=pattern,
+            features=features,
+            degraded_features=degraded or None,
             status='pending' if risk_level in ['high', 'critical'] else 'approved'
         )
-        
+    
+    def record_check(self, fraud_check: FraudCheck) -> FraudCheck:
+        """Persist a fraud check; flushes only when inside a unit of work"""
         fraud_check = self.fraud_repo.create(fraud_check)
         
         # Update user risk score
-        self._update_user_risk_score(transaction.user_id)
+        self._update_user_risk_score(fraud_check)
+        self.device_reputation.record_check(fraud_check)
+        self.fraud_rings.record_check(fraud_check)
         
-        logger.info(f"Fraud check completed: {fraud_check.id} risk={risk_score}")
+        logger.info(f"Fraud check completed: {fraud_check.id} risk={fraud_check.risk_score}")
         return fraud_check
     
-    def _calculate_risk_score(self, transaction: Transaction, request_data: Dict) -> float:
-        """Calculate overall risk score (0.0 to 1.0)"""
-        scores = []
-        
-        # Account age score
-        user = self.user_repo.get_by_id(transaction.user_id)
-        if user:
-            account_age_days = (datetime.utcnow() - user.created_at).days
-            age_score = min(account_age_days / 365, 1.0)  # Normalize to 0-1
-            scores.append(1.0 - age_score)  # Older accounts = lower risk
-        
-        # Transaction history score
-        summary = self.transaction_repo.get_user_transaction_summary(transaction.user_id, 30)
-        history_score = min(summary['total_count'] / 100, 1.0)  # More history = lower risk
-        scores.append(1.0 - history_score)
-        
-        # Amount score
-        amount_score = min(float(transaction.amount) / 10000, 1.0)  # Larger amounts = higher risk
-        scores.append(amount_score)
-        
-        # Velocity score
-        velocity_data = self._check_velocity(transaction)
-        velocity_score = velocity_data.get('risk_score', 0.5)
-        scores.append(velocity_score)
-        
-        # Device score (if available)
-        device_score = 0.5  # Default
-        if request_data.get('device_fingerprint'):
-            # TODO: Check device reputation
-            device_score = 0.3
-        scores.append(device_score)
-        
-        # Location score
-        location_score = 0.5  # Default
-        if request_data.get('geolocation'):
-            # TODO: Check location against user history
-            location_score = 0.4
-        scores.append(location_score)
-        
-        # KYC score
-        kyc_score = 0.8  # Default (no KYC = high risk)
-        if user and user.kyc_status == 'verified':
-            kyc_score = 0.1
-        scores.append(kyc_score)
+    def record_checks(self, fraud_checks: List[FraudCheck]) -> List[FraudCheck]:
+        """Bulk variant of record_check; always flush-only"""
+        fraud_checks = self.fraud_repo.add_all(fraud_checks)
+        for fraud_check in fraud_checks:
+            self._update_user_risk_score(fraud_check)
+            self.device_reputation.record_check(fraud_check)
+            self.fraud_rings.record_check(fraud_check)
+        return fraud_checks
+    
+    def record_decisions(self, changes: List[Tuple[FraudCheck, str, str]]):
+        """
+        Propagate fraud check status changes, given as (fraud_check,
+        old_status, new_status), to the device and cluster outcome counts.
+        """
+        self.device_reputation.record_decisions(
+            (fraud_check.device_fingerprint, old, new) for fraud_check, old, new in changes
+        )
+        self.fraud_rings.record_decisions(
+            (fraud_check.user_id, old, new) for fraud_check, old, new in changes
+        )
+    
+    def update_baselines(self, transactions: List[Transaction]):
+        """
+        Fold accepted transactions into their users' behavioural baselines.
         
-        # Weighted average
-        weights = [0.1, 0.15, 0.2, 0.2, 0.1, 0.1, 0.15]
-        weighted_score = sum(s * w for s, w in zip(scores, weights))
+        Runs inside the caller's unit of work: each user's row is locked,
+        updated in O(1) per transaction and written back with the same commit
+        as the transactions; the feature cache sees the new baselines only
+        once that commit succeeds. Failed and cancelled transactions are not learned.
+        """
+        transactions = [
+            t for t in transactions
+            if t.status not in (TransactionStatus.FAILED, TransactionStatus.CANCELLED)
+        ]
+        if not transactions:
+            return
         
-        return min(weighted_score, 1.0)
+        rows = self.fraud_repo.lock_baselines({t.user_id for t in transactions}, Baseline().pack())
+        baselines = {user_id: Baseline.unpack(row.stats) for user_id, row in rows.items()}
+        for transaction in transactions:
+            self._observe_baseline(baselines[transaction.user_id], transaction)
+        for user_id, baseline in baselines.items():
+            rows[user_id].stats = baseline.pack()
+            rows[user_id].sample_count = baseline.count
+            self.feature_cache.stage_baseline(db.session(), user_id, baseline)
+    
+    def observe_transaction(self, transaction: Transaction):
+        """Feed a committed transaction into incrementally maintained fraud state"""
+        try:
+            self.feature_cache.note_transaction(transaction.user_id)
+            self.velocity_store.record_transaction(transaction)
+        except Exception as e:
+            # The transaction is already committed; stale counters heal on rebuild
+            logger.error(f"Failed to record transaction velocity: {str(e)}")
+    
+    def _calculate_risk_score(self, features: Dict[str, float], fallback: Optional[Dict] = None) -> float:
+        """Calculate overall risk score (0.0 to 1.0)"""
+        return float(fraud_features.risk_score(features, fallback=fallback))
     
-    def _determine_risk_level(self, risk_score: float) -> str:
+    def _fallback_components(self, degraded: Optional[List[str]], user=None) -> Dict[str, float]:
+        """Risk components to replace for lookups that did not complete"""
+        fallback = {}
+        for name in degraded or ():
+            if name == 'user' and user is not None:
+                continue  # scored from the user's cached features
+            for component in fraud_features.LOOKUP_COMPONENTS[name]:
+                fallback[component] = fraud_features.FALLBACK_COMPONENT
+        return fallback
+    
+    def _determine_risk_level(self, score: float) -> str:
         """Determine risk level from score"""
-        from app.config.settings import config
-        threshold = config.FRAUD_RISK_THRESHOLD
-        
-        if risk_score >= threshold:
-            return 'critical'
-        elif risk_score >= threshold * 0.7:
-            return 'high'
-        elif risk_score >= threshold * 0.4:
-            return 'medium'
-        else:
-            return 'low'
-    
-    def _check_fraud_rules(self, transaction: Transaction, request_data: Dict) -> list:
-        """Check transaction against fraud rules"""
-        rules_triggered = []
-        
-        # Rule 1: Large amount
-        if float(transaction.amount) > 10000:
-            rules_triggered.append('large_amount')
-        
-        # Rule 2: Unusual time
-        hour = datetime.utcnow().hour
-        if hour < 6 or hour > 22:
-            rules_triggered.append('unusual_time')
-        
-        # Rule 3: New device
-        if not request_data.get('device_fingerprint'):
-            rules_triggered.append('new_device')
-        
-        # Rule 4: Velocity check
-        velocity = self._check_velocity(transaction)
-        if velocity.get('exceeds_limit', False):
-            rules_triggered.append('high_velocity')
-        
-        # TODO: Add more fraud rules
-        # TODO: Make rules configurable
-        
-        return rules_triggered
+        return fraud_features.risk_level(score, current_app.config['FRAUD_RISK_THRESHOLD'])
     
-    def _check_velocity(self, transaction: Transaction) -> Dict:
-        """Check transaction velocity (frequency and amount)"""
-        summary = self.transaction_repo.get_user_transaction_summary(transaction.user_id, 1)  # Last 24 hours
-        
-        velocity_risk = 0.0
-        exceeds_limit = False
-        
-        if summary['total_count'] > 10:
-            velocity_risk = 0.8
-            exceeds_limit = True
-        elif summary['total_count'] > 5:
-            velocity_risk = 0.5
+    def _check_fraud_rules(self, features: Dict[str, float]) -> list:
+        """Check transaction features against the configured fraud rules"""
+        return self.rule_engine.evaluate(features)
+    
+    def _check_velocity(self, windows: Dict) -> Dict:
+        """Check transaction velocity (frequency and amount) from velocity store windows"""
+        last_24h = windows.get('24h', {'count': 0, 'amount': 0})
         
         return {
-            'transaction_count_24h': summary['total_count'],
-            'total_amount_24h': summary['total_amount'],
-            'risk_score': velocity_risk,
-            'exceeds_limit': exceeds_limit
+            'transaction_count_24h': last_24h['count'],
+            'total_amount_24h': float(last_24h['amount']),
+            'windows': {
+                name: {'count': w['count'], 'amount': float(w['amount'])} for name, w in windows.items()
+            },
+            'risk_score': fraud_features.velocity_risk(last_24h['count']),
+            'exceeds_limit': last_24h['count'] > fraud_features.VELOCITY_LIMIT_24H
         }
     
-    def _analyze_patterns(self, transaction: Transaction) -> Dict:
-        """Analyze behavioral patterns"""
-        # TODO: Implement pattern analysis
-        # - Compare to user's typical transaction patterns
-        # - Check for anomalies
-        return {
-            'pattern_match': 0.7,
-            'anomalies': []
-        }
+    def _analyze_patterns(self, transaction: Transaction, baseline: Baseline) -> Dict:
+        """Compare a transaction's amount, hour and type with the user's behavioural baseline"""
+        at = transaction.created_at or datetime.utcnow()
+        return baseline.score(
+            float(transaction.amount),
+            at.hour,
+            transaction.transaction_type,
+            min_samples=current_app.config['BEHAVIOR_MIN_SAMPLES'],
+            zscore_threshold=current_app.config['BEHAVIOR_ZSCORE_THRESHOLD'],
+            rarity_threshold=current_app.config['BEHAVIOR_RARITY_THRESHOLD']
+        )
+    
+    def _observe_baseline(self, baseline: Baseline, transaction: Transaction):
+        at = transaction.created_at or datetime.utcnow()
+        baseline.update(float(transaction.amount), at.hour, transaction.transaction_type)
     
-    def _update_user_risk_score(self, user_id: str):
-        """Update user's overall risk score"""
-        # TODO: Implement comprehensive risk score calculation
-        # TODO: Store in RiskScore table
-        pass
+    def _update_user_risk_score(self, fraud_check: FraudCheck) -> Optional[RiskScore]:
+        """Fold a fraud check's component scores into the user's live RiskScore in O(1)"""
+        if not fraud_check.features:
+            return None
+        components = fraud_features.risk_components(fraud_check.features)
+        # Components computed without their inputs say nothing about the user
+        skipped = {c for name in fraud_check.degraded_features or () for c in fraud_features.LOOKUP_COMPONENTS[name]}
+        scores = {
+            column: float(components[name]) for name, column in RISK_SCORE_COLUMNS.items() if name not in skipped
+        }
+        scores['overall_score'] = fraud_check.risk_score
+        
+        risk_score = self.fraud_repo.apply_risk_sample(
+            fraud_check.user_id, scores, current_app.config['RISK_SCORE_WINDOW']
+        )
+        self.feature_cache.stage_risk_score(db.session(), fraud_check.user_id, risk_score.overall_score)
+        return risk_score
     
     # TODO: Add machine learning-based fraud detection
-    # TODO: Add real-time fraud rule updates
     # TODO: Add fraud pattern learning
 
 
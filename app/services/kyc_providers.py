@@ -0,0 +1,86 @@
+from typing import Dict, Optional
+from app.utils.logger import get_logger
+import hashlib
+import importlib
+import random
+import threading
+import time
+
+logger = get_logger(__name__)
+
+SUPPORTED_DOCUMENTS = ('passport', 'id_card', 'driver_license')
+
+class KycProviderError(Exception):
+    """A transient provider failure (timeout, throttling, 5xx); the submission may be retried"""
+
+class KycDecision:
+    """A provider's verdict on one KYC submission"""
+    
+    __slots__ = ('status', 'reference', 'reason')
+    
+    def __init__(self, status: str, reference: Optional[str] = None, reason: Optional[str] = None):
+        if status not in ('verified', 'rejected'):
+            raise ValueError(f"Invalid KYC decision: {status}")
+        self.status = status
+        self.reference = reference
+        self.reason = reason
+
+class FakeKycProvider:
+    """
+    Local stand-in for a KYC provider, for development and tests.
+    
+    Verifies any supported document with a document number and front image
+    and rejects the rest. Each call sleeps latency_ms; failure_rate of calls
+    raise KycProviderError, so retry paths can be exercised. References are
+    derived from the record id, so retries return the same one.
+    """
+    
+    name = 'fake'
+    
+    def __init__(self, latency_ms: float = 20.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config) -> 'FakeKycProvider':
+        return cls(config['KYC_FAKE_LATENCY_MS'], config['KYC_FAKE_FAILURE_RATE'])
+    
+    def verify(self, submission: Dict) -> KycDecision:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            fails = self._random.random() < self.failure_rate
+        if fails:
+            raise KycProviderError("Fake provider unavailable")
+        
+        reference = f"fake-{hashlib.sha1(submission['id'].encode()).hexdigest()[:16]}"
+        if submission.get('document_type') not in SUPPORTED_DOCUMENTS:
+            return KycDecision('rejected', reference, f"Unsupported document type: {submission.get('document_type')}")
+        if not submission.get('document_number') or not submission.get('document_front_url'):
+            return KycDecision('rejected', reference, "Document number and front image are required")
+        return KycDecision('verified', reference)
+
+# Built-in adapters by KYC_PROVIDER name
+PROVIDERS = {
+    'fake': FakeKycProvider
+}
+
+def create_provider(name: str, config):
+    """
+    The adapter named by KYC_PROVIDER: a built-in name, or 'package.module:Class'
+    for an external one. Adapters have a name (stored as KYCRecord.provider),
+    implement verify(submission) -> KycDecision, raise KycProviderError for
+    retryable failures and may define from_config(config).
+    """
+    if name in PROVIDERS:
+        provider_class = PROVIDERS[name]
+    elif ':' in name:
+        module_name, _, class_name = name.partition(':')
+        provider_class = getattr(importlib.import_module(module_name), class_name)
+    else:
+        raise ValueError(f"Unknown KYC provider: {name}")
+    if hasattr(provider_class, 'from_config'):
+        return provider_class.from_config(config)
+    return provider_class()
@@ -4,6 +4,9 @@ from app.repositories.transaction_repository import TransactionRepository
 from app.models.payment import Payment, PaymentMethod
 from app.models.transaction import Transaction, TransactionStatus
 from app import db
+from app.repositories.unit_of_work import unit_of_work
+from app.services.fraud_service import FraudService
+from app.services.compliance_service import ComplianceService
 from typing import Dict, Optional
 from decimal import Decimal
 from app.utils.logger import get_logger
@@ -17,6 +20,8 @@ class PaymentService:
         self.payment_repo = PaymentRepository()
         self.account_repo = AccountRepository()
         self.transaction_repo = TransactionRepository()
+        self.fraud_service = FraudService()
+        self.compliance_service = ComplianceService()
     
     def process_payment(self, user_id: str, account_id: str, data: Dict) -> Payment:
         """Process a payment through payment gateway"""
@@ -34,26 +39,34 @@ class PaymentService:
             metadata=data.get('metadata')
         )
         
+        # Committed before calling the gateway so the attempt is never lost
         payment = self.payment_repo.create(payment)
         
         try:
             # Process through gateway
             gateway_response = self._process_gateway_payment(payment, data)
             
-            payment.gateway_transaction_id = gateway_response.get('transaction_id')
-            payment.gateway_response = gateway_response
-            
-            if gateway_response.get('status') == 'succeeded':
-                payment.status = 'completed'
-                payment.processed_at = datetime.utcnow()
+            # Payment outcome and its transaction record share one commit
+            with unit_of_work():
+                payment.gateway_transaction_id = gateway_response.get('transaction_id')
+                payment.gateway_response = gateway_response
+                
+                if gateway_response.get('status') == 'succeeded':
+                    payment.status = 'completed'
+                    payment.processed_at = datetime.utcnow()
+                    
+                    # Create transaction record
+                    transaction = self._create_payment_transaction(payment)
+                    self._record_compliance(transaction)
+                else:
+                    payment.status = 'failed'
+                    payment.failure_reason = gateway_response.get('error_message')
                 
-                # Create transaction record
-                transaction = self._create_payment_transaction(payment)
-            else:
-                payment.status = 'failed'
-                payment.failure_reason = gateway_response.get('error_message')
+                payment = self.payment_repo.update(payment)
             
-            payment = self.payment_repo.update(payment)
+            if payment.status == 'completed':
+                self.fraud_service.observe_transaction(transaction)
+                self.compliance_service.observe_transaction(transaction)
             
             logger.info(f"Payment processed: {payment.id} status={payment.status}")
             return payment
@@ -109,6 +122,20 @@ class PaymentService:
         transaction = self.transaction_repo.create(transaction)
         return transaction
     
+    def _record_compliance(self, transaction: Transaction):
+        """
+        Check a captured payment that is above the KYC threshold or structured
+        under it. The money has already moved, so the check does not change
+        the transaction; a review or failed check flags it for compliance ops.
+        """
+        aml_result = self.compliance_service.assess_aml(transaction)
+        if not self.compliance_service.requires_check(transaction, aml_result):
+            return
+        compliance_check = self.compliance_service.evaluate_transaction(transaction, aml_result)
+        if compliance_check:
+            self.compliance_service.record_check(compliance_check)
+            transaction.compliance_check_id = compliance_check.id
+    
     # TODO: Add payment refund
     # TODO: Add payment cancellation
     # TODO: Add webhook handling for gateway callbacks
@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from sqlalchemy.engine import make_url
+from typing import Any, Callable, Dict, Optional
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+import threading
+import time
+
+logger = get_logger(__name__)
+
+FAIL_OPEN = 'open'
+FAIL_CLOSED = 'closed'
+
+class CheckOutcome:
+    """Result of one pre-check: its value, or why it has none"""
+    
+    def __init__(self, name: str, result: Any = None, error: Optional[str] = None,
+                 timed_out: bool = False, elapsed_ms: float = 0.0, policy: str = FAIL_OPEN):
+        self.name = name
+        self.result = result
+        self.error = error
+        self.timed_out = timed_out
+        self.elapsed_ms = elapsed_ms
+        self.policy = policy
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+    
+    @property
+    def blocks(self) -> bool:
+        """True when the check did not complete and its policy is fail-closed"""
+        return not self.ok and self.policy == FAIL_CLOSED
+
+class PrecheckExecutor:
+    """
+    Run independent transaction pre-checks concurrently.
+    
+    Checks are submitted to a bounded thread pool, each inside its own app
+    context (and so its own database session), and waited on with a
+    per-check timeout. A check that raises or times out yields an outcome
+    without a result; whether that blocks the transaction is decided by its
+    fail-open / fail-closed policy. Every check's wall time is recorded in
+    the '<metric_prefix>.<name>' timing.
+    """
+    
+    def __init__(self, max_workers: int = 8, parallel: bool = True, metric_prefix: str = 'precheck'):
+        self.max_workers = max_workers
+        self.parallel = parallel
+        self.metric_prefix = metric_prefix
+        self.timeouts: Dict[str, Optional[float]] = {}
+        self.policies: Dict[str, str] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.max_workers = app.config['PRECHECK_MAX_WORKERS']
+        self.parallel = app.config['PRECHECK_PARALLEL']
+        self.timeouts = {
+            'fraud': app.config['FRAUD_CHECK_TIMEOUT_MS'] / 1000,
+            'compliance': app.config['COMPLIANCE_CHECK_TIMEOUT_MS'] / 1000
+        }
+        self.policies = {
+            'fraud': app.config['FRAUD_CHECK_FAILURE_POLICY'],
+            'compliance': app.config['COMPLIANCE_CHECK_FAILURE_POLICY']
+        }
+        for name, policy in self.policies.items():
+            if policy not in (FAIL_OPEN, FAIL_CLOSED):
+                raise ValueError(f"Invalid failure policy for {name} check: {policy}")
+        self.shutdown()
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.metric_prefix)
+            return self._pool
+    
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+    
+    def run(self, checks: Dict[str, Callable[[], Any]], wait: bool = False) -> Dict[str, CheckOutcome]:
+        """
+        Run every callable in checks and return {name: CheckOutcome}.
+        
+        With wait=True the per-check timeouts are ignored, for batch jobs
+        whose checks scale with the batch size.
+        """
+        if not checks:
+            return {}
+        if not self.parallel:
+            return {name: self._run_inline(name, fn) for name, fn in checks.items()}
+        
+        app = current_app._get_current_object()
+        pool = self._get_pool()
+        started = time.perf_counter()
+        futures = {name: pool.submit(self._call_in_context, app, fn) for name, fn in checks.items()}
+        
+        outcomes = {}
+        for name, future in futures.items():
+            policy = self.policies.get(name, FAIL_OPEN)
+            timeout = None if wait else self.timeouts.get(name)
+            remaining = None if timeout is None else max(0.0, started + timeout - time.perf_counter())
+            try:
+                result, elapsed_ms = future.result(timeout=remaining)
+                outcomes[name] = CheckOutcome(name, result=result, elapsed_ms=elapsed_ms, policy=policy)
+            except FutureTimeoutError:
+                # The worker cannot be interrupted; it finishes in the background
+                future.cancel()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                metrics.incr(f"{self.metric_prefix}.{name}.timeout")
+                logger.warning(f"{name} check timed out after {elapsed_ms:.0f}ms (fail-{policy})")
+                outcomes[name] = CheckOutcome(name, timed_out=True, elapsed_ms=elapsed_ms, policy=policy)
+            except Exception as e:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                metrics.incr(f"{self.metric_prefix}.{name}.error")
+                logger.error(f"{name} check failed: {str(e)} (fail-{policy})")
+                outcomes[name] = CheckOutcome(name, error=str(e), elapsed_ms=elapsed_ms, policy=policy)
+            metrics.observe(f"{self.metric_prefix}.{name}", outcomes[name].elapsed_ms)
+        
+        metrics.observe(f"{self.metric_prefix}.total", (time.perf_counter() - started) * 1000)
+        return outcomes
+    
+    def _run_inline(self, name: str, fn: Callable[[], Any]) -> CheckOutcome:
+        policy = self.policies.get(name, FAIL_OPEN)
+        start = time.perf_counter()
+        try:
+            result = fn()
+            outcome = CheckOutcome(name, result=result, policy=policy)
+        except Exception as e:
+            metrics.incr(f"{self.metric_prefix}.{name}.error")
+            logger.error(f"{name} check failed: {str(e)} (fail-{policy})")
+            outcome = CheckOutcome(name, error=str(e), policy=policy)
+        outcome.elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.observe(f"{self.metric_prefix}.{name}", outcome.elapsed_ms)
+        return outcome
+    
+    @staticmethod
+    def _call_in_context(app, fn: Callable[[], Any]):
+        start = time.perf_counter()
+        with app.app_context():
+            result = fn()
+        return result, (time.perf_counter() - start) * 1000
+
+class FraudFeatureExecutor(PrecheckExecutor):
+    """
+    Runs the fraud check's input lookups concurrently, each under its own
+    latency budget (FRAUD_FEATURE_<NAME>_BUDGET_MS), so one slow query
+    degrades the score instead of delaying the transaction. Lookups are
+    always fail-open; timings go to 'fraud_feature.<name>'.
+    """
+    
+    FEATURES = ('user', 'velocity', 'device', 'cluster')
+    
+    def __init__(self):
+        super().__init__(max_workers=16, metric_prefix='fraud_feature')
+    
+    def init_app(self, app):
+        self.max_workers = app.config['FRAUD_FEATURE_MAX_WORKERS']
+        self.parallel = app.config['PRECHECK_PARALLEL'] and app.config['FRAUD_FEATURE_BUDGETS_ENABLED']
+        self.timeouts = {
+            name: app.config[f'FRAUD_FEATURE_{name.upper()}_BUDGET_MS'] / 1000 for name in self.FEATURES
+        }
+        self.shutdown()
+
+def engine_pool_options(config) -> Dict[str, int]:
+    """
+    SQLAlchemy pool options with a connection for every thread that can hold
+    one at the same time: DB_POOL_SIZE for request threads, plus each
+    pre-check, fraud feature lookup and deferred compliance worker (each
+    runs in its own app context and session). Workers that outlive their
+    timeout keep their connection until they finish, so the pool never
+    waits on them. In-memory SQLite shares one connection and gets none.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    workers = 0
+    if config['PRECHECK_PARALLEL']:
+        workers += config['PRECHECK_MAX_WORKERS']
+        if config['FRAUD_FEATURE_BUDGETS_ENABLED']:
+            workers += config['FRAUD_FEATURE_MAX_WORKERS']
+    if config['COMPLIANCE_ASYNC_ENABLED']:
+        workers += config['COMPLIANCE_ASYNC_WORKERS']
+    return {'pool_size': config['DB_POOL_SIZE'] + workers, 'max_overflow': config['DB_POOL_MAX_OVERFLOW']}
+
+precheck_executor = PrecheckExecutor()
+feature_executor = FraudFeatureExecutor()
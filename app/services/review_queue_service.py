@@ -0,0 +1,133 @@
+from app.models.fraud import FraudCheck
+from app.repositories.fraud_repository import FraudRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.unit_of_work import unit_of_work
+from app.services.fraud_service import FraudService
+from app.services.transaction_holds import TransactionHoldService
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from flask import current_app
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import base64
+import json
+
+logger = get_logger(__name__)
+
+MANUAL_REJECTION_MESSAGE = "Transaction rejected after manual fraud review"
+
+_DECISIONS = {'approve': 'approved', 'reject': 'rejected'}
+
+def encode_cursor(fraud_check: FraudCheck) -> str:
+    """Opaque cursor for the queue position just after fraud_check"""
+    key = [fraud_check.risk_score, str(fraud_check.amount), fraud_check.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[float, Decimal, str]:
+    try:
+        risk_score, amount, check_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(risk_score), Decimal(amount), str(check_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class ReviewQueueService:
+    """
+    Manual review queue for fraud checks triaged to 'review'.
+    
+    Items are served highest risk score first, then largest amount, from a
+    partial index that only holds queued rows. Listing pages by keyset
+    cursor, so the dashboard reads one page of index entries no matter how
+    deep the backlog is. Analysts claim items under a time-limited lease;
+    an item whose lease expires (analyst gone, browser closed) becomes
+    claimable again without any cleanup job.
+    """
+    
+    def __init__(self):
+        self.fraud_repo = FraudRepository()
+        self.transaction_repo = TransactionRepository()
+        self.fraud_service = FraudService()
+        self.holds = TransactionHoldService()
+    
+    def list_page(self, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        after = decode_cursor(cursor) if cursor else None
+        items = self.fraud_repo.get_review_page(limit, after)
+        return {
+            'items': [c.to_dict() for c in items],
+            'next_cursor': encode_cursor(items[-1]) if len(items) == limit else None
+        }
+    
+    def claim(self, analyst_id: str, limit: int = 1) -> List[FraudCheck]:
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=current_app.config['REVIEW_LEASE_SECONDS'])
+        with unit_of_work():
+            claimed = self.fraud_repo.claim_reviews(analyst_id, limit, now, lease_until)
+        metrics.incr('review_queue.claimed', len(claimed))
+        return claimed
+    
+    def renew(self, check_id: str, analyst_id: str) -> FraudCheck:
+        """Extend the analyst's lease on an item"""
+        with unit_of_work():
+            fraud_check = self._lock_leased(check_id, analyst_id)
+            fraud_check.review_lease_expires_at = datetime.utcnow() + timedelta(
+                seconds=current_app.config['REVIEW_LEASE_SECONDS']
+            )
+        return fraud_check
+    
+    def release(self, check_id: str, analyst_id: str) -> FraudCheck:
+        """Give an item back to the queue undecided"""
+        with unit_of_work():
+            fraud_check = self._lock_leased(check_id, analyst_id)
+            fraud_check.review_claimed_by = None
+            fraud_check.review_lease_expires_at = None
+        metrics.incr('review_queue.released')
+        return fraud_check
+    
+    def decide(self, check_id: str, analyst_id: str, decision: str, reason: Optional[str] = None) -> FraudCheck:
+        """
+        Approve or reject a leased item, which leaves the queue. Approval
+        releases the transaction's held credit (unless a compliance check
+        still holds it); rejection reverses its balance changes and fails
+        it, as automated rejection does.
+        """
+        if decision not in _DECISIONS:
+            raise ValueError("Decision must be 'approve' or 'reject'")
+        status = _DECISIONS[decision]
+        
+        with unit_of_work():
+            fraud_check = self._lock_leased(check_id, analyst_id)
+            waited = datetime.utcnow() - fraud_check.created_at
+            fraud_check.status = status
+            fraud_check.decision_reason = reason or f"Manual review: {status}"
+            fraud_check.reviewed_by = analyst_id
+            fraud_check.reviewed_at = datetime.utcnow()
+            fraud_check.review_claimed_by = None
+            fraud_check.review_lease_expires_at = None
+            if status == 'rejected':
+                self.holds.reverse([fraud_check.transaction_id], MANUAL_REJECTION_MESSAGE)
+            else:
+                self.holds.release([fraud_check.transaction_id])
+            self.fraud_service.record_decisions([(fraud_check, 'review', status)])
+        
+        metrics.incr(f'review_queue.{status}')
+        logger.info(f"Fraud check {check_id} {status} by {analyst_id} after {waited.total_seconds():.0f}s in queue")
+        return fraud_check
+    
+    def stats(self) -> Dict:
+        """Queue depth, leased items and age of the oldest item in seconds"""
+        now = datetime.utcnow()
+        stats = self.fraud_repo.get_review_queue_stats(now)
+        oldest = stats.pop('oldest_created_at')
+        stats['oldest_age_seconds'] = (now - oldest).total_seconds() if oldest else 0.0
+        stats['available'] = stats['depth'] - stats['leased']
+        return stats
+    
+    def _lock_leased(self, check_id: str, analyst_id: str) -> FraudCheck:
+        """Lock a queued item and check that analyst_id holds a live lease on it"""
+        fraud_check = self.fraud_repo.lock_review(check_id)
+        if not fraud_check or fraud_check.status != 'review':
+            raise ValueError("Review item not found")
+        if fraud_check.review_claimed_by != analyst_id or fraud_check.review_lease_expires_at is None \
+                or fraud_check.review_lease_expires_at <= datetime.utcnow():
+            raise ValueError("Review item is not leased to you")
+        return fraud_check
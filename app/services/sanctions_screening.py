@@ -0,0 +1,278 @@
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from app.utils.name_matching import TERM_COUNT, gram_terms, name_tokens, phonetic_terms
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+logger = get_logger(__name__)
+
+SNAPSHOT_MAGIC = b'SNCT'
+SNAPSHOT_VERSION = 1
+
+# Snapshot sections in file order: (name, numpy dtype or None for raw bytes)
+_SECTIONS = (
+    ('name_entry', '<u4'),     # name -> entry it belongs to
+    ('name_grams', '<u4'),     # distinct trigrams per name
+    ('name_keys', '<u4'),      # distinct phonetic keys per name
+    ('name_offsets', '<u4'),   # n_names + 1 offsets into name_blob
+    ('name_blob', None),
+    ('entry_offsets', '<u4'),  # n_entries + 1 offsets into entry_blob
+    ('entry_blob', None),      # list \t id \t program per entry
+    ('term_offsets', '<u4'),   # TERM_COUNT + 1 offsets into posting_ids
+    ('posting_ids', '<u4'),    # name ids per term, ascending
+)
+_HEADER = struct.Struct('<4sIII' + 'QQ' * len(_SECTIONS))
+
+def name_terms(name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(trigram term ids, phonetic term ids) indexed for a name"""
+    tokens = name_tokens(name)
+    return gram_terms(tokens), phonetic_terms(tokens)
+
+def _blob(strings: List[str]) -> Tuple[np.ndarray, bytes]:
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, b''.join(encoded)
+
+def write_snapshot(entries: Iterable[Dict], path: str) -> Dict[str, int]:
+    """
+    Compile list entries ({'list', 'id', 'program', 'names': [...]}) into a
+    snapshot file that SanctionsIndex maps without parsing. The file is
+    written next to path and renamed over it, so readers never see a partial
+    snapshot. Returns entry and name counts.
+    """
+    name_entry, name_grams, name_keys, names, entry_rows = [], [], [], [], []
+    terms, term_names = [], []
+    for entry_index, entry in enumerate(entries):
+        entry_rows.append('\t'.join(str(entry.get(k) or '').replace('\t', ' ') for k in ('list', 'id', 'program')))
+        for name in dict.fromkeys(entry['names']):
+            grams, keys = name_terms(name)
+            if not len(grams):
+                continue
+            name_id = len(names)
+            names.append(name)
+            name_entry.append(entry_index)
+            name_grams.append(len(grams))
+            name_keys.append(len(keys))
+            terms += [grams, keys]
+            term_names.append(np.full(len(grams) + len(keys), name_id, dtype='<u4'))
+    
+    terms = np.concatenate(terms) if terms else np.zeros(0, dtype=np.int64)
+    term_names = np.concatenate(term_names) if term_names else np.zeros(0, dtype='<u4')
+    order = np.argsort(terms, kind='stable')  # name ids stay ascending within a term
+    term_offsets = np.zeros(TERM_COUNT + 1, dtype='<u4')
+    np.cumsum(np.bincount(terms, minlength=TERM_COUNT), out=term_offsets[1:])
+    
+    name_offsets, name_blob = _blob(names)
+    entry_offsets, entry_blob = _blob(entry_rows)
+    sections = {
+        'name_entry': np.array(name_entry, dtype='<u4'),
+        'name_grams': np.array(name_grams, dtype='<u4'),
+        'name_keys': np.array(name_keys, dtype='<u4'),
+        'name_offsets': name_offsets,
+        'name_blob': name_blob,
+        'entry_offsets': entry_offsets,
+        'entry_blob': entry_blob,
+        'term_offsets': term_offsets,
+        'posting_ids': term_names[order],
+    }
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        layout, position = [], _HEADER.size
+        for name, _ in _SECTIONS:
+            data = sections[name] if isinstance(sections[name], bytes) else sections[name].tobytes()
+            position += -position % 8  # keep every array 8-byte aligned
+            layout.append((position, data))
+            position += len(data)
+        header = [SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(entry_rows), len(names)]
+        for offset, data in layout:
+            header += [offset, len(data)]
+        f.write(_HEADER.pack(*header))
+        for offset, data in layout:
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+    return {'entries': len(entry_rows), 'names': len(names)}
+
+class SanctionsIndex:
+    """
+    A sanctions list snapshot mapped read-only into memory.
+    
+    Every section is a zero-copy numpy view of the mapping, so opening a
+    snapshot costs the same for ten entries or ten million and its pages are
+    shared by every worker process on the host. Names are matched by
+    trigram overlap (Dice coefficient: insensitive to word order, spelling
+    slips and transliteration) averaged with the share of Soundex keys in
+    common (sound-alike spellings). Terms are dense integers, so a
+    screening gathers its posting lists with array indexing and counts
+    shared terms with one sort, with no per-name Python work.
+    """
+    
+    def __init__(self, path: str, cache_size: int = 10000):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.entry_count, self.name_count, *layout = _HEADER.unpack_from(self._mmap)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path}: not a version {SNAPSHOT_VERSION} sanctions snapshot")
+        for index, (name, dtype) in enumerate(_SECTIONS):
+            offset, length = layout[2 * index], layout[2 * index + 1]
+            if dtype is None:
+                section = memoryview(self._mmap)[offset:offset + length]
+            else:
+                section = np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+            setattr(self, '_' + name, section)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+    
+    def _shared(self, terms: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """How many of terms each candidate name has, by binary search in each term's postings"""
+        shared = np.zeros(len(candidates), dtype=np.int64)
+        for term in terms:
+            postings = self._posting_ids[self._term_offsets[term]:self._term_offsets[term + 1]]
+            if len(postings):
+                found = np.minimum(np.searchsorted(postings, candidates), len(postings) - 1)
+                shared += postings[found] == candidates
+        return shared
+    
+    def _match(self, name: str, threshold: float, limit: int = 5) -> Tuple[Tuple, ...]:
+        """((score, name id), ...) of the best names scoring at least threshold"""
+        grams, keys = name_terms(name)
+        if not len(grams) or not self.name_count:
+            return ()
+        
+        # score = (dice + phonetic) / 2 and phonetic <= 1, so dice must reach
+        # 2 * threshold - 1; dice <= 2c / (len(grams) + c) bounds the shared count c
+        min_dice = max(2 * threshold - 1, 0.0)
+        min_shared = max(1, math.ceil(min_dice * len(grams) / (2 - min_dice)))
+        
+        # Shared trigrams per name: gather every query gram's posting list
+        # and count runs of equal ids once sorted
+        starts = self._term_offsets[grams].astype(np.int64)
+        lengths = self._term_offsets[grams + 1] - starts
+        positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(int(lengths.sum()))
+        ids = np.sort(self._posting_ids[positions])
+        if not len(ids):
+            return ()
+        run_starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+        counts = np.diff(np.append(run_starts, len(ids)))
+        keep = counts >= min_shared
+        candidates, counts = ids[run_starts[keep]], counts[keep]
+        if not len(candidates):
+            return ()
+        dice = 2 * counts / (len(grams) + self._name_grams[candidates])
+        
+        phonetic = self._shared(keys, candidates) / np.maximum(len(keys), self._name_keys[candidates]) if len(keys) else 0.0
+        
+        scores = (dice + phonetic) / 2
+        hits = np.flatnonzero(scores >= threshold)
+        best = hits[np.argsort(-scores[hits], kind='stable')][:limit]
+        return tuple((round(float(scores[i]), 4), int(candidates[i])) for i in best)
+    
+    def find(self, name: str, threshold: float) -> List[Dict]:
+        """Listed names matching name: [{'list', 'id', 'program', 'name', 'score'}], best first"""
+        found = self.match(' '.join(name_tokens(name)), threshold)
+        return [dict(self.describe(name_id), score=score) for score, name_id in found]
+    
+    def describe(self, name_id: int) -> Dict:
+        entry_id = int(self._name_entry[name_id])
+        list_name, list_id, program = self._string(self._entry_offsets, self._entry_blob, entry_id).split('\t')
+        return {
+            'list': list_name,
+            'id': list_id,
+            'program': program,
+            'name': self._string(self._name_offsets, self._name_blob, name_id)
+        }
+    
+    @staticmethod
+    def _string(offsets: np.ndarray, blob: memoryview, index: int) -> str:
+        return bytes(blob[int(offsets[index]):int(offsets[index + 1])]).decode()
+
+class SanctionsScreener:
+    """
+    Screens names against the compiled sanctions lists at SANCTIONS_SNAPSHOT_PATH.
+    
+    The snapshot's modification time is checked at most every
+    reload_seconds during screening; a new snapshot (written by
+    app.processors.sanctions_list_processor) is mapped and swapped in, and
+    one that fails to open is logged and ignored so the last good lists stay
+    active. Repeated names are answered from a per-snapshot LRU cache.
+    Screening time is recorded in the 'sanctions.screen' timing.
+    """
+    
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.8,
+                 reload_seconds: float = 60.0, cache_size: int = 10000):
+        self.path = path
+        self.threshold = threshold
+        self.reload_seconds = reload_seconds
+        self.cache_size = cache_size
+        self.index: Optional[SanctionsIndex] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.path = app.config['SANCTIONS_SNAPSHOT_PATH']
+        self.threshold = app.config['SANCTIONS_MATCH_THRESHOLD']
+        self.reload_seconds = app.config['SANCTIONS_RELOAD_SECONDS']
+        self.cache_size = app.config['SANCTIONS_CACHE_SIZE']
+        self.index = None
+        self._mtime = None
+        if os.path.exists(self.path):
+            self.load()
+        else:
+            logger.warning(f"No sanctions snapshot at {self.path}; sanctions screening is disabled")
+    
+    @property
+    def snapshot(self) -> Optional[float]:
+        """Identifies the loaded snapshot (its modification time); None when none is loaded"""
+        return self._mtime if self.index is not None else None
+    
+    def load(self) -> int:
+        """(Re)map the snapshot at path; raises ValueError/OSError on a bad file"""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            self.index = SanctionsIndex(self.path, self.cache_size)
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.reload_seconds
+        logger.info(f"Loaded {self.index.entry_count} sanctions entries ({self.index.name_count} names) from {self.path}")
+        return self.index.entry_count
+    
+    def screen(self, name: str, threshold: Optional[float] = None) -> Dict:
+        """{'screened', 'flagged', 'matches': [{'list', 'id', 'program', 'name', 'score'}], 'elapsed_us'}"""
+        if self.path and time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        index = self.index
+        if index is None:
+            return {'screened': False, 'flagged': False, 'matches': []}
+        
+        start = time.perf_counter()
+        matches = index.find(name, self.threshold if threshold is None else threshold)
+        elapsed = time.perf_counter() - start
+        metrics.observe('sanctions.screen', elapsed * 1000)
+        if matches:
+            metrics.incr('sanctions.match')
+        return {'screened': True, 'flagged': bool(matches), 'matches': matches, 'elapsed_us': round(elapsed * 1e6, 1)}
+    
+    def _maybe_reload(self):
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already checking
+        try:
+            self._next_check = time.monotonic() + self.reload_seconds
+            if not os.path.exists(self.path) or os.stat(self.path).st_mtime == self._mtime:
+                return
+            self.index = SanctionsIndex(self.path, self.cache_size)
+            self._mtime = os.stat(self.path).st_mtime
+            logger.info(f"Reloaded sanctions snapshot {self.path}: {self.index.entry_count} entries")
+        except Exception as e:
+            logger.error(f"Sanctions snapshot reload failed, keeping previous lists: {str(e)}")
+        finally:
+            self._lock.release()
+
+sanctions_screener = SanctionsScreener()
@@ -1,16 +1,22 @@
 from app.repositories.settlement_repository import SettlementRepository
 from app.repositories.transaction_repository import TransactionRepository
 from app.models.settlement import Settlement, SettlementBatch, SettlementStatus
-from app.models.transaction import Transaction
 from app import db
-from typing import List
+from app.repositories.unit_of_work import unit_of_work
+from flask import current_app
+from typing import Callable, List, Optional
 from decimal import Decimal
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 from datetime import datetime
+import time
 import uuid
 
 logger = get_logger(__name__)
 
+# Seconds between progress log lines of a running batch
+_PROGRESS_SECONDS = 10
+
 class SettlementService:
     def __init__(self):
         self.settlement_repo = SettlementRepository()
@@ -23,8 +29,20 @@ class SettlementService:
         logger.info(f"Settlement batch created: {batch.id}")
         return batch
     
-    def process_settlement_batch(self, batch_id: str) -> SettlementBatch:
-        """Process all transactions in a settlement batch"""
+    def process_settlement_batch(self, batch_id: str, chunk_size: Optional[int] = None,
+                                 progress: Optional[Callable[[SettlementBatch], None]] = None) -> SettlementBatch:
+        """
+        Settle every completed, unsettled transaction in the batch's currency.
+        
+        The pending set is walked in transaction id order in chunks of
+        chunk_size (default SETTLEMENT_BATCH_SIZE), so memory stays flat
+        whatever the backlog. Each chunk's settlements are bulk-inserted,
+        its transactions linked in one UPDATE, and the batch totals updated
+        in the same commit, so an interruption loses at most one chunk and a
+        rerun settles the rest. A chunk that fails is rolled back and
+        counted as failed; its transactions are left for a later batch.
+        progress, if given, is called with the batch after every chunk.
+        """
         batch = self.settlement_repo.get_by_id(batch_id)
         if not batch:
             raise ValueError("Batch not found")
@@ -35,61 +53,71 @@ class SettlementService:
         batch.status = SettlementStatus.PROCESSING
         db.session.commit()
         
-        # Get transactions for settlement
-        transactions = self.transaction_repo.get_pending_settlement(
-            limit=100  # TODO: Make configurable
-        )
-        
-        total_amount = Decimal('0.00')
-        total_fees = Decimal('0.00')
-        processed_count = 0
-        failed_count = 0
-        
-        for transaction in transactions:
+        chunk_size = chunk_size or current_app.config['SETTLEMENT_BATCH_SIZE']
+        started = last_report = time.monotonic()
+        after = None
+        while True:
+            rows = None
             try:
-                settlement = self._create_settlement(transaction, batch)
-                total_amount += settlement.amount
-                total_fees += settlement.fee
-                processed_count += 1
+                with unit_of_work():
+                    rows = self.transaction_repo.get_pending_settlement_page(batch.currency, chunk_size, after)
+                    if rows:
+                        self._settle_chunk(batch, rows)
             except Exception as e:
-                logger.error(f"Settlement failed for transaction {transaction.id}: {str(e)}")
-                failed_count += 1
+                if not rows:
+                    raise
+                # The rollback reloaded the batch totals without this chunk
+                logger.error(f"Settlement failed for {len(rows)} transactions up to {rows[-1].id}: {str(e)}")
+                with unit_of_work():
+                    batch.transaction_count += len(rows)
+                    batch.failed_count += len(rows)
+            if not rows:
+                break
+            after = rows[-1].id
+            
+            metrics.incr('settlement.transactions', len(rows))
+            if progress:
+                progress(batch)
+            if time.monotonic() - last_report >= _PROGRESS_SECONDS:
+                last_report = time.monotonic()
+                rate = batch.processed_count / (last_report - started)
+                logger.info(f"Settlement batch {batch.id}: {batch.processed_count} settled, "
+                            f"{batch.failed_count} failed, {rate:.0f} transactions/s")
         
-        batch.total_amount = total_amount
-        batch.total_fees = total_fees
-        batch.transaction_count = len(transactions)
-        batch.processed_count = processed_count
-        batch.failed_count = failed_count
-        batch.status = SettlementStatus.COMPLETED if failed_count == 0 else SettlementStatus.PROCESSING
-        batch.processed_at = datetime.utcnow()
+        with unit_of_work():
+            batch.status = SettlementStatus.COMPLETED if batch.failed_count == 0 else SettlementStatus.PROCESSING
+            batch.processed_at = datetime.utcnow()
         
-        db.session.commit()
-        
-        logger.info(f"Settlement batch processed: {batch.id} processed={processed_count} failed={failed_count}")
+        logger.info(f"Settlement batch processed: {batch.id} processed={batch.processed_count} "
+                    f"failed={batch.failed_count} in {time.monotonic() - started:.1f}s")
         return batch
     
-    def _create_settlement(self, transaction: Transaction, batch: SettlementBatch) -> Settlement:
-        """Create settlement record for a transaction"""
-        settlement = Settlement(
-            id=str(uuid.uuid4()),
-            batch_id=batch.id,
-            transaction_id=transaction.id,
-            account_id=transaction.account_id,
-            amount=transaction.amount,
-            fee=transaction.fee,
-            net_amount=transaction.net_amount,
-            currency=transaction.currency,
-            status='pending',
-            settlement_reference=f"STL-{uuid.uuid4().hex[:12].upper()}"
-        )
-        
-        settlement = self.settlement_repo.create(settlement)
-        
-        # Update transaction with settlement reference
-        transaction.settlement_id = settlement.id
-        db.session.commit()
+    def _settle_chunk(self, batch: SettlementBatch, rows: List):
+        """Settle one page of transactions and add it to the batch totals; runs inside the caller's unit of work"""
+        now = datetime.utcnow()
+        self.settlement_repo.insert_settlements([
+            {
+                'id': str(uuid.uuid4()),
+                'batch_id': batch.id,
+                'transaction_id': row.id,
+                'account_id': row.account_id,
+                'amount': row.amount,
+                'fee': row.fee,
+                'net_amount': row.net_amount,
+                'currency': batch.currency,
+                'status': 'pending',
+                'settlement_reference': f"STL-{uuid.uuid4().hex[:12].upper()}",
+                'created_at': now,
+                'updated_at': now
+            }
+            for row in rows
+        ])
+        self.transaction_repo.link_settlements([row.id for row in rows])
         
-        return settlement
+        batch.total_amount += sum((row.amount for row in rows), Decimal('0.00'))
+        batch.total_fees += sum((row.fee for row in rows), Decimal('0.00'))
+        batch.transaction_count += len(rows)
+        batch.processed_count += len(rows)
     
     # TODO: Add settlement reconciliation
     # TODO: Add settlement reporting
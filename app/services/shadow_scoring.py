@@ -0,0 +1,194 @@
+from app.services import fraud_features
+from app.services.fraud_rules import compile_rules, fraud_rule_engine, load_rule_file
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+
+logger = get_logger(__name__)
+
+# One record per check and candidate: check id, flags, live score,
+# shadow score, live and shadow scoring time in microseconds (33 bytes)
+RECORD = struct.Struct('<16sBffII')
+LIVE_FLAGGED = 1
+SHADOW_FLAGGED = 2
+RULES_DIFFER = 4
+
+FLAGGED_LEVELS = ('high', 'critical')
+
+# How often the worker drains the queue
+_POLL_SECONDS = 0.05
+
+def is_flagged(level: str) -> bool:
+    """Whether a risk level holds the transaction for review, as FraudService decides"""
+    return level in FLAGGED_LEVELS
+
+class ShadowScorer:
+    """A candidate scorer: alternative weights, threshold and/or rule set"""
+    
+    def __init__(self, name: str, weights: Optional[List[float]] = None, threshold: Optional[float] = None,
+                 rules: Optional[Callable[[Dict], List[str]]] = None):
+        self.name = name
+        self.weights = weights
+        self.threshold = threshold
+        self.rules = rules
+    
+    @classmethod
+    def from_dict(cls, spec: Dict, base_dir: str = '.') -> 'ShadowScorer':
+        name = spec.get('name')
+        if not isinstance(name, str) or not name.replace('_', '').replace('-', '').isalnum():
+            raise ValueError(f"Shadow scorer needs a name of letters, digits, '-' and '_': {name!r}")
+        weights = spec.get('weights')
+        if weights is not None and (
+            not isinstance(weights, list) or len(weights) != len(fraud_features.RISK_COMPONENTS)
+        ):
+            raise ValueError(f"{name}: weights must list {len(fraud_features.RISK_COMPONENTS)} numbers")
+        rules = spec.get('rules')
+        if spec.get('rules_path'):
+            rules = load_rule_file(os.path.join(base_dir, spec['rules_path']))
+        return cls(name, weights, spec.get('threshold'), compile_rules(rules) if rules is not None else None)
+    
+    def evaluate(self, features: Dict[str, float], live_threshold: float):
+        """(score, level, fired rules or None when the live rules are kept)"""
+        score = float(fraud_features.risk_score(features, self.weights))
+        level = fraud_features.risk_level(score, self.threshold if self.threshold is not None else live_threshold)
+        return score, level, self.rules(features) if self.rules else None
+
+def load_scorers(path: str) -> List[ShadowScorer]:
+    """Read candidate scorers from a JSON file: {"scorers": [{"name": ..., "weights": [...], ...}]}"""
+    with open(path) as f:
+        data = json.load(f)
+    specs = data.get('scorers') if isinstance(data, dict) else data
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a list of scorers")
+    scorers = [ShadowScorer.from_dict(spec, os.path.dirname(path)) for spec in specs]
+    if len({s.name for s in scorers}) != len(scorers):
+        raise ValueError(f"{path}: duplicate scorer names")
+    return scorers
+
+class ShadowScoring:
+    """
+    Runs candidate fraud scorers next to the live one without affecting decisions.
+    
+    The request path only appends the check's already-extracted features to
+    a bounded deque: no lock, no thread wake-up, so its cost is a fixed
+    fraction of a microsecond whatever the candidates do. When the queue is
+    full the sample is dropped and counted rather than waited on, and
+    submissions slower than budget_us are counted in 'shadow.over_budget'.
+    A single background thread drains the queue every _POLL_SECONDS, scores
+    every candidate and appends one fixed-size RECORD per check to
+    <log_dir>/<candidate>.bin, which the shadow report processor joins
+    against final fraud check statuses.
+    """
+    
+    def __init__(self, log_dir: str = 'shadow', queue_size: int = 10000, budget_us: float = 50.0):
+        self.log_dir = log_dir
+        self.queue_size = queue_size
+        self.budget_us = budget_us
+        self.enabled = False
+        self.scorers: List[ShadowScorer] = []
+        self.live_threshold = 0.7
+        self._queue: Optional[deque] = None
+        self._stopping = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._files = {}
+    
+    def init_app(self, app):
+        self.stop()
+        self.enabled = app.config['SHADOW_SCORING_ENABLED']
+        self.log_dir = app.config['SHADOW_LOG_DIR']
+        self.queue_size = app.config['SHADOW_QUEUE_SIZE']
+        self.budget_us = app.config['SHADOW_BUDGET_US']
+        self.live_threshold = app.config['FRAUD_RISK_THRESHOLD']
+        self.scorers = load_scorers(app.config['SHADOW_SCORERS_PATH']) if self.enabled else []
+        if self.scorers:
+            self.start()
+            logger.info(f"Shadow scoring {', '.join(s.name for s in self.scorers)} into {self.log_dir}")
+    
+    def start(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._queue = deque()
+        self._stopping.clear()
+        self._worker = threading.Thread(target=self._run, args=(self._queue,), name='shadow-scoring', daemon=True)
+        self._worker.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Score what is queued, flush the logs and stop the worker"""
+        if self._worker is None:
+            return
+        self._stopping.set()
+        self._worker.join(timeout)
+        self._queue = None
+        self._worker = None
+    
+    def submit(self, check_id: str, features: Dict[str, float], score: float, level: str, rules: List[str]):
+        """Queue one live decision for shadow scoring; never blocks"""
+        items = self._queue
+        if items is None:
+            return
+        start = time.perf_counter()
+        if len(items) < self.queue_size:
+            items.append((check_id, features, score, level, rules))
+        else:
+            metrics.incr('shadow.dropped')
+        if (time.perf_counter() - start) * 1e6 > self.budget_us:
+            metrics.incr('shadow.over_budget')
+    
+    def _run(self, items: deque):
+        try:
+            while True:
+                stopping = self._stopping.wait(_POLL_SECONDS)
+                while items:
+                    try:
+                        self._score(*items.popleft())
+                    except Exception as e:
+                        metrics.incr('shadow.error')
+                        logger.error(f"Shadow scoring failed: {str(e)}")
+                self._flush()
+                if stopping:
+                    break
+        finally:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+    
+    def _score(self, check_id: str, features: Dict[str, float], live_score: float, live_level: str,
+               live_rules: List[str]):
+        check_key = uuid.UUID(check_id).bytes
+        # Both sides are timed here on the same steps (score, level, rules),
+        # so request-path contention never skews the latency comparison
+        start = time.perf_counter()
+        fraud_features.risk_level(fraud_features.risk_score(features), self.live_threshold)
+        fraud_rule_engine.evaluate(features)
+        live_us = (time.perf_counter() - start) * 1e6
+        for scorer in self.scorers:
+            start = time.perf_counter()
+            score, level, rules = scorer.evaluate(features, self.live_threshold)
+            if rules is None:
+                fraud_rule_engine.evaluate(features)  # a candidate keeping the live rules still runs them
+            shadow_us = (time.perf_counter() - start) * 1e6
+            
+            flags = LIVE_FLAGGED * is_flagged(live_level) | SHADOW_FLAGGED * is_flagged(level)
+            if rules is not None and set(rules) != set(live_rules):
+                flags |= RULES_DIFFER
+            if bool(flags & LIVE_FLAGGED) != bool(flags & SHADOW_FLAGGED):
+                metrics.incr(f'shadow.{scorer.name}.disagreement')
+            self._file(scorer.name).write(RECORD.pack(check_key, flags, live_score, score, int(live_us), int(shadow_us)))
+        metrics.incr('shadow.scored')
+    
+    def _file(self, name: str):
+        if name not in self._files:
+            self._files[name] = open(os.path.join(self.log_dir, f"{name}.bin"), 'ab')
+        return self._files[name]
+    
+    def _flush(self):
+        for f in self._files.values():
+            f.flush()
+
+shadow_scoring = ShadowScoring()
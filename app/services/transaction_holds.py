@@ -0,0 +1,93 @@
+from app.models.transaction import Transaction, TransactionStatus
+from app.repositories.account_repository import AccountRepository
+from app.repositories.fraud_repository import FraudRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from datetime import datetime
+from typing import List
+
+logger = get_logger(__name__)
+
+# Fraud check statuses that keep a transaction's credit held
+HOLDING_FRAUD_STATUSES = ('pending', 'review')
+
+class TransactionHoldService:
+    """
+    Release or reverse transactions processed under a hold.
+    
+    A deposit or transfer held for fraud review or for its deferred
+    compliance check is processed at creation: its source is debited, but
+    the credit lands in the destination's frozen balance and the
+    transaction stays processing (so out of settlement).
+    Releasing it makes the credit available and completes the transaction;
+    reversing it takes the frozen credit back out, refunds the source and
+    fails the transaction. A held withdrawal already only froze its amount,
+    so reversing it unfreezes the source. Both run inside the caller's unit
+    of work and lock the transactions first, so concurrent decisions on the
+    same transaction apply once.
+    """
+    
+    def __init__(self):
+        self.account_repo = AccountRepository()
+        self.fraud_repo = FraudRepository()
+        self.transaction_repo = TransactionRepository()
+    
+    def release(self, transaction_ids: List[str]) -> int:
+        """Make held credits available once nothing holds them; returns the number released"""
+        released = 0
+        for transaction in self.transaction_repo.lock_many(transaction_ids):
+            if not self._is_held_credit(transaction) or self._still_held(transaction):
+                continue
+            if transaction.destination_wallet_id and not self.account_repo.unfreeze(
+                transaction.destination_wallet_id, transaction.net_amount
+            ):
+                raise ValueError(f"Held credit of transaction {transaction.id} is missing")
+            transaction.status = TransactionStatus.COMPLETED
+            transaction.updated_at = datetime.utcnow()
+            released += 1
+        metrics.incr('transaction_holds.released', released)
+        return released
+    
+    def reverse(self, transaction_ids: List[str], error_message: str) -> int:
+        """Undo the balance changes of held transactions and fail them; returns the number reversed"""
+        reversed_count = 0
+        for transaction in self.transaction_repo.lock_many(transaction_ids):
+            if transaction.status != TransactionStatus.PROCESSING:
+                # Completed before holds existed, or already failed: nothing is held to undo
+                logger.warning(f"Transaction {transaction.id} is {transaction.status.value}; not reversed")
+                continue
+            self._undo_balances(transaction)
+            transaction.status = TransactionStatus.FAILED
+            transaction.error_message = error_message
+            transaction.updated_at = datetime.utcnow()
+            reversed_count += 1
+        metrics.incr('transaction_holds.reversed', reversed_count)
+        return reversed_count
+    
+    def _undo_balances(self, transaction: Transaction):
+        source, destination = transaction.source_wallet_id, transaction.destination_wallet_id
+        if transaction.transaction_type == 'withdrawal':
+            if source and not self.account_repo.unfreeze(source, transaction.amount):
+                raise ValueError(f"Frozen amount of transaction {transaction.id} is missing")
+            return
+        if not self._is_held_credit(transaction):
+            return  # nothing moved, e.g. a payment PaymentService has not processed
+        self.account_repo.lock_wallets([w for w in (source, destination) if w])
+        if destination and not self.account_repo.debit_frozen(destination, transaction.net_amount):
+            raise ValueError(f"Held credit of transaction {transaction.id} is missing")
+        if source:
+            self.account_repo.credit(source, transaction.amount)
+    
+    def _is_held_credit(self, transaction: Transaction) -> bool:
+        return (
+            transaction.transaction_type in ('deposit', 'transfer') and
+            transaction.status == TransactionStatus.PROCESSING and
+            transaction.processed_at is not None
+        )
+    
+    def _still_held(self, transaction: Transaction) -> bool:
+        if transaction.compliance_pending:
+            return True
+        fraud_check = self.fraud_repo.get_by_id(transaction.fraud_check_id) if transaction.fraud_check_id else None
+        return fraud_check is not None and fraud_check.status in HOLDING_FRAUD_STATUSES
@@ -6,15 +6,23 @@ from app.services.fraud_service import FraudService
 from app.services.compliance_service import ComplianceService
 from app.models.transaction import Transaction, TransactionStatus
 from app.models.audit_log import AuditLog
+from app.models.account import Wallet
+from app.repositories.unit_of_work import unit_of_work
+from app.services.precheck_executor import precheck_executor, CheckOutcome
 from app import db
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from decimal import Decimal
 from app.utils.logger import get_logger
 from datetime import datetime
+from flask import current_app
+import itertools
 import uuid
+import zlib
 
 logger = get_logger(__name__)
 
+_credit_shard_counter = itertools.count()
+
 class TransactionService:
     def __init__(self):
         self.transaction_repo = TransactionRepository()
@@ -28,18 +36,164 @@ class TransactionService:
         """Create a new transaction with fraud and compliance checks"""
         # Validate account
         account = self.account_repo.get_by_id(account_id)
+        self._validate_account(account, user_id)
+        
+        # Create transaction
+        transaction = self._build_transaction(account_id, user_id, data)
+        
+        try:
+            # Fraud, compliance, transaction and audit rows share one commit
+            with unit_of_work():
+                # Resolved up front so AML counts the recipient of this transaction too
+                destination_wallet = self._resolve_destination_wallet(transaction, data)
+                
+                # Fraud and compliance are independent and run concurrently
+                outcomes = self._run_prechecks(transaction, destination_wallet.id if destination_wallet else None)
+                fraud_check = outcomes['fraud'].result
+                compliance_check = outcomes['compliance'].result if 'compliance' in outcomes else None
+                
+                transaction = self._apply_checks(
+                    transaction, data, fraud_check, compliance_check, self._blocking_checks(outcomes),
+                    destination_wallet
+                )
+                if transaction.compliance_pending:
+                    self._mark_provisional(transaction)
+                
+                # Checks reference the transaction row and vice versa, so the
+                # transaction is flushed first and linked to its checks after
+                transaction = self.transaction_repo.add(transaction)
+                self._record_checks(transaction, fraud_check, compliance_check)
+                self.fraud_service.update_baselines([transaction])
+                
+                # Log audit trail
+                db.session.add(self._build_audit_log(transaction))
+            
+            self.fraud_service.observe_transaction(transaction)
+            self.compliance_service.observe_transaction(transaction)
+            if transaction.compliance_pending:
+                # Only queued once committed, so the worker sees the row
+                self.compliance_service.defer(transaction)
+            logger.info(f"Transaction created: {transaction.id}")
+            return transaction
+        except Exception as e:
+            logger.error(f"Error creating transaction: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    def create_transactions_batch(self, user_id: str, items: List[Dict]) -> List[Dict]:
+        """
+        Create many transactions in one pass with per-item results.
+        
+        Applies the same rules as create_transaction, but loads each account
+        once, scores fraud for the whole batch together and writes all rows
+        in a single commit. Each item is processed and written inside its
+        own savepoint: an item that fails validation, whose fraud or
+        compliance evaluation raised, or whose balance or row writes fail is
+        rolled back alone and reported as rejected; the remaining items are
+        still created.
+        """
+        results: List[Optional[Dict]] = [None] * len(items)
+        accounts = {a.id: a for a in self.account_repo.get_many(
+            item.get('account_id') for item in items if isinstance(item, dict)
+        )}
+        existing_references = self.transaction_repo.get_existing_references(
+            item.get('reference_id') for item in items if isinstance(item, dict)
+        )
+        
+        staged = []
+        seen_references = set()
+        for index, data in enumerate(items):
+            try:
+                if not isinstance(data, dict) or not data.get('account_id') or not data.get('amount'):
+                    raise ValueError("Account ID and amount are required")
+                if not data.get('transaction_type'):
+                    raise ValueError("Transaction type is required")
+                self._validate_account(accounts.get(data['account_id']), user_id)
+                
+                transaction = self._build_transaction(data['account_id'], user_id, data)
+                if transaction.reference_id in existing_references or transaction.reference_id in seen_references:
+                    raise ValueError(f"Duplicate reference_id: {transaction.reference_id}")
+                seen_references.add(transaction.reference_id)
+                staged.append((index, transaction, data))
+            except (ValueError, ArithmeticError) as e:
+                results[index] = {'index': index, 'status': 'rejected', 'error': str(e)}
+        
+        try:
+            with unit_of_work():
+                transactions = [transaction for _, transaction, _ in staged]
+                destination_wallets = [self._resolve_destination_wallet(t, data) for _, t, data in staged]
+                aml_results = self.compliance_service.assess_aml_batch(
+                    transactions, [w.id if w else None for w in destination_wallets]
+                )
+                needs_compliance = [
+                    self.compliance_service.requires_check(t, aml_result)
+                    for t, aml_result in zip(transactions, aml_results)
+                ]
+                outcomes = self._run_batch_prechecks(transactions, aml_results, needs_compliance)
+                fraud_checks = outcomes['fraud'].result or [None] * len(transactions)
+                compliance_outcome = outcomes.get('compliance')
+                compliance_checks = (compliance_outcome and compliance_outcome.result) or [None] * len(transactions)
+                blocking = self._blocking_checks(outcomes)
+                
+                created = []
+                for (index, transaction, data), fraud_check, compliance_check, needed, destination_wallet in zip(
+                    staged, fraud_checks, compliance_checks, needs_compliance, destination_wallets
+                ):
+                    # A failed compliance pass only blocks items that needed compliance
+                    item_blocking = [name for name in blocking if name != 'compliance' or needed]
+                    try:
+                        with db.session.begin_nested():
+                            self._create_batch_item(transaction, data, fraud_check, compliance_check, item_blocking,
+                                                    destination_wallet)
+                    except Exception as e:
+                        logger.warning(f"Batch item {index} rejected: {str(e)}")
+                        error = str(e) if isinstance(e, (ValueError, ArithmeticError)) else 'Failed to create transaction'
+                        results[index] = {'index': index, 'status': 'rejected', 'error': error}
+                        continue
+                    created.append((index, transaction))
+                transaction_ids = [t.id for _, t in created]
+        except Exception as e:
+            logger.error(f"Error creating transaction batch: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        # Commit expired the rows; reload them in one query rather than one each
+        self.transaction_repo.get_many(transaction_ids)
+        for index, transaction in created:
+            self.fraud_service.observe_transaction(transaction)
+            self.compliance_service.observe_transaction(transaction)
+            results[index] = {'index': index, 'status': 'created', 'transaction': transaction.to_dict()}
+        
+        logger.info(f"Transaction batch created: {len(created)} created, {len(items) - len(created)} rejected")
+        return results
+    
+    def _create_batch_item(self, transaction: Transaction, data: Dict, fraud_check, compliance_check,
+                           blocking: List[str], destination_wallet: Optional[Wallet]):
+        """Process one batch item and write its rows, in create_transaction's order"""
+        for check in (fraud_check, compliance_check):
+            if isinstance(check, Exception):
+                raise check
+        self._apply_checks(transaction, data, fraud_check, compliance_check, blocking, destination_wallet)
+        self.transaction_repo.add(transaction)
+        self._record_checks(transaction, fraud_check, compliance_check)
+        self.fraud_service.update_baselines([transaction])
+        db.session.add(self._build_audit_log(transaction))
+        # Surface this item's write errors while its savepoint can still roll them back
+        db.session.flush()
+    
+    def _validate_account(self, account, user_id: str):
         if not account or account.user_id != user_id:
             raise ValueError("Invalid account")
         
         if account.status != 'active':
             raise ValueError("Account is not active")
-        
-        # Create transaction
+    
+    def _build_transaction(self, account_id: str, user_id: str, data: Dict) -> Transaction:
         amount = Decimal(str(data['amount']))
         fee = self._calculate_fee(amount, data.get('transaction_type', 'transfer'))
         net_amount = amount - fee
         
-        transaction = Transaction(
+        return Transaction(
             id=str(uuid.uuid4()),
             account_id=account_id,
             user_id=user_id,
@@ -54,87 +208,116 @@ class TransactionService:
             status=TransactionStatus.PENDING,
             metadata=data.get('metadata')
         )
+    
+    def _apply_checks(self, transaction: Transaction, data: Dict, fraud_check, compliance_check,
+                      blocking: List[str] = (), destination_wallet: Optional[Wallet] = None) -> Transaction:
+        """
+        Decide the transaction status from its checks and process it if they pass.
         
-        try:
-            # Run fraud check
-            fraud_check = self._run_fraud_check(transaction)
-            if fraud_check:
-                transaction.fraud_check_id = fraud_check.id
-                if fraud_check.risk_level in ['high', 'critical']:
-                    transaction.status = TransactionStatus.PENDING
-                    # TODO: Add manual review queue
-            
-            # Run compliance check
-            if self._requires_compliance_check(amount):
-                compliance_check = self._run_compliance_check(transaction)
-                if compliance_check:
-                    transaction.compliance_check_id = compliance_check.id
-                    if compliance_check.status == 'failed':
-                        transaction.status = TransactionStatus.FAILED
-                        transaction.error_message = "Compliance check failed"
-            
-            # Process transaction if checks pass
-            if transaction.status == TransactionStatus.PENDING:
-                transaction = self._process_transaction(transaction, data)
-            
-            transaction = self.transaction_repo.create(transaction)
-            
-            # Log audit trail
-            self._log_audit(user_id, 'create', 'transaction', transaction.id, {
-                'amount': float(amount),
-                'currency': transaction.currency,
-                'type': transaction.transaction_type
-            })
-            
-            logger.info(f"Transaction created: {transaction.id}")
-            return transaction
-        except Exception as e:
-            logger.error(f"Error creating transaction: {str(e)}")
-            db.session.rollback()
-            raise
+        blocking names fail-closed checks that errored or timed out; any of
+        them fails the transaction as if the check had rejected it.
+        destination_wallet is the wallet _resolve_destination_wallet picked.
+        """
+        hold = False
+        if fraud_check and fraud_check.risk_level in ['high', 'critical']:
+            # FraudProcessor triages the check; what it does not auto-reject
+            # goes to the manual review queue (ReviewQueueService). Until then
+            # the credit is held, and TransactionHoldService releases or reverses it
+            transaction.status = TransactionStatus.PENDING
+            hold = True
+        if transaction.compliance_pending:
+            # Held until the deferred compliance check resolves
+            # (ComplianceService.resolve_deferred releases or reverses it)
+            hold = True
+        
+        if compliance_check and compliance_check.status == 'failed':
+            transaction.status = TransactionStatus.FAILED
+            transaction.error_message = "Compliance check failed"
+        
+        if blocking:
+            transaction.status = TransactionStatus.FAILED
+            transaction.error_message = f"{', '.join(blocking).capitalize()} check unavailable"
+        
+        # Process transaction if checks pass
+        if transaction.status == TransactionStatus.PENDING:
+            transaction = self._process_transaction(transaction, data, destination_wallet, hold)
+        
+        return transaction
+    
+    def _mark_provisional(self, transaction: Transaction):
+        """
+        Commit a transaction ahead of its deferred compliance check. One that
+        was processed is already held by _apply_checks; one that failed
+        needs no check.
+        """
+        if transaction.status == TransactionStatus.FAILED:
+            transaction.compliance_pending = False
     
-    def _process_transaction(self, transaction: Transaction, data: Dict) -> Transaction:
-        """Process the actual transaction (balance updates, etc.)"""
+    def _process_transaction(self, transaction: Transaction, data: Dict,
+                             destination_wallet: Optional[Wallet] = None, hold: bool = False) -> Transaction:
+        """
+        Process the actual transaction (balance updates, etc.). With hold, a
+        deposit or transfer credits frozen funds and stays processing until
+        TransactionHoldService releases or reverses it.
+        """
         if transaction.transaction_type in ['deposit', 'transfer']:
             # Update wallet balances
-            source_wallet_id = data.get('source_wallet_id')
-            destination_wallet_id = data.get('destination_wallet_id')
+            source_shards = []
             
-            if source_wallet_id:
-                source_wallet = self.account_repo.get_wallet(
+            if data.get('source_wallet_id'):
+                source_shards = self.account_repo.get_wallet_shards(
                     transaction.account_id,
                     'main',
                     transaction.currency
                 )
-                if source_wallet and source_wallet.available_balance >= transaction.amount:
-                    source_wallet.available_balance -= transaction.amount
-                    source_wallet.balance -= transaction.amount
-                    transaction.source_wallet_id = source_wallet_id
             
-            if destination_wallet_id:
-                destination_wallet = self.account_repo.get_wallet(
-                    data.get('destination_account_id', transaction.account_id),
-                    'main',
-                    transaction.currency
+            if destination_wallet is None:
+                destination_wallet = self._resolve_destination_wallet(transaction, data)
+            
+            # Debits hit the primary wallet and sweep from its shards if short
+            source_wallet = source_shards[0] if source_shards else None
+            sweep_ids = [w.id for w in source_shards[1:]]
+            
+            # Balance changes are conditional UPDATEs, never read-modify-write
+            if source_wallet and destination_wallet:
+                applied = self.account_repo.transfer(
+                    source_wallet.id,
+                    destination_wallet.id,
+                    transaction.amount,
+                    transaction.net_amount,
+                    sweep_wallet_ids=sweep_ids,
+                    hold=hold
                 )
-                if destination_wallet:
-                    destination_wallet.available_balance += transaction.net_amount
-                    destination_wallet.balance += transaction.net_amount
-                    transaction.destination_wallet_id = destination_wallet_id
+            elif source_wallet:
+                applied = self.account_repo.debit(source_wallet.id, transaction.amount, sweep_ids) is not None
+            elif destination_wallet:
+                credit = self.account_repo.credit_frozen if hold else self.account_repo.credit
+                applied = credit(destination_wallet.id, transaction.net_amount) is not None
+            else:
+                applied = True
+            
+            if not applied:
+                transaction.status = TransactionStatus.FAILED
+                transaction.error_message = "Insufficient balance"
+                return transaction
             
-            transaction.status = TransactionStatus.COMPLETED
+            if source_wallet:
+                transaction.source_wallet_id = source_wallet.id
+            if destination_wallet:
+                transaction.destination_wallet_id = destination_wallet.id
+            
+            transaction.status = TransactionStatus.PROCESSING if hold else TransactionStatus.COMPLETED
             transaction.processed_at = datetime.utcnow()
         elif transaction.transaction_type == 'withdrawal':
-            # For withdrawals, check balance and freeze amount
-            source_wallet = self.account_repo.get_wallet(
+            # For withdrawals, freeze the amount if the balance covers it
+            source_shards = self.account_repo.get_wallet_shards(
                 transaction.account_id,
                 'main',
                 transaction.currency
             )
-            if source_wallet and source_wallet.available_balance >= transaction.amount:
-                source_wallet.available_balance -= transaction.amount
-                source_wallet.frozen_balance += transaction.amount
-                transaction.source_wallet_id = source_wallet.id
+            sweep_ids = [w.id for w in source_shards[1:]]
+            if source_shards and self.account_repo.freeze(source_shards[0].id, transaction.amount, sweep_ids):
+                transaction.source_wallet_id = source_shards[0].id
                 transaction.status = TransactionStatus.PROCESSING
             else:
                 transaction.status = TransactionStatus.FAILED
@@ -147,6 +330,29 @@ class TransactionService:
         
         return transaction
     
+    def _resolve_destination_wallet(self, transaction: Transaction, data: Dict) -> Optional[Wallet]:
+        """The (sub-)wallet a deposit or transfer will credit, or None"""
+        if transaction.transaction_type not in ['deposit', 'transfer'] or not data.get('destination_wallet_id'):
+            return None
+        return self._pick_credit_wallet(
+            self.account_repo.get_wallet_shards(
+                data.get('destination_account_id', transaction.account_id),
+                'main',
+                transaction.currency
+            ),
+            transaction
+        )
+    
+    def _pick_credit_wallet(self, shards: List[Wallet], transaction: Transaction) -> Optional[Wallet]:
+        """Choose the sub-wallet a credit lands on, spreading hot accounts over their shards"""
+        if len(shards) <= 1:
+            return shards[0] if shards else None
+        if current_app.config.get('WALLET_SHARD_STRATEGY') == 'round_robin':
+            index = next(_credit_shard_counter) % len(shards)
+        else:
+            index = zlib.crc32(transaction.id.encode()) % len(shards)
+        return shards[index]
+    
     def _calculate_fee(self, amount: Decimal, transaction_type: str) -> Decimal:
         """Calculate transaction fee"""
         # TODO: Implement proper fee calculation based on account type, transaction type, etc.
@@ -154,47 +360,93 @@ class TransactionService:
             return amount * Decimal('0.01')  # 1% fee
         return Decimal('0.00')
     
-    def _run_fraud_check(self, transaction: Transaction):
-        """Run fraud detection check"""
-        try:
-            request_data = {
-                'ip_address': transaction.metadata.get('ip_address') if transaction.metadata else None,
-                'device_fingerprint': transaction.metadata.get('device_fingerprint') if transaction.metadata else None,
-                'user_agent': transaction.metadata.get('user_agent') if transaction.metadata else None,
-                'geolocation': transaction.metadata.get('geolocation') if transaction.metadata else None
-            }
-            fraud_check = self.fraud_service.check_transaction(transaction, request_data)
-            return fraud_check
-        except Exception as e:
-            logger.error(f"Fraud check failed: {str(e)}")
-            return None
+    def _fraud_request_data(self, transaction: Transaction) -> Dict:
+        return {
+            'ip_address': transaction.metadata.get('ip_address') if transaction.metadata else None,
+            'device_fingerprint': transaction.metadata.get('device_fingerprint') if transaction.metadata else None,
+            'user_agent': transaction.metadata.get('user_agent') if transaction.metadata else None,
+            'geolocation': transaction.metadata.get('geolocation') if transaction.metadata else None
+        }
     
-    def _run_compliance_check(self, transaction: Transaction):
-        """Run compliance check (AML, KYC, etc.)"""
-        try:
-            compliance_check = self.compliance_service.check_transaction(transaction)
-            return compliance_check
-        except Exception as e:
-            logger.error(f"Compliance check failed: {str(e)}")
-            return None
+    def _run_prechecks(self, transaction: Transaction, counterparty: Optional[str] = None) -> Dict[str, CheckOutcome]:
+        """
+        Evaluate fraud and, above the KYC threshold or when the amount looks
+        structured to stay under it, compliance concurrently. A compliance
+        check that may resolve after commit (async mode) is not run; the
+        transaction is flagged compliance_pending instead. counterparty is
+        the destination wallet the transaction will credit.
+        """
+        request_data = self._fraud_request_data(transaction)
+        checks = {'fraud': lambda: self.fraud_service.evaluate_transaction(transaction, request_data)}
+        aml_result = self.compliance_service.assess_aml(transaction, counterparty)
+        if self.compliance_service.requires_check(transaction, aml_result):
+            if self.compliance_service.can_defer(transaction, aml_result):
+                transaction.compliance_pending = True
+            else:
+                checks['compliance'] = lambda: self.compliance_service.evaluate_transaction(transaction, aml_result)
+        
+        outcomes = precheck_executor.run(checks)
+        logger.debug(
+            f"Pre-checks for {transaction.id}: " +
+            ", ".join(f"{name}={o.elapsed_ms:.1f}ms" for name, o in outcomes.items())
+        )
+        return outcomes
+    
+    def _run_batch_prechecks(self, transactions: List[Transaction], aml_results: List[Dict],
+                             needs_compliance: List[bool]) -> Dict[str, CheckOutcome]:
+        """
+        Score fraud for the whole batch while compliance runs alongside it.
+        
+        Each outcome's result is a list aligned with transactions, holding
+        the exception in place of the check of an item whose evaluation
+        raised. Batch checks wait for completion instead of using the
+        per-check timeouts.
+        """
+        request_data = [self._fraud_request_data(t) for t in transactions]
+        
+        def evaluate_compliance():
+            checks = []
+            for t, aml_result, needed in zip(transactions, aml_results, needs_compliance):
+                try:
+                    checks.append(self.compliance_service.evaluate_transaction(t, aml_result) if needed else None)
+                except Exception as e:
+                    logger.error(f"Compliance check of batch item {t.id} failed: {str(e)}")
+                    checks.append(e)
+            return checks
+        
+        checks = {'fraud': lambda: self.fraud_service.evaluate_batch(transactions, request_data)}
+        if any(needs_compliance):
+            checks['compliance'] = evaluate_compliance
+        return precheck_executor.run(checks, wait=True)
     
-    def _requires_compliance_check(self, amount: Decimal) -> bool:
-        """Check if transaction requires compliance review"""
-        from app.config.settings import config
-        return float(amount) >= config.KYC_REQUIRED_AMOUNT
+    def _blocking_checks(self, outcomes: Dict[str, CheckOutcome]) -> List[str]:
+        return [name for name, outcome in outcomes.items() if outcome.blocks]
     
-    def _log_audit(self, user_id: str, action: str, entity_type: str, entity_id: str, changes: Dict):
-        """Log audit trail"""
+    def _record_checks(self, transaction: Transaction, fraud_check, compliance_check):
+        """Persist evaluated checks and link them to the staged transaction"""
+        if fraud_check:
+            self.fraud_service.record_check(fraud_check)
+            transaction.fraud_check_id = fraud_check.id
+        if compliance_check:
+            self.compliance_service.record_check(compliance_check)
+            transaction.compliance_check_id = compliance_check.id
+        self.transaction_repo.save(transaction)
+    
+    def _build_audit_log(self, transaction: Transaction) -> AuditLog:
+        """Audit trail entry for a created transaction"""
         log = AuditLog(
             id=str(uuid.uuid4()),
-            user_id=user_id,
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id
+            user_id=transaction.user_id,
+            action='create',
+            entity_type='transaction',
+            entity_id=transaction.id
         )
-        log.set_changes(changes)
-        db.session.add(log)
-        db.session.commit()
+        log.set_changes({
+            'amount': float(transaction.amount),
+            'currency': transaction.currency,
+            'type': transaction.transaction_type
+        })
+        return log
     
     # TODO: Add transaction reversal
     # TODO: Add transaction refund
@@ -0,0 +1,222 @@
+from app import db
+from app.models.transaction import Transaction
+from typing import Dict, Iterable, List, Optional, Tuple
+from decimal import Decimal
+from app.utils.logger import get_logger
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+logger = get_logger(__name__)
+
+_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400}
+
+# (user_id, window, bucket, count, amount_cents)
+BucketIncrement = Tuple[str, str, int, int, int]
+
+def parse_window(window: str) -> int:
+    """Parse a window such as '30m', '1h' or '7d' into seconds"""
+    window = window.strip()
+    unit = window[-1:].lower()
+    if unit not in _UNIT_SECONDS or not window[:-1].isdigit():
+        raise ValueError(f"Invalid velocity window: {window}")
+    return int(window[:-1]) * _UNIT_SECONDS[unit]
+
+def to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+def to_epoch(at: Optional[datetime]) -> float:
+    if at is None:
+        return time.time()
+    return at.replace(tzinfo=timezone.utc).timestamp()
+
+class InMemoryVelocityBackend:
+    """Per-process bucket counters"""
+    
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], Dict[int, List[int]]] = {}
+        self._lock = threading.Lock()
+    
+    def incr_many(self, increments: Iterable[BucketIncrement], ttl_seconds: Dict[str, int]):
+        with self._lock:
+            for user_id, window, bucket, count, cents in increments:
+                counters = self._buckets.setdefault((user_id, window), {}).setdefault(bucket, [0, 0])
+                counters[0] += count
+                counters[1] += cents
+    
+    def get_buckets(self, user_id: str, window: str, min_bucket: int) -> Dict[int, Tuple[int, int]]:
+        with self._lock:
+            buckets = self._buckets.get((user_id, window))
+            if not buckets:
+                return {}
+            # Drop expired buckets while we hold the lock
+            for bucket in [b for b in buckets if b < min_bucket]:
+                del buckets[bucket]
+            return {b: (c[0], c[1]) for b, c in buckets.items()}
+    
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class RedisVelocityBackend:
+    """
+    Bucket counters in Redis, one hash per user and window.
+    
+    Accepts any client exposing the redis-py hash/pipeline API, so a local
+    fake (e.g. fakeredis) can stand in for a real server.
+    """
+    
+    def __init__(self, client, prefix: str = 'velocity'):
+        self.client = client
+        self.prefix = prefix
+    
+    @classmethod
+    def from_url(cls, url: str, prefix: str = 'velocity') -> 'RedisVelocityBackend':
+        import redis
+        return cls(redis.Redis.from_url(url), prefix)
+    
+    def _key(self, user_id: str, window: str) -> str:
+        return f"{self.prefix}:{user_id}:{window}"
+    
+    def incr_many(self, increments: Iterable[BucketIncrement], ttl_seconds: Dict[str, int],
+                  chunk_size: int = 5000):
+        pipe = self.client.pipeline(transaction=False)
+        pending = 0
+        for user_id, window, bucket, count, cents in increments:
+            key = self._key(user_id, window)
+            pipe.hincrby(key, f"{bucket}:c", count)
+            pipe.hincrby(key, f"{bucket}:a", cents)
+            pipe.expire(key, ttl_seconds[window])
+            pending += 1
+            if pending >= chunk_size:
+                pipe.execute()
+                pending = 0
+        if pending:
+            pipe.execute()
+    
+    def get_buckets(self, user_id: str, window: str, min_bucket: int) -> Dict[int, Tuple[int, int]]:
+        key = self._key(user_id, window)
+        raw = self.client.hgetall(key)
+        buckets: Dict[int, List[int]] = {}
+        expired = []
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            bucket_str, kind = field.split(':', 1)
+            bucket = int(bucket_str)
+            if bucket < min_bucket:
+                expired.append(field)
+                continue
+            counters = buckets.setdefault(bucket, [0, 0])
+            counters[0 if kind == 'c' else 1] = int(value)
+        if expired:
+            self.client.hdel(key, *expired)
+        return {b: (c[0], c[1]) for b, c in buckets.items()}
+    
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*", count=1000))
+        for i in range(0, len(keys), 1000):
+            self.client.delete(*keys[i:i + 1000])
+
+class VelocityStore:
+    """
+    Sliding-window transaction velocity per user.
+    
+    Each window is split into a fixed number of buckets holding a count and
+    an amount (in cents). Recording a transaction increments one bucket per
+    window and reading a window sums at most buckets_per_window + 1 buckets,
+    so both are independent of how many transactions the user has made.
+    """
+    
+    DEFAULT_WINDOWS = ['1h', '24h', '7d']
+    
+    def __init__(self, backend=None, windows: Optional[List[str]] = None, buckets_per_window: int = 60):
+        self.backend = backend or InMemoryVelocityBackend()
+        self.configure(windows or self.DEFAULT_WINDOWS, buckets_per_window)
+    
+    def configure(self, windows: List[str], buckets_per_window: int):
+        self.windows = {w.strip(): parse_window(w) for w in windows if w.strip()}
+        self.buckets_per_window = buckets_per_window
+        self.bucket_seconds = {
+            name: max(1, seconds // buckets_per_window) for name, seconds in self.windows.items()
+        }
+        self.ttl_seconds = {
+            name: seconds + self.bucket_seconds[name] for name, seconds in self.windows.items()
+        }
+    
+    def init_app(self, app):
+        """Configure the backend from app config and optionally warm it up"""
+        self.configure(app.config['VELOCITY_WINDOWS'], app.config['VELOCITY_BUCKETS_PER_WINDOW'])
+        if app.config['VELOCITY_BACKEND'] == 'redis':
+            self.backend = RedisVelocityBackend.from_url(app.config['REDIS_URL'])
+        else:
+            self.backend = InMemoryVelocityBackend()
+        
+        if app.config['VELOCITY_REBUILD_ON_STARTUP']:
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    logger.warning(f"Velocity rebuild skipped: {str(e)}")
+    
+    def _increments(self, user_id: str, amount, at: Optional[datetime]) -> List[BucketIncrement]:
+        epoch = to_epoch(at)
+        cents = to_cents(amount)
+        return [
+            (user_id, name, int(epoch // self.bucket_seconds[name]), 1, cents)
+            for name in self.windows
+        ]
+    
+    def record(self, user_id: str, amount, at: Optional[datetime] = None):
+        """Count one transaction of amount for user at time at (default now)"""
+        self.backend.incr_many(self._increments(user_id, amount, at), self.ttl_seconds)
+    
+    def record_transaction(self, transaction: Transaction):
+        self.record(transaction.user_id, transaction.amount, transaction.created_at)
+    
+    def get_velocity(self, user_id: str, at: Optional[datetime] = None) -> Dict[str, Dict]:
+        """Return {'<window>': {'count': int, 'amount': Decimal}} for every window"""
+        epoch = to_epoch(at)
+        result = {}
+        for name, seconds in self.windows.items():
+            size = self.bucket_seconds[name]
+            current = int(epoch // size)
+            min_bucket = current - seconds // size + 1
+            count = 0
+            cents = 0
+            for bucket, (c, a) in self.backend.get_buckets(user_id, name, min_bucket).items():
+                if bucket <= current:
+                    count += c
+                    cents += a
+            result[name] = {'count': count, 'amount': Decimal(cents) / 100}
+        return result
+    
+    def rebuild(self, batch_size: int = 10000) -> int:
+        """Reload all counters from the transactions table; returns rows read"""
+        cutoff = datetime.utcnow() - timedelta(seconds=max(self.windows.values()))
+        rows = db.session.query(
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.created_at
+        ).filter(
+            Transaction.created_at >= cutoff
+        ).execution_options(yield_per=batch_size)
+        
+        # Pre-aggregate per bucket so a busy user costs one increment per bucket
+        aggregated: Dict[Tuple[str, str, int], List[int]] = {}
+        row_count = 0
+        for user_id, amount, created_at in rows:
+            for _, window, bucket, count, cents in self._increments(user_id, amount, created_at):
+                counters = aggregated.setdefault((user_id, window, bucket), [0, 0])
+                counters[0] += count
+                counters[1] += cents
+            row_count += 1
+        
+        self.backend.clear()
+        self.backend.incr_many(
+            ((u, w, b, c[0], c[1]) for (u, w, b), c in aggregated.items()),
+            self.ttl_seconds
+        )
+        logger.info(f"Velocity store rebuilt from {row_count} transactions")
+        return row_count
+
+velocity_store = VelocityStore()
@@ -0,0 +1,62 @@
+from typing import Iterable
+import hashlib
+import math
+import threading
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and a bounded false-positive rate.
+    
+    Sized for capacity items at error_rate: about 9.6 bits per item at 1%,
+    so ten million strings fit in 12 MB. Each lookup hashes the key once
+    (128-bit BLAKE2b, split into two 64-bit halves for double hashing) and
+    probes num_hashes bits, independent of how many items were added.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("Bloom filter needs a positive capacity and 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+    
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def add(self, key: str) -> bool:
+        """Add key; returns False if it was (probably) present already"""
+        positions = self._positions(key)
+        # Setting a bit is a read-modify-write; unsynchronized adds could lose bits
+        with self._lock:
+            added = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self._bits[position >> 3] & mask:
+                    self._bits[position >> 3] |= mask
+                    added = True
+            if added:
+                self.count += 1
+            return added
+    
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+    
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+    
+    def __len__(self) -> int:
+        """Distinct items added, slightly undercounted by false positives"""
+        return self.count
+    
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import bisect
+import threading
+import time
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+DEFAULT_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+class Histogram:
+    """Fixed-bucket latency histogram; constant memory regardless of sample count"""
+    
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.bounds = list(buckets or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+    
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th sample (max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return float(self.bounds[index]) if index < len(self.bounds) else self.max
+        return self.max
+    
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max
+        }
+
+class Metrics:
+    """
+    Process-local counters and latency histograms.
+    
+    Names are dotted strings such as 'precheck.fraud'. Timings are recorded
+    in milliseconds.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+    
+    def observe(self, name: str, value_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value_ms)
+    
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+    
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block into the named histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+    
+    def snapshot(self, prefix: str = '') -> Dict:
+        with self._lock:
+            return {
+                'counters': {k: v for k, v in self._counters.items() if k.startswith(prefix)},
+                'timings': {
+                    k: h.snapshot() for k, h in self._histograms.items() if k.startswith(prefix)
+                }
+            }
+    
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+metrics = Metrics()
@@ -0,0 +1,62 @@
+from typing import List
+import re
+import unicodedata
+import numpy as np
+
+# Honorifics and corporate suffixes that do not identify anyone
+STOPWORDS = frozenset({'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'sir', 'sheikh', 'ltd', 'llc', 'inc', 'co', 'corp'})
+
+# Terms are small integers: every trigram over [ a-z0-9] (37^3) followed by
+# every Soundex key (26 letters x 7^3 digit triples), so an index can address
+# posting lists directly instead of through a hash table
+_ALPHABET = ' abcdefghijklmnopqrstuvwxyz0123456789'
+GRAM_TERMS = len(_ALPHABET) ** 3
+TERM_COUNT = GRAM_TERMS + 26 * 7 ** 3
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_CHAR_CODES = np.zeros(256, dtype=np.int64)
+_CHAR_CODES[np.frombuffer(_ALPHABET.encode(), dtype=np.uint8)] = np.arange(len(_ALPHABET))
+
+# Soundex digit per letter; vowels and y separate repeats ('0'), h and w do not (deleted)
+_SOUNDEX_TABLE = str.maketrans(
+    'aeiouybfpvcgjkqsxzdtlmnr',
+    '000000111122222222334556',
+    'hw0123456789'
+)
+_REPEATS = re.compile(r'(\d)\1+')
+
+def name_tokens(name: str) -> List[str]:
+    """Lower-case ASCII tokens of a name, accents and punctuation stripped, stopwords dropped"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    ascii_name = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return [t for t in _NON_ALNUM.split(ascii_name) if t and t not in STOPWORDS]
+
+def soundex(token: str) -> str:
+    """American Soundex code of a token ('' for tokens that do not start with a letter)"""
+    if not token or not token[0].isalpha():
+        return ''
+    first = token[0]
+    # h or w first still holds the first digit position, as '0'
+    digits = _REPEATS.sub(r'\1', (first.translate(_SOUNDEX_TABLE) or '0') + token[1:].translate(_SOUNDEX_TABLE))
+    return (first.upper() + digits[1:].replace('0', '')[:3]).ljust(4, '0')
+
+def gram_terms(tokens: List[str]) -> np.ndarray:
+    """
+    Sorted distinct ids of the tokens' character trigrams, each token padded
+    with spaces so word boundaries count; word order does not matter.
+    """
+    if not tokens:
+        return np.zeros(0, dtype=np.int64)
+    codes = _CHAR_CODES[np.frombuffer((' ' + '  '.join(tokens) + ' ').encode(), dtype=np.uint8)]
+    # Grams centred on a space straddle two tokens
+    middle = codes[1:-1]
+    ids = (codes[:-2] * len(_ALPHABET) + middle) * len(_ALPHABET) + codes[2:]
+    return np.unique(ids[middle != 0])
+
+def phonetic_terms(tokens: List[str]) -> np.ndarray:
+    """Sorted distinct term ids of the tokens' Soundex keys"""
+    ids = set()
+    for key in map(soundex, tokens):
+        if key:
+            ids.add(GRAM_TERMS + (ord(key[0]) - 65) * 343 + int(key[1]) * 49 + int(key[2]) * 7 + int(key[3]))
+    return np.array(sorted(ids), dtype=np.int64)
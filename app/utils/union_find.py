@@ -0,0 +1,44 @@
+from typing import Dict, Hashable, Iterator, List
+
+class UnionFind:
+    """Disjoint sets with union by size and path halving; near-constant amortized operations"""
+    
+    def __init__(self):
+        self._parent: Dict[Hashable, Hashable] = {}
+        self._size: Dict[Hashable, int] = {}
+    
+    def add(self, item: Hashable):
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+    
+    def find(self, item: Hashable) -> Hashable:
+        self.add(item)
+        parent = self._parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+    
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        """Merge the sets of a and b; returns the surviving root"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size.pop(root_b)
+        return root_a
+    
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._parent
+    
+    def __len__(self) -> int:
+        return len(self._parent)
+    
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._parent)
+    
+    def roots(self) -> List[Hashable]:
+        return list(self._size)
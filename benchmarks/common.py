@@ -0,0 +1,55 @@
+from app import create_app, db
+from app.config.settings import config, TestingConfig
+from app.models.user import User
+from app.models.account import Account, Wallet
+from decimal import Decimal
+import time
+import uuid
+
+def create_benchmark_app(database_url: str = None):
+    """Create an app with a fresh schema, optionally against a real database"""
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_url or TestingConfig.SQLALCHEMY_DATABASE_URI,
+        'LOG_LEVEL': 'WARNING',
+    })
+    app = create_app('benchmark')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+def seed_account(balance: Decimal = Decimal('1000000.00'), currency: str = 'USD') -> Account:
+    """Create a user with an active account and a funded main wallet"""
+    suffix = uuid.uuid4().hex[:12]
+    user = User(email=f"bench-{suffix}@example.com", username=f"bench-{suffix}", kyc_status='verified')
+    user.set_password(suffix)
+    db.session.add(user)
+    db.session.flush()
+    
+    account = Account(user_id=user.id, account_type='standard', currency=currency, status='active')
+    db.session.add(account)
+    db.session.flush()
+    
+    db.session.add(Wallet(
+        account_id=account.id,
+        wallet_type='main',
+        currency=currency,
+        balance=balance,
+        available_balance=balance
+    ))
+    db.session.commit()
+    return account
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def timed(fn, *args, **kwargs):
+    """Run fn and return (result, elapsed_ms)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
@@ -0,0 +1,102 @@
+"""
+Evaluation cost of a compiled fraud rule set.
+
+Generates a random rule set of --rules rules over the shared fraud features
+(nested all/any/not conditions drawing on a limited pool of thresholds, as
+real rule sets do), compiles it once and times evaluation against random
+feature vectors. Exits non-zero when the p99 per-transaction evaluation time
+exceeds --budget-us, so it can guard the engine in CI.
+
+Usage:
+    python -m benchmarks.fraud_rules [--rules 500] [--iterations 20000] [--budget-us 250]
+"""
+from app.services.fraud_features import FEATURES
+from app.services.fraud_rules import compile_rules, fraud_rule_engine, load_rule_file
+from benchmarks.common import percentile
+import argparse
+import random
+import sys
+import time
+
+OPS = ['>', '>=', '<', '<=', '==', '!=']
+
+def random_leaf(rng: random.Random) -> dict:
+    feature = rng.choice(FEATURES)
+    if rng.random() < 0.1:
+        return {'feature': feature, 'op': 'in', 'value': rng.sample(range(24), 4)}
+    # Thresholds come from a small pool, so many rules share comparisons
+    return {'feature': feature, 'op': rng.choice(OPS), 'value': rng.choice([0, 1, 5, 10, 100, 1000, 10000])}
+
+def random_condition(rng: random.Random, depth: int = 0) -> dict:
+    roll = rng.random()
+    if depth >= 2 or roll < 0.5:
+        return random_leaf(rng)
+    if roll < 0.9:
+        combinator = rng.choice(['all', 'any'])
+        return {combinator: [random_condition(rng, depth + 1) for _ in range(rng.randint(2, 4))]}
+    return {'not': random_condition(rng, depth + 1)}
+
+def random_features(rng: random.Random) -> dict:
+    return {
+        'amount': rng.uniform(1, 50000),
+        'account_age_days': float(rng.randint(0, 2000)),
+        'history_count_30d': float(rng.randint(0, 300)),
+        'velocity_count_1h': float(rng.randint(0, 20)),
+        'velocity_count_24h': float(rng.randint(0, 50)),
+        'velocity_amount_24h': rng.uniform(0, 100000),
+        'has_device': float(rng.random() < 0.7),
+        'device_seen': float(rng.random() < 0.8),
+        'device_user_count': float(rng.choice([0, 1, 1, 1, 2, 5])),
+        'device_fraud_rate': rng.choice([0.0, 0.0, 0.0, 0.1, 0.5]),
+        'device_age_days': float(rng.randint(0, 1000)),
+        'has_geolocation': float(rng.random() < 0.5),
+        'kyc_verified': float(rng.random() < 0.6),
+        'hour': float(rng.randint(0, 23)),
+        'user_risk_score': rng.random(),
+        'amount_zscore': rng.gauss(0, 1.5),
+        'pattern_anomalies': float(rng.choice([0, 0, 0, 1, 2])),
+        'cluster_size': float(rng.choice([1, 1, 1, 2, 3, 10, 40])),
+        'cluster_fraud_rate': rng.choice([0.0, 0.0, 0.05, 0.3]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rules', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--budget-us', type=float, default=250.0, help='maximum allowed p99 per evaluation')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    rules = load_rule_file(fraud_rule_engine.path) + [
+        {'name': f"generated_{i}", 'condition': random_condition(rng)} for i in range(args.rules)
+    ]
+    
+    start = time.perf_counter()
+    plan = compile_rules(rules)
+    compile_ms = (time.perf_counter() - start) * 1000
+    
+    vectors = [random_features(rng) for _ in range(1000)]
+    for features in vectors:
+        plan(features)  # warm up
+    
+    samples = []
+    fired = 0
+    for i in range(args.iterations):
+        features = vectors[i % len(vectors)]
+        start = time.perf_counter()
+        fired += len(plan(features))
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    
+    p50, p99 = percentile(samples, 50), percentile(samples, 99)
+    print(f"rules={len(rules)} compile={compile_ms:.1f}ms iterations={args.iterations}")
+    print(f"evaluation: mean={sum(samples) / len(samples):.1f}us p50={p50:.1f}us p99={p99:.1f}us "
+          f"(budget {args.budget_us:.0f}us)")
+    print(f"rules fired per transaction: {fired / args.iterations:.1f}")
+    
+    if p99 > args.budget_us:
+        print("FAIL: rule evaluation exceeded budget")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Throughput of SettlementService.process_settlement_batch over a large backlog.
+
+Seeds --count completed, unsettled USD transactions (plus a share in EUR
+that must be left alone), then settles them in one batch, streaming
+--chunk-size transactions per commit. Prints progress per chunk and the
+overall rate. Point --database-url at a Postgres instance to include real
+fsync and lock cost.
+
+Usage:
+    python -m benchmarks.settlement_stream [--count 1000000] [--chunk-size 5000] [--database-url URL]
+"""
+from app import db
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.settlement_service import SettlementService
+from benchmarks.common import create_benchmark_app, seed_account
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+import argparse
+import time
+import uuid
+
+SEED_CHUNK = 50000
+
+def seed_transactions(count: int, other_currency_every: int = 10):
+    """Bulk-insert count completed USD transactions and count // other_currency_every EUR ones"""
+    account = seed_account()
+    account_id, user_id = account.id, account.user_id
+    now = datetime.utcnow()
+    
+    def row(i: int, currency: str) -> dict:
+        amount = Decimal(25 + i % 500)
+        fee = (amount * Decimal('0.01')).quantize(Decimal('0.01'))
+        return {
+            'id': str(uuid.uuid4()),
+            'account_id': account_id,
+            'user_id': user_id,
+            'transaction_type': 'payment',
+            'status': TransactionStatus.COMPLETED,
+            'amount': amount,
+            'currency': currency,
+            'fee': fee,
+            'net_amount': amount - fee,
+            'compliance_pending': False,
+            'processed_at': now,
+            'created_at': now,
+            'updated_at': now
+        }
+    
+    for start in range(0, count, SEED_CHUNK):
+        rows = [row(i, 'USD') for i in range(start, min(start + SEED_CHUNK, count))]
+        rows += [row(i, 'EUR') for i in range(start, start + len(rows)) if i % other_currency_every == 0]
+        db.session.execute(insert(Transaction), rows)
+        db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+    
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        start = time.perf_counter()
+        seed_transactions(args.count)
+        print(f"seeded {args.count} transactions in {time.perf_counter() - start:.1f}s")
+        
+        commits = []
+        
+        def count_commit(session):
+            commits.append(1)
+        
+        service = SettlementService()
+        batch = service.create_settlement_batch('USD')
+        event.listen(Session, 'after_commit', count_commit)
+        start = time.perf_counter()
+        
+        def progress(batch):
+            elapsed = time.perf_counter() - start
+            print(f"  {batch.processed_count:>9} settled  {batch.processed_count / elapsed:>9.0f} txn/s", flush=True)
+        
+        try:
+            batch = service.process_settlement_batch(batch.id, args.chunk_size, progress)
+        finally:
+            event.remove(Session, 'after_commit', count_commit)
+        elapsed = time.perf_counter() - start
+        
+        unsettled = Transaction.query.filter(
+            Transaction.currency == 'USD',
+            Transaction.settlement_id.is_(None)
+        ).count()
+        print(f"settled {batch.processed_count} transactions ({batch.failed_count} failed, {unsettled} left) "
+              f"in {elapsed:.1f}s: {batch.processed_count / elapsed:.0f} txn/s, {len(commits)} commits, "
+              f"total {batch.total_amount} fees {batch.total_fees}")
+
+if __name__ == '__main__':
+    main()
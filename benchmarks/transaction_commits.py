@@ -0,0 +1,102 @@
+"""
+Commit count and latency of TransactionService.create_transaction.
+
+Runs the same workload twice: once with the service-level unit of work
+(one commit per transaction) and once emulating the code before it, where
+the unit of work is disabled and every repository write, including the
+flush-only add/add_all/save, commits on its own. Point --database-url at a
+Postgres instance to include real fsync cost.
+
+Usage:
+    python -m benchmarks.transaction_commits [--count 500] [--database-url URL]
+"""
+from app import db
+from app.repositories.base_repository import BaseRepository
+from app.repositories.unit_of_work import commit
+from app.services import transaction_service as transaction_service_module
+from app.services.transaction_service import TransactionService
+from benchmarks.common import create_benchmark_app, seed_account, percentile, timed
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import argparse
+import contextlib
+
+@contextlib.contextmanager
+def per_repository_commits():
+    """Disable the unit of work and make every repository write commit, as before it existed"""
+    originals = {name: getattr(BaseRepository, name) for name in ('add', 'add_all', 'save')}
+    original_unit_of_work = transaction_service_module.unit_of_work
+    
+    @contextlib.contextmanager
+    def trailing_commit():
+        # Writes after the last repository call (the audit log) commit on their own
+        yield db.session
+        db.session.commit()
+    
+    def committing(write):
+        def wrapper(self, *args, **kwargs):
+            result = write(self, *args, **kwargs)
+            commit()
+            return result
+        return wrapper
+    
+    transaction_service_module.unit_of_work = trailing_commit
+    for name, write in originals.items():
+        setattr(BaseRepository, name, committing(write))
+    try:
+        yield
+    finally:
+        transaction_service_module.unit_of_work = original_unit_of_work
+        for name, write in originals.items():
+            setattr(BaseRepository, name, write)
+
+def run(count: int, unit_of_work_enabled: bool) -> dict:
+    commits = []
+    
+    def count_commit(session):
+        commits.append(1)
+    
+    event.listen(Session, 'after_commit', count_commit)
+    mode = contextlib.nullcontext() if unit_of_work_enabled else per_repository_commits()
+    
+    try:
+        with mode:
+            service = TransactionService()
+            account = seed_account()
+            commits.clear()
+            
+            latencies = []
+            for i in range(count):
+                # Every tenth transaction crosses the compliance threshold
+                amount = 15000 if i % 10 == 0 else 25 + i % 500
+                _, elapsed = timed(service.create_transaction, account.id, account.user_id, {
+                    'transaction_type': 'deposit',
+                    'amount': amount,
+                    'currency': 'USD',
+                })
+                latencies.append(elapsed)
+        
+        return {
+            'commits_per_transaction': len(commits) / count,
+            'p50_ms': percentile(latencies, 50),
+            'p99_ms': percentile(latencies, 99),
+        }
+    finally:
+        event.remove(Session, 'after_commit', count_commit)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+    
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        for label, enabled in [('per-repository commits', False), ('unit of work', True)]:
+            result = run(args.count, enabled)
+            db.session.remove()
+            print(f"{label:>24}: {result['commits_per_transaction']:.2f} commits/txn  "
+                  f"p50={result['p50_ms']:.2f}ms  p99={result['p99_ms']:.2f}ms")
+
+if __name__ == '__main__':
+    main()
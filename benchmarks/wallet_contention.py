@@ -0,0 +1,101 @@
+"""
+Many threads debiting one wallet at the same time.
+
+Each thread repeatedly withdraws a fixed amount until the wallet runs dry.
+With the atomic API (conditional UPDATE) the final balance must equal the
+starting balance minus successful debits and never go negative; the naive
+mode reproduces the old read-compare-write path for comparison. SQLite
+serializes writers, so use --database-url with Postgres for realistic
+throughput numbers.
+
+Usage:
+    python -m benchmarks.wallet_contention [--threads 32] [--ops 200] [--naive] [--database-url URL]
+"""
+from app import db
+from app.models.account import Wallet
+from app.repositories.account_repository import AccountRepository
+from benchmarks.common import create_benchmark_app, seed_account
+from decimal import Decimal
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+AMOUNT = Decimal('1.00')
+
+def atomic_debit(repo: AccountRepository, wallet_id: str) -> bool:
+    return repo.debit(wallet_id, AMOUNT) is not None
+
+def naive_debit(repo: AccountRepository, wallet_id: str) -> bool:
+    wallet = db.session.get(Wallet, wallet_id)
+    if wallet.available_balance < AMOUNT:
+        return False
+    wallet.available_balance -= AMOUNT
+    wallet.balance -= AMOUNT
+    return True
+
+def worker(app, wallet_id: str, ops: int, debit, counters: dict, lock: threading.Lock):
+    repo = AccountRepository()
+    with app.app_context():
+        for _ in range(ops):
+            try:
+                applied = debit(repo, wallet_id)
+                db.session.commit()
+                key = 'succeeded' if applied else 'rejected'
+            except Exception:
+                db.session.rollback()
+                key = 'errors'
+            with lock:
+                counters[key] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--ops', type=int, default=200, help='debit attempts per thread')
+    parser.add_argument('--naive', action='store_true', help='use read-compare-write instead of atomic UPDATE')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+    
+    database_url = args.database_url
+    if not database_url:
+        # In-memory SQLite is per connection; threads need a shared file
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'wallet_contention.db')}"
+    
+    app = create_benchmark_app(database_url)
+    # Fund the wallet for only half of the attempts so debits must be rejected
+    starting_balance = AMOUNT * (args.threads * args.ops // 2)
+    with app.app_context():
+        account = seed_account(balance=starting_balance)
+        wallet_id = account.wallets.first().id
+    
+    counters = {'succeeded': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+    debit = naive_debit if args.naive else atomic_debit
+    threads = [
+        threading.Thread(target=worker, args=(app, wallet_id, args.ops, debit, counters, lock))
+        for _ in range(args.threads)
+    ]
+    
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    with app.app_context():
+        wallet = db.session.get(Wallet, wallet_id)
+        final_balance = wallet.available_balance
+    
+    expected_balance = starting_balance - AMOUNT * counters['succeeded']
+    attempts = args.threads * args.ops
+    print(f"mode: {'naive' if args.naive else 'atomic'}  threads={args.threads}  attempts={attempts}")
+    print(f"succeeded={counters['succeeded']} rejected={counters['rejected']} errors={counters['errors']}")
+    print(f"starting={starting_balance} final={final_balance} expected={expected_balance}")
+    print(f"overdraft: {'YES' if final_balance < 0 else 'no'}  "
+          f"lost updates: {'YES' if final_balance != expected_balance else 'no'}")
+    print(f"throughput: {attempts / elapsed:.0f} debit attempts/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+from app import create_app, db
+from app.models.account import Account, Wallet
+from app.models.user import User
+from decimal import Decimal
+from flask_jwt_extended import create_access_token
+import pytest
+import uuid
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def make_user(app):
+    def make_user(**fields):
+        suffix = uuid.uuid4().hex[:12]
+        user = User(email=f"test-{suffix}@example.com", username=f"test-{suffix}", **fields)
+        user.set_password(suffix)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+@pytest.fixture
+def make_account(make_user):
+    def make_account(balance: Decimal = Decimal('100000.00'), currency: str = 'USD', user=None):
+        user = user or make_user(kyc_status='verified')
+        account = Account(user_id=user.id, account_type='standard', currency=currency, status='active')
+        db.session.add(account)
+        db.session.flush()
+        db.session.add(Wallet(
+            account_id=account.id,
+            wallet_type='main',
+            currency=currency,
+            balance=balance,
+            available_balance=balance
+        ))
+        db.session.commit()
+        return account
+    return make_account
+
+@pytest.fixture
+def auth_headers(app):
+    def auth_headers(user):
+        return {'Authorization': f"Bearer {create_access_token(identity=str(user.id))}"}
+    return auth_headers
@@ -0,0 +1,34 @@
+from app.models.account import Wallet
+
+def test_admin_enables_wallet_sharding(app, make_user, make_account, auth_headers):
+    admin = make_user(is_admin=True)
+    account = make_account()
+    client = app.test_client()
+    
+    response = client.post(f"/api/accounts/{account.id}/wallet-shards", json={'shards': 4},
+                           headers=auth_headers(admin))
+    
+    assert response.status_code == 200
+    assert response.get_json()['wallet_shards'] == 4
+    assert Wallet.query.filter_by(account_id=account.id, wallet_type='main').count() == 4
+
+def test_wallet_sharding_requires_admin(app, make_account, auth_headers):
+    account = make_account()
+    owner = account.user
+    
+    response = app.test_client().post(f"/api/accounts/{account.id}/wallet-shards", json={'shards': 4},
+                                      headers=auth_headers(owner))
+    
+    assert response.status_code == 403
+
+def test_wallet_sharding_cannot_shrink(app, make_user, make_account, auth_headers):
+    admin = make_user(is_admin=True)
+    account = make_account()
+    client = app.test_client()
+    client.post(f"/api/accounts/{account.id}/wallet-shards", json={'shards': 4}, headers=auth_headers(admin))
+    
+    response = client.post(f"/api/accounts/{account.id}/wallet-shards", json={'shards': 2},
+                           headers=auth_headers(admin))
+    
+    assert response.status_code == 400
+    assert 'reduced' in response.get_json()['error']
@@ -0,0 +1,115 @@
+from app.models.compliance import ComplianceCheck
+from app.repositories.account_repository import AccountRepository
+from app.services.aml_detector import InMemoryStructuringBackend, RedisStructuringBackend, StructuringDetector
+from app.services.transaction_service import TransactionService
+from app import db
+from datetime import datetime, timedelta
+import fnmatch
+import pytest
+
+class FakeRedis:
+    """The sorted set, expiry and pipeline calls RedisStructuringBackend makes, over dicts"""
+    
+    def __init__(self):
+        self.sets = {}
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update({member.encode(): score for member, score in mapping.items()})
+    
+    def zremrangebyscore(self, key, low, high):
+        members = self.sets.get(key, {})
+        for member in [m for m, score in members.items() if score <= high]:
+            del members[member]
+    
+    def zrangebyscore(self, key, low, high):
+        low = float(low.lstrip('('))
+        members = self.sets.get(key, {})
+        return [m for m, score in sorted(members.items(), key=lambda item: item[1]) if score > low]
+    
+    def expire(self, key, seconds):
+        pass
+    
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.sets) if fnmatch.fnmatch(key, match)]
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.sets.pop(key, None)
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+    
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+    
+    def execute(self):
+        for name, args in self.calls:
+            getattr(self.client, name)(*args)
+        self.calls = []
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request):
+    return InMemoryStructuringBackend() if request.param == 'memory' else RedisStructuringBackend(FakeRedis())
+
+def test_assess_counts_splits_and_new_counterparties(backend):
+    detector = StructuringDetector(threshold=10000, window='3d', near_ratio=0.8, min_count=3, backend=backend)
+    at = datetime.utcnow()
+    detector.record('user-1', 9500, 'wallet-a', at - timedelta(hours=2))
+    detector.record('user-1', 9500, 'wallet-a', at - timedelta(hours=1))
+    
+    result = detector.assess('user-1', 9500, 'wallet-b', at)
+    
+    assert result['flagged']
+    assert result['details']['near_threshold_count'] == 3
+    assert result['details']['counterparties'] == 2
+
+def test_assess_ignores_expired_and_small_amounts(backend):
+    detector = StructuringDetector(threshold=10000, window='1d', near_ratio=0.8, min_count=3, backend=backend)
+    at = datetime.utcnow()
+    detector.record('user-1', 9500, 'wallet-a', at - timedelta(days=2))
+    detector.record('user-1', 100, 'wallet-a', at - timedelta(hours=1))
+    
+    result = detector.assess('user-1', 9500, 'wallet-a', at)
+    
+    assert not result['flagged']
+    assert result['details']['near_threshold_count'] == 1
+
+def test_redis_windows_add_up_splits_recorded_by_other_processes():
+    client = FakeRedis()
+    workers = [
+        StructuringDetector(threshold=10000, window='3d', near_ratio=0.8, min_count=3,
+                            backend=RedisStructuringBackend(client))
+        for _ in range(3)
+    ]
+    at = datetime.utcnow()
+    workers[0].record('user-1', 9500, 'wallet-a', at - timedelta(hours=2))
+    workers[1].record('user-1', 9500, 'wallet-b', at - timedelta(hours=1))
+    
+    result = workers[2].assess('user-1', 9500, 'wallet-c', at)
+    
+    assert result['flagged']
+    assert result['details']['near_threshold_count'] == 3
+    assert result['details']['counterparties'] == 3
+
+def test_create_transaction_counts_its_own_recipient(app, make_account):
+    sender = make_account()
+    recipients = [make_account() for _ in range(3)]
+    service = TransactionService()
+    
+    for recipient in recipients:
+        wallet = AccountRepository().get_wallet(recipient.id, 'main', 'USD')
+        transaction = service.create_transaction(sender.id, sender.user_id, {
+            'transaction_type': 'deposit',
+            'amount': 9500,
+            'currency': 'USD',
+            'destination_account_id': recipient.id,
+            'destination_wallet_id': wallet.id
+        })
+    
+    compliance_check = db.session.get(ComplianceCheck, transaction.compliance_check_id)
+    assert compliance_check.result['aml']['details']['counterparties'] == 3
@@ -0,0 +1,52 @@
+from app.models.transaction import TransactionStatus
+from app.repositories.account_repository import AccountRepository
+from app.services.compliance_service import ComplianceService
+from app.services.fraud_service import FraudService
+from app.services.transaction_service import TransactionService
+from decimal import Decimal
+
+def wallet(account):
+    return AccountRepository().get_wallet(account.id, 'main', 'USD')
+
+def deferred_transfer(make_account, monkeypatch):
+    monkeypatch.setattr(FraudService, '_calculate_risk_score', lambda self, features, fallback=None: 0.0)
+    monkeypatch.setattr(ComplianceService, 'can_defer', lambda self, transaction, aml_result: True)
+    monkeypatch.setattr(ComplianceService, 'defer', lambda self, transaction: None)
+    sender, recipient = make_account(balance=Decimal('20000.00')), make_account(balance=Decimal('0.00'))
+    transaction = TransactionService().create_transaction(sender.id, sender.user_id, {
+        'transaction_type': 'transfer',
+        'amount': 15000,
+        'currency': 'USD',
+        'source_wallet_id': wallet(sender).id,
+        'destination_wallet_id': wallet(recipient).id,
+        'destination_account_id': recipient.id
+    })
+    return transaction, sender, recipient
+
+def test_deferred_transfer_credits_frozen_funds_until_checked(app, make_account, monkeypatch):
+    transaction, sender, recipient = deferred_transfer(make_account, monkeypatch)
+    
+    assert transaction.compliance_pending
+    assert transaction.status == TransactionStatus.PROCESSING
+    assert wallet(recipient).available_balance == Decimal('0.00')
+    assert wallet(recipient).frozen_balance == transaction.net_amount
+    
+    ComplianceService().resolve_deferred(transaction.id)
+    
+    assert transaction.status == TransactionStatus.COMPLETED
+    assert wallet(recipient).available_balance == transaction.net_amount
+    assert wallet(recipient).frozen_balance == Decimal('0.00')
+
+def test_failed_deferred_check_leaves_recipient_available_balance_unchanged(app, make_account, monkeypatch):
+    transaction, sender, recipient = deferred_transfer(make_account, monkeypatch)
+    monkeypatch.setattr(ComplianceService, '_run_sanctions_check', lambda self, transaction: {
+        'screened': True, 'flagged': True, 'matches': ['test']
+    })
+    
+    compliance_check = ComplianceService().resolve_deferred(transaction.id)
+    
+    assert compliance_check.status == 'failed'
+    assert transaction.status == TransactionStatus.FAILED
+    assert not transaction.compliance_pending
+    assert wallet(recipient).balance == wallet(recipient).available_balance == Decimal('0.00')
+    assert wallet(sender).balance == wallet(sender).available_balance == Decimal('20000.00')
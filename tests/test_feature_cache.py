@@ -0,0 +1,53 @@
+from app import db
+from app.services.behavior_baseline import Baseline
+from app.services.feature_cache import feature_cache, UserFeatures
+from sqlalchemy import text
+
+def cache_user(user_id):
+    # Begin the transaction, as the risk score UPDATE preceding a note would
+    db.session.execute(text('SELECT 1'))
+    return feature_cache.put(UserFeatures(user_id, None, 'verified', 0, last_risk_score=0.1))
+
+def test_risk_score_reaches_the_cache_on_commit(app):
+    cache_user('user-1')
+    
+    feature_cache.stage_risk_score(db.session(), 'user-1', 0.9)
+    assert feature_cache.peek('user-1').last_risk_score == 0.1
+    db.session.commit()
+    
+    assert feature_cache.peek('user-1').last_risk_score == 0.9
+
+def test_rolled_back_risk_score_is_discarded(app):
+    cache_user('user-1')
+    
+    feature_cache.stage_risk_score(db.session(), 'user-1', 0.9)
+    db.session.rollback()
+    db.session.commit()
+    
+    assert feature_cache.peek('user-1').last_risk_score == 0.1
+
+def test_savepoint_rollback_discards_only_its_own_notes(app):
+    cache_user('user-1')
+    cache_user('user-2')
+    
+    feature_cache.stage_risk_score(db.session(), 'user-1', 0.5)
+    savepoint = db.session.begin_nested()
+    feature_cache.stage_risk_score(db.session(), 'user-2', 0.9)
+    savepoint.rollback()
+    with db.session.begin_nested():
+        feature_cache.stage_risk_score(db.session(), 'user-2', 0.7)
+    assert feature_cache.peek('user-2').last_risk_score == 0.1
+    db.session.commit()
+    
+    assert feature_cache.peek('user-1').last_risk_score == 0.5
+    assert feature_cache.peek('user-2').last_risk_score == 0.7
+
+def test_rolled_back_baseline_is_discarded(app):
+    cached = cache_user('user-1').baseline
+    baseline = Baseline()
+    baseline.update(100.0, 12, 'deposit')
+    
+    feature_cache.stage_baseline(db.session(), 'user-1', baseline)
+    db.session.rollback()
+    
+    assert feature_cache.peek('user-1').baseline is cached
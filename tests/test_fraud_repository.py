@@ -0,0 +1,37 @@
+from app import db
+from app.repositories.fraud_repository import FraudRepository
+import pytest
+
+FULL_SAMPLE = {
+    'overall_score': 0.4,
+    'account_age_score': 0.2,
+    'transaction_history_score': 0.3,
+    'velocity_score': 0.1,
+    'device_score': 0.5,
+    'location_score': 0.4,
+    'kyc_score': 0.1,
+}
+
+def test_apply_risk_sample_averages_samples(make_user):
+    user = make_user()
+    repo = FraudRepository()
+    repo.apply_risk_sample(user.id, dict(FULL_SAMPLE, velocity_score=0.0), window=10)
+    risk_score = repo.apply_risk_sample(user.id, dict(FULL_SAMPLE, velocity_score=1.0), window=10)
+    db.session.commit()
+    
+    assert risk_score.sample_count == 2
+    assert risk_score.velocity_score == pytest.approx(0.5)
+    assert risk_score.kyc_score == pytest.approx(0.1)
+
+def test_degraded_first_sample_does_not_leave_components_null(make_user):
+    user = make_user()
+    repo = FraudRepository()
+    # A degraded check scores only the components whose lookups completed
+    repo.apply_risk_sample(user.id, {'overall_score': 0.4, 'velocity_score': 0.1}, window=10)
+    for _ in range(3):
+        risk_score = repo.apply_risk_sample(user.id, FULL_SAMPLE, window=10)
+    db.session.commit()
+    
+    assert risk_score.sample_count == 4
+    for column, value in FULL_SAMPLE.items():
+        assert getattr(risk_score, column) == pytest.approx(value), column
@@ -0,0 +1,121 @@
+from app import db
+from app.models.compliance import KYCRecord
+from app.models.user import User
+from app.processors.kyc_verification_processor import KycVerificationProcessor
+from app.services.feature_cache import feature_cache, UserFeatures
+from app.services.kyc_providers import FakeKycProvider
+from datetime import datetime, timedelta
+import pytest
+
+@pytest.fixture
+def submit_kyc(make_user):
+    def submit_kyc(count: int, valid: bool = True):
+        records = []
+        created_at = datetime.utcnow() - timedelta(minutes=count)
+        for i in range(count):
+            user = make_user(kyc_status='pending')
+            records.append(KYCRecord(
+                user_id=user.id,
+                document_type='passport' if valid else 'library_card',
+                document_number=f"P{i:06d}",
+                document_front_url=f"https://docs.example.com/{i}.jpg",
+                created_at=created_at + timedelta(seconds=i)
+            ))
+        db.session.add_all(records)
+        db.session.commit()
+        return records
+    return submit_kyc
+
+def make_processor(provider=None, **options):
+    options.setdefault('backoff_seconds', 0)
+    return KycVerificationProcessor(provider or FakeKycProvider(latency_ms=0), **options)
+
+def test_claim_leases_oldest_pending_records(submit_kyc):
+    records = submit_kyc(5)
+    
+    first = make_processor(batch_size=3, worker_id='worker-1')._claim()
+    second = make_processor(batch_size=3, worker_id='worker-2')._claim()
+    
+    assert [s['id'] for s in first] == [r.id for r in records[:3]]
+    assert [s['id'] for s in second] == [r.id for r in records[3:]]
+    claimed = {r.id: r.claimed_by for r in KYCRecord.query.all()}
+    assert claimed[records[0].id] == 'worker-1'
+    assert claimed[records[4].id] == 'worker-2'
+
+def test_verify_retries_transient_provider_failures(app):
+    provider = FakeKycProvider(latency_ms=0, failure_rate=0.5, seed=7)
+    processor = make_processor(provider, max_attempts=20)
+    submission = {'id': 'kyc-1', 'document_type': 'passport', 'document_number': 'P1',
+                  'document_front_url': 'https://docs.example.com/1.jpg'}
+    
+    decisions = [processor._verify(dict(submission, id=f"kyc-{i}")) for i in range(20)]
+    
+    assert all(d is not None and d.status == 'verified' for d in decisions)
+
+def test_verify_gives_up_after_max_attempts(app):
+    processor = make_processor(FakeKycProvider(latency_ms=0, failure_rate=1.0), max_attempts=3)
+    
+    assert processor._verify({'id': 'kyc-1', 'document_type': 'passport'}) is None
+
+def test_run_applies_decisions_in_bulk(submit_kyc):
+    verified = submit_kyc(4)
+    rejected = submit_kyc(2, valid=False)
+    for record in verified + rejected:
+        feature_cache.put(UserFeatures(record.user_id, None, 'pending', 0))
+    
+    totals = make_processor(batch_size=4, concurrency=2).run()
+    
+    assert totals['records'] == 6
+    assert totals['batches'] == 2
+    assert (totals['verified'], totals['rejected'], totals['deferred']) == (4, 2, 0)
+    db.session.expire_all()
+    for record in verified:
+        kyc_record = db.session.get(KYCRecord, record.id)
+        assert kyc_record.status == 'verified'
+        assert kyc_record.provider == 'fake'
+        assert kyc_record.verified_at is not None
+        assert kyc_record.claimed_by is None
+        assert db.session.get(User, record.user_id).kyc_status == 'verified'
+    for record in rejected:
+        kyc_record = db.session.get(KYCRecord, record.id)
+        assert kyc_record.status == 'rejected'
+        assert 'Unsupported document type' in kyc_record.rejection_reason
+        assert db.session.get(User, record.user_id).kyc_status == 'rejected'
+    # Bulk updates bypass the ORM events, so the processor drops the entries itself
+    assert all(feature_cache.peek(r.user_id) is None for r in verified + rejected)
+
+def test_undecided_records_are_released_for_a_later_retry(submit_kyc):
+    records = submit_kyc(3)
+    processor = make_processor(FakeKycProvider(latency_ms=0, failure_rate=1.0), max_attempts=2,
+                               retry_delay_seconds=60)
+    
+    totals = processor.run()
+    
+    assert totals['deferred'] == 3
+    db.session.expire_all()
+    for record in records:
+        kyc_record = db.session.get(KYCRecord, record.id)
+        assert kyc_record.status == 'pending'
+        assert kyc_record.claimed_by is None
+        assert kyc_record.claim_expires_at > datetime.utcnow()
+    # Not claimable again until the retry delay has passed
+    assert processor.run()['records'] == 0
+
+def test_reclaimed_records_are_left_to_their_new_owner(submit_kyc):
+    records = submit_kyc(2)
+    stale = make_processor(worker_id='worker-1', lease_seconds=0)
+    submissions = stale._claim()
+    decisions = [stale._verify(s) for s in submissions]
+    # The lease expired mid-batch and another worker took the first record
+    KYCRecord.query.filter_by(id=records[0].id).update({'claimed_by': 'worker-2'})
+    db.session.commit()
+    
+    counts = stale._apply(submissions, decisions)
+    
+    assert (counts['verified'], counts['lost']) == (1, 1)
+    db.session.expire_all()
+    first = db.session.get(KYCRecord, records[0].id)
+    assert (first.status, first.claimed_by) == ('pending', 'worker-2')
+    assert db.session.get(User, records[0].user_id).kyc_status == 'pending'
+    assert db.session.get(KYCRecord, records[1].id).status == 'verified'
+    assert db.session.get(User, records[1].user_id).kyc_status == 'verified'
@@ -0,0 +1,25 @@
+from app.services.precheck_executor import engine_pool_options
+
+CONFIG = {
+    'SQLALCHEMY_DATABASE_URI': 'postgresql://app@db/payments',
+    'DB_POOL_SIZE': 5,
+    'DB_POOL_MAX_OVERFLOW': 10,
+    'PRECHECK_PARALLEL': True,
+    'PRECHECK_MAX_WORKERS': 8,
+    'FRAUD_FEATURE_BUDGETS_ENABLED': True,
+    'FRAUD_FEATURE_MAX_WORKERS': 16,
+    'COMPLIANCE_ASYNC_ENABLED': True,
+    'COMPLIANCE_ASYNC_WORKERS': 4,
+}
+
+def test_pool_has_a_connection_for_every_worker():
+    assert engine_pool_options(CONFIG) == {'pool_size': 5 + 8 + 16 + 4, 'max_overflow': 10}
+
+def test_disabled_pools_are_not_counted():
+    config = dict(CONFIG, PRECHECK_PARALLEL=False, COMPLIANCE_ASYNC_ENABLED=False)
+    
+    assert engine_pool_options(config) == {'pool_size': 5, 'max_overflow': 10}
+
+def test_in_memory_sqlite_gets_no_pool_options():
+    assert engine_pool_options(dict(CONFIG, SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')) == {}
+    assert engine_pool_options(dict(CONFIG, SQLALCHEMY_DATABASE_URI='sqlite:///app.db'))['pool_size'] == 33
@@ -0,0 +1,39 @@
+from app import db
+from app.models.fraud import FraudCheck
+from app.processors.shadow_report_processor import ShadowReportProcessor
+from app.services.shadow_scoring import LIVE_FLAGGED, RECORD, SHADOW_FLAGGED
+import uuid
+
+def add_check(user_id, status, reviewed_by=None):
+    fraud_check = FraudCheck(
+        transaction_id=str(uuid.uuid4()),
+        user_id=user_id,
+        risk_score=0.5,
+        risk_level='high',
+        status=status,
+        reviewed_by=reviewed_by
+    )
+    db.session.add(fraud_check)
+    return fraud_check
+
+def test_only_analyst_decisions_are_labels(make_user, tmp_path):
+    user = make_user()
+    checks = [
+        (add_check(user.id, 'rejected', 'analyst-1'), LIVE_FLAGGED | SHADOW_FLAGGED),
+        (add_check(user.id, 'approved', 'analyst-1'), LIVE_FLAGGED),
+        # Labelled by the live scorer itself: not evidence either way
+        (add_check(user.id, 'approved'), SHADOW_FLAGGED),
+        (add_check(user.id, 'rejected'), LIVE_FLAGGED),
+    ]
+    db.session.commit()
+    with open(tmp_path / 'candidate.bin', 'wb') as f:
+        for fraud_check, flags in checks:
+            f.write(RECORD.pack(uuid.UUID(fraud_check.id).bytes, flags, 0.5, 0.5, 10, 12))
+    
+    report = ShadowReportProcessor(str(tmp_path)).report()['candidate']
+    
+    assert (report['records'], report['unlabelled'], report['shadow_only']) == (4, 2, 1)
+    assert report['live']['precision'] == 0.5
+    assert report['shadow']['precision'] == 1.0
+    assert report['shadow']['recall'] == 1.0
+    assert report['latency_delta_us']['mean'] == 2
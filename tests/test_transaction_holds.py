@@ -0,0 +1,52 @@
+from app.models.transaction import TransactionStatus
+from app.processors.fraud_processor import FraudProcessor
+from app.repositories.account_repository import AccountRepository
+from app.services.fraud_service import FraudService
+from app.services.review_queue_service import ReviewQueueService
+from app.services.transaction_service import TransactionService
+from decimal import Decimal
+
+def high_risk_transfer(app, make_account, monkeypatch, score_of_threshold):
+    sender, recipient = make_account(balance=Decimal('500.00')), make_account(balance=Decimal('0.00'))
+    source = AccountRepository().get_wallet(sender.id, 'main', 'USD')
+    destination = AccountRepository().get_wallet(recipient.id, 'main', 'USD')
+    score = app.config['FRAUD_RISK_THRESHOLD'] * score_of_threshold
+    monkeypatch.setattr(FraudService, '_calculate_risk_score', lambda self, features, fallback=None: score)
+    transaction = TransactionService().create_transaction(sender.id, sender.user_id, {
+        'transaction_type': 'transfer',
+        'amount': 100,
+        'currency': 'USD',
+        'source_wallet_id': source.id,
+        'destination_wallet_id': destination.id,
+        'destination_account_id': recipient.id
+    })
+    return transaction, sender, recipient
+
+def wallet(account):
+    return AccountRepository().get_wallet(account.id, 'main', 'USD')
+
+def test_high_risk_credit_is_held_and_reversed_on_auto_rejection(app, make_account, monkeypatch):
+    transaction, sender, recipient = high_risk_transfer(app, make_account, monkeypatch, 1.0)
+    
+    assert transaction.status == TransactionStatus.PROCESSING
+    assert wallet(recipient).available_balance == Decimal('0.00')
+    assert wallet(recipient).frozen_balance == transaction.net_amount
+    
+    assert FraudProcessor().process_pending_fraud_checks() == 1
+    
+    assert transaction.status == TransactionStatus.FAILED
+    assert wallet(recipient).balance == Decimal('0.00')
+    assert wallet(recipient).frozen_balance == Decimal('0.00')
+    assert wallet(sender).balance == wallet(sender).available_balance == Decimal('500.00')
+
+def test_manual_approval_releases_the_held_credit(app, make_account, monkeypatch):
+    transaction, sender, recipient = high_risk_transfer(app, make_account, monkeypatch, 0.75)
+    FraudProcessor().process_pending_fraud_checks()
+    
+    queue = ReviewQueueService()
+    [fraud_check] = queue.claim('analyst-1')
+    queue.decide(fraud_check.id, 'analyst-1', 'approve')
+    
+    assert transaction.status == TransactionStatus.COMPLETED
+    assert wallet(recipient).available_balance == transaction.net_amount
+    assert wallet(recipient).frozen_balance == Decimal('0.00')
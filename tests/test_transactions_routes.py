@@ -0,0 +1,40 @@
+from app.models.transaction import Transaction
+from app.repositories.account_repository import AccountRepository
+from app.services.transaction_service import TransactionService
+from decimal import Decimal
+from sqlalchemy.exc import OperationalError
+
+def deposit(account, wallet, amount, **fields):
+    return dict({
+        'account_id': account.id,
+        'transaction_type': 'deposit',
+        'amount': amount,
+        'currency': 'USD',
+        'destination_wallet_id': wallet.id
+    }, **fields)
+
+def test_batch_item_failing_during_processing_is_rejected_alone(app, make_account, auth_headers, monkeypatch):
+    account = make_account(balance=Decimal('0.00'))
+    wallet = AccountRepository().get_wallet(account.id, 'main', 'USD')
+    build_audit_log = TransactionService._build_audit_log
+    
+    def failing_audit_log(self, transaction):
+        if transaction.description == 'fails':
+            raise OperationalError('INSERT INTO audit_logs', {}, Exception('disk I/O error'))
+        return build_audit_log(self, transaction)
+    monkeypatch.setattr(TransactionService, '_build_audit_log', failing_audit_log)
+    
+    response = app.test_client().post('/api/transactions/batch', json={'transactions': [
+        deposit(account, wallet, 10),
+        deposit(account, wallet, 20, description='fails'),
+        deposit(account, wallet, 30),
+    ]}, headers=auth_headers(account.user))
+    
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [r['status'] for r in body['results']] == ['created', 'rejected', 'created']
+    assert body['results'][1]['error'] == 'Failed to create transaction'
+    assert sorted(t.amount for t in Transaction.query.filter_by(account_id=account.id)) == [10, 30]
+    # The rejected item's credit was rolled back with its savepoint
+    wallet = AccountRepository().get_wallet(account.id, 'main', 'USD')
+    assert wallet.balance == Decimal('40.00')
@@ -0,0 +1,110 @@
+from app import db
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.velocity_store import InMemoryVelocityBackend, RedisVelocityBackend, VelocityStore, parse_window
+from datetime import datetime, timedelta
+from decimal import Decimal
+import fnmatch
+import pytest
+
+class FakeRedis:
+    """The hash, expiry and pipeline calls RedisVelocityBackend makes, over dicts"""
+    
+    def __init__(self):
+        self.hashes = {}
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = str(int(fields.get(field.encode(), b'0')) + amount).encode()
+    
+    def expire(self, key, seconds):
+        pass
+    
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+    
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field.encode(), None)
+    
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.hashes) if fnmatch.fnmatch(key, match)]
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+    
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+    
+    def execute(self):
+        for name, args in self.calls:
+            getattr(self.client, name)(*args)
+        self.calls = []
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    backend = InMemoryVelocityBackend() if request.param == 'memory' else RedisVelocityBackend(FakeRedis())
+    return VelocityStore(backend, ['1h', '24h'], buckets_per_window=60)
+
+def test_parse_window():
+    assert parse_window('30m') == 1800
+    assert parse_window('24h') == 86400
+    assert parse_window('7d') == 604800
+    with pytest.raises(ValueError):
+        parse_window('1w')
+
+def test_counts_and_sums_each_window(store):
+    now = datetime.utcnow()
+    store.record('user-1', Decimal('10.50'), now - timedelta(minutes=5))
+    store.record('user-1', 20, now - timedelta(hours=3))
+    store.record('user-2', 99, now)
+    
+    velocity = store.get_velocity('user-1', now)
+    
+    assert velocity['1h'] == {'count': 1, 'amount': Decimal('10.50')}
+    assert velocity['24h'] == {'count': 2, 'amount': Decimal('30.50')}
+
+def test_old_transactions_slide_out_of_the_window(store):
+    now = datetime.utcnow()
+    store.record('user-1', 10, now - timedelta(minutes=30))
+    
+    assert store.get_velocity('user-1', now + timedelta(minutes=20))['1h']['count'] == 1
+    assert store.get_velocity('user-1', now + timedelta(minutes=40))['1h']['count'] == 0
+    assert store.get_velocity('user-1', now + timedelta(minutes=40))['24h']['count'] == 1
+
+def test_unknown_user_has_empty_windows(store):
+    assert store.get_velocity('nobody') == {
+        '1h': {'count': 0, 'amount': Decimal('0')},
+        '24h': {'count': 0, 'amount': Decimal('0')}
+    }
+
+def test_rebuild_reloads_counters_from_transactions(app, make_account, store):
+    account = make_account()
+    now = datetime.utcnow()
+    for minutes, amount in [(10, 25), (90, 75), (60 * 48, 500)]:
+        db.session.add(Transaction(
+            account_id=account.id,
+            user_id=account.user_id,
+            transaction_type='deposit',
+            status=TransactionStatus.COMPLETED,
+            amount=Decimal(amount),
+            currency='USD',
+            net_amount=Decimal(amount),
+            created_at=now - timedelta(minutes=minutes)
+        ))
+    db.session.commit()
+    store.record('stale-user', 1)
+    
+    assert store.rebuild() == 2
+    velocity = store.get_velocity(account.user_id, now)
+    assert velocity['1h'] == {'count': 1, 'amount': Decimal('25')}
+    assert velocity['24h'] == {'count': 2, 'amount': Decimal('100')}
+    assert store.get_velocity('stale-user')['24h']['count'] == 0